@@ -1,14 +1,44 @@
+import os
+import sys
 from collections import defaultdict
 
+# The sets themselves come from the grammarcore package in the folder above
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore import compute_all_firsts, compute_all_follows, read_rules  # noqa: E402
+
+
+def fixpoint_sets(grammar, start_symbol):
+    """FIRST and FOLLOW of every non-terminal, from grammarcore's fixpoint passes"""
+    first = compute_all_firsts(grammar)
+    return first, compute_all_follows(grammar, start_symbol, first)
+
+
 # Function to compute FIRST set
-def compute_first(symbol, grammar, first_sets, depth=0):
+def compute_first(symbol, grammar, first_sets, depth=0, fixpoint=None, active=None):
+    """Print how FIRST(symbol) is built, recursively; `fixpoint` is fixpoint_sets() of the grammar.
+
+    Each FIRST set is worked out once (first_sets remembers it).  A symbol
+    met again while its own FIRST is being worked out (left recursion)
+    takes its set from the fixpoint passes instead of recursing forever.
+    """
     indent = "  " * depth
     print(f"{indent}Computing FIRST({symbol})")
     
     if symbol in first_sets:
         print(f"{indent}FIRST({symbol}) already computed = {first_sets[symbol]}")
         return first_sets[symbol]
-    
+
+    if active is None:
+        active = set()
+    if symbol in active:
+        first = (fixpoint[0] if fixpoint else compute_all_firsts(grammar))[symbol]
+        print(f"{indent}{symbol} is left recursive, taking FIRST({symbol}) = {first} from the fixpoint passes")
+        return first
+    active.add(symbol)
+
     first = set()
     if symbol not in grammar:  # terminal
         first.add(symbol)
@@ -25,7 +55,7 @@ def compute_first(symbol, grammar, first_sets, depth=0):
                 all_have_epsilon = True
                 for j, char in enumerate(production):
                     print(f"{indent}    Processing symbol {j+1}: {char}")
-                    first_char = compute_first(char, grammar, first_sets, depth+2)
+                    first_char = compute_first(char, grammar, first_sets, depth+2, fixpoint, active)
                     first |= (first_char - {"ε"})
                     print(f"{indent}    Adding FIRST({char}) - {{ε}} = {first_char - {'ε'}} to FIRST({symbol})")
                     print(f"{indent}    Current FIRST({symbol}) = {first}")
@@ -39,15 +69,25 @@ def compute_first(symbol, grammar, first_sets, depth=0):
                     first.add("ε")
                     print(f"{indent}    All symbols in production can derive ε, adding ε to FIRST({symbol})")
     
+    active.discard(symbol)
     first_sets[symbol] = first
     print(f"{indent}Final FIRST({symbol}) = {first}")
     return first
 
 # Function to compute FOLLOW set
-def compute_follow(symbol, grammar, first_sets, follow_sets, start_symbol, depth=0):
+def compute_follow(symbol, grammar, first_sets, follow_sets, start_symbol, depth=0, fixpoint=None):
+    """Print how FOLLOW(symbol) is built in one pass over the grammar.
+
+    Where FOLLOW(lhs) of another non-terminal is needed it is taken from the
+    fixpoint passes (`fixpoint`, computed here when not given) instead of
+    being recomputed recursively, which took exponential time on long
+    chains of nullable endings and never ended on mutual recursion.
+    """
     indent = "  " * depth
     print(f"{indent}Computing FOLLOW({symbol})")
-    
+    if fixpoint is None:
+        fixpoint = fixpoint_sets(grammar, start_symbol)
+
     if symbol == start_symbol and "$" not in follow_sets[symbol]:
         follow_sets[symbol].add("$")
         print(f"{indent}{symbol} is start symbol, adding $ to FOLLOW({symbol})")
@@ -58,43 +98,42 @@ def compute_follow(symbol, grammar, first_sets, follow_sets, start_symbol, depth
         for prod_num, production in enumerate(grammar[lhs]):
             print(f"{indent}  Checking production: {lhs} -> {' '.join(production)}")
             for i, char in enumerate(production):
-                if char == symbol:
-                    print(f"{indent}    Found {symbol} at position {i}")
-                    # Case 1: next symbol exists
-                    if i + 1 < len(production):
-                        next_char = production[i+1]
-                        print(f"{indent}    Next symbol is {next_char}")
-                        next_first = compute_first(next_char, grammar, first_sets, depth+1)
-                        before_add = follow_sets[symbol].copy()
-                        follow_sets[symbol] |= (next_first - {"ε"})
-                        added = follow_sets[symbol] - before_add
-                        if added:
-                            print(f"{indent}    Adding FIRST({next_char}) - {{ε}} = {next_first - {'ε'}} to FOLLOW({symbol})")
-                        print(f"{indent}    Current FOLLOW({symbol}) = {follow_sets[symbol]}")
-                        
-                        if "ε" in next_first:
-                            print(f"{indent}    {next_char} can derive ε, need to add FOLLOW({lhs}) to FOLLOW({symbol})")
-                            if lhs != symbol:
-                                before_recursive = follow_sets[symbol].copy()
-                                follow_lhs = compute_follow(lhs, grammar, first_sets, follow_sets, start_symbol, depth+1)
-                                follow_sets[symbol] |= (follow_lhs - {"ε"})
-                                added_recursive = follow_sets[symbol] - before_recursive
-                                if added_recursive:
-                                    print(f"{indent}    Added FOLLOW({lhs}) = {added_recursive} to FOLLOW({symbol})")
-                            else:
-                                print(f"{indent}    {lhs} == {symbol}, skipping to avoid infinite recursion")
+                if char != symbol:
+                    continue
+                print(f"{indent}    Found {symbol} at position {i}")
+                rest = production[i+1:]
+                # Case 1: FIRST of the next symbols, up to the first that cannot derive ε
+                for k, next_char in enumerate(rest):
+                    print(f"{indent}    Next symbol is {next_char}")
+                    next_first = compute_first(next_char, grammar, first_sets, depth+1, fixpoint)
+                    before_add = follow_sets[symbol].copy()
+                    follow_sets[symbol] |= (next_first - {"ε"})
+                    added = follow_sets[symbol] - before_add
+                    if added:
+                        print(f"{indent}    Adding FIRST({next_char}) - {{ε}} = {next_first - {'ε'}} to FOLLOW({symbol})")
+                    print(f"{indent}    Current FOLLOW({symbol}) = {follow_sets[symbol]}")
+                    if "ε" not in next_first:
+                        break
+                    if k + 1 < len(rest):
+                        print(f"{indent}    {next_char} can derive ε, so the symbol after it can follow {symbol} too")
                     else:
+                        print(f"{indent}    {next_char} can derive ε, need to add FOLLOW({lhs}) to FOLLOW({symbol})")
+                else:
+                    # Case 2: nothing after the symbol, or all of it can derive ε
+                    if not rest:
                         print(f"{indent}    {symbol} is at the end of production")
-                        if lhs != symbol:
-                            print(f"{indent}    Need to add FOLLOW({lhs}) to FOLLOW({symbol})")
-                            before_recursive = follow_sets[symbol].copy()
-                            follow_lhs = compute_follow(lhs, grammar, first_sets, follow_sets, start_symbol, depth+1)
-                            follow_sets[symbol] |= (follow_lhs - {"ε"})
-                            added_recursive = follow_sets[symbol] - before_recursive
-                            if added_recursive:
-                                print(f"{indent}    Added FOLLOW({lhs}) = {added_recursive} to FOLLOW({symbol})")
-                        else:
-                            print(f"{indent}    {lhs} == {symbol}, skipping to avoid infinite recursion")
+                    if lhs == symbol:
+                        print(f"{indent}    {lhs} == {symbol}, FOLLOW({lhs}) adds nothing new")
+                        continue
+                    if not rest:
+                        print(f"{indent}    Need to add FOLLOW({lhs}) to FOLLOW({symbol})")
+                    follow_lhs = fixpoint[1][lhs]
+                    print(f"{indent}    FOLLOW({lhs}) = {follow_lhs} (from the fixpoint passes)")
+                    before_recursive = follow_sets[symbol].copy()
+                    follow_sets[symbol] |= (follow_lhs - {"ε"})
+                    added_recursive = follow_sets[symbol] - before_recursive
+                    if added_recursive:
+                        print(f"{indent}    Added FOLLOW({lhs}) = {added_recursive} to FOLLOW({symbol})")
     
     if len(follow_sets[symbol]) > initial_size:
         print(f"{indent}Updated FOLLOW({symbol}) = {follow_sets[symbol]}")
@@ -105,25 +144,15 @@ def compute_follow(symbol, grammar, first_sets, follow_sets, start_symbol, depth
 
 # ---------------- MAIN ----------------
 def main():
-    grammar = defaultdict(list)
     filename = "grammar.txt"
 
-    # Read grammar from file
-    with open(filename, "r") as f:
-        for line in f:
-            if "->" in line:
-                lhs, rhs = line.strip().split("->")
-                lhs = lhs.strip()
-                productions = rhs.strip().split("|")
-                for prod in productions:
-                    # Replace 'epsilon' with 'ε' automatically
-                    prod_symbols = prod.strip().split()
-                    prod_symbols = ["ε" if sym.lower() == "epsilon" else sym for sym in prod_symbols]
-                    grammar[lhs].append(prod_symbols)
+    # Read grammar from file ('epsilon' becomes 'ε')
+    grammar = read_rules(filename)
 
     first_sets = {}
     follow_sets = defaultdict(set)
     start_symbol = list(grammar.keys())[0]  # first non-terminal is start
+    fixpoint = fixpoint_sets(grammar, start_symbol)
 
     # Compute FIRST sets for non-terminals only
     print("=" * 50)
@@ -131,7 +160,7 @@ def main():
     print("=" * 50)
     for non_terminal in grammar:
         print(f"\n--- Computing FIRST({non_terminal}) ---")
-        compute_first(non_terminal, grammar, first_sets)
+        compute_first(non_terminal, grammar, first_sets, fixpoint=fixpoint)
         print(f"--- FIRST({non_terminal}) = {first_sets[non_terminal]} ---\n")
 
     # Compute FOLLOW sets for non-terminals only
@@ -140,7 +169,7 @@ def main():
     print("=" * 50)
     for non_terminal in grammar:
         print(f"\n--- Computing FOLLOW({non_terminal}) ---")
-        compute_follow(non_terminal, grammar, first_sets, follow_sets, start_symbol)
+        compute_follow(non_terminal, grammar, first_sets, follow_sets, start_symbol, fixpoint=fixpoint)
         print(f"--- FOLLOW({non_terminal}) = {follow_sets[non_terminal]} ---\n")
 
     # Print Results (non-terminals only)
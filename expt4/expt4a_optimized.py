@@ -1,56 +1,200 @@
-from collections import defaultdict
+import os
+import sys
+from collections import defaultdict, deque
+
+# The fixpoint FIRST/FOLLOW passes come from the grammarcore package in the folder above
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore import compute_all_firsts, compute_all_follows, read_rules  # noqa: E402
+
+# How each step event is shown: kind -> function of the event's fields.
+# An event is a tuple (kind, symbol, *details); it is only turned into text
+# when a sink renders it.
+STEP_FORMATS = {
+    "first.memo": lambda sym, s: f"✓ FIRST({sym}) already computed: {s}",
+    "first.cycle": lambda sym, s: f"⚠ Left recursion detected for {sym}, using FIRST({sym}) = {s} from the fixpoint passes",
+    "first.start": lambda sym: f"\n🔄 Computing FIRST({sym})...",
+    "first.terminal": lambda sym: f"  📝 {sym} is terminal → FIRST({sym}) = {{{sym}}}",
+    "first.nonterminal": lambda sym, prods: f"  📝 {sym} is non-terminal with productions: {prods}",
+    "first.production": lambda sym, i, prod: f"    Production {i+1}: {sym} → {' '.join(prod)}",
+    "first.epsilon": lambda sym: f"      ✅ Added ε to FIRST({sym})",
+    "first.symbol": lambda sym, j, char: f"      🔍 Processing symbol {j+1}: {char}",
+    "first.added": lambda sym, added, char: f"        ➕ Added {added} from FIRST({char}) to FIRST({sym})",
+    "first.stop": lambda sym, char: f"        🛑 {char} doesn't derive ε, stopping here",
+    "first.continue": lambda sym, char: f"        ⏭ {char} can derive ε, continuing...",
+    "first.all_epsilon": lambda sym: f"      ✅ All symbols derive ε → Added ε to FIRST({sym})",
+    "first.done": lambda sym, s: f"  ✅ Final FIRST({sym}) = {s}",
+    "follow.cycle": lambda sym, s: f"⚠ FOLLOW recursion detected for {sym}, using FOLLOW({sym}) = {s} from the fixpoint passes",
+    "follow.start": lambda sym: f"\n🔄 Computing FOLLOW({sym})...",
+    "follow.dollar": lambda sym: f"  📝 {sym} is start symbol → Added $ to FOLLOW({sym})",
+    "follow.check": lambda sym, lhs, prod: f"  🔍 Checking: {lhs} → {' '.join(prod)}",
+    "follow.found": lambda sym, i: f"    ✓ Found {sym} at position {i}",
+    "follow.next": lambda sym, nxt: f"      📍 Next symbol: {nxt}",
+    "follow.added_first": lambda sym, added, nxt: f"        ➕ Added {added} from FIRST({nxt}) to FOLLOW({sym})",
+    "follow.continue": lambda sym, nxt: f"        ⏭ {nxt} can derive ε, continuing...",
+    "follow.nullable": lambda sym, nxt, lhs: f"        ⚠ {nxt} can derive ε → Need FOLLOW({lhs})",
+    "follow.end": lambda sym: f"      📍 {sym} is at end of production",
+    "follow.need": lambda sym, lhs: f"        ⚠ Need FOLLOW({lhs})",
+    "follow.added_follow": lambda sym, added, lhs: f"        ➕ Added {added} from FOLLOW({lhs}) to FOLLOW({sym})",
+    "follow.updated": lambda sym, s: f"  ✅ Updated FOLLOW({sym}) = {s}",
+    "follow.unchanged": lambda sym, s: f"  ✅ No changes to FOLLOW({sym}) = {s}",
+}
+
+
+def format_step(event):
+    """Text of one step event, as the calculator used to print it."""
+    return STEP_FORMATS[event[0]](*event[1:])
+
+
+class NullSink:
+    """Drops every step (only the final sets and the counters are wanted)."""
+    enabled = False
+
+    def emit(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class PrettySink(NullSink):
+    """Prints every step as it happens (the default)."""
+    enabled = True
+
+    def emit(self, event):
+        print(format_step(event))
+
+
+class RingSink(NullSink):
+    """Keeps the last `maxlen` step events (all of them when maxlen is None)."""
+    enabled = True
+
+    def __init__(self, maxlen=1000):
+        self.events = deque(maxlen=maxlen)
+
+    def emit(self, event):
+        # the sets in an event keep changing afterwards: store copies
+        self.events.append(tuple(set(x) if isinstance(x, set) else x for x in event))
+
+    def steps(self):
+        return [format_step(e) for e in self.events]
+
+
+class FileSink(NullSink):
+    """Writes every step to a text file, one line per step."""
+    enabled = True
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def emit(self, event):
+        self.file.write(format_step(event) + "\n")
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 class FirstFollowCalculator:
-    def __init__(self, grammar):
+    """Recursive FIRST/FOLLOW, reporting every step to a sink.
+
+    FIRST sets are memoized; FOLLOW sets are traced in full every time they
+    are needed.  A set needed again while it is still being worked out (left
+    recursion, or FOLLOW sets that depend on each other) is taken from
+    grammarcore's fixpoint passes, so the recursion always ends and the
+    results are complete.
+    """
+
+    def __init__(self, grammar, sink=None):
         self.grammar = grammar
         self.first_sets = {}
         self.follow_sets = defaultdict(set)
         self.first_in_progress = set()  # To handle left recursion
         self.follow_in_progress = set()  # To handle left recursion
-        self.computation_steps = []
-        
-    def log_step(self, message):
-        """Log computation steps"""
-        self.computation_steps.append(message)
-        print(message)
+        self._fixpoint_first = None
+        self._fixpoint_follow = None
+        self.sink = PrettySink() if sink is None else sink
+        self._emit = self.sink.emit if self.sink.enabled else None
+        self.step_counts = defaultdict(int)  # event kind -> number of steps
+
+    def log_step(self, kind, symbol, *details):
+        """Count a computation step and hand it to the sink"""
+        self.step_counts[kind] += 1
+        if self._emit is not None:
+            self._emit((kind, symbol) + details)
+
+    @property
+    def memo_hits(self):
+        """FIRST computations avoided by memoization"""
+        return self.step_counts["first.memo"]
+
+    @property
+    def total_steps(self):
+        return sum(self.step_counts.values())
+
+    def fixpoint_first(self):
+        """FIRST sets from the fixpoint passes (computed on first use)"""
+        if self._fixpoint_first is None:
+            self._fixpoint_first = compute_all_firsts(self.grammar)
+        return self._fixpoint_first
+
+    def fixpoint_follow(self, start_symbol):
+        """FOLLOW sets from the fixpoint passes (computed on first use)"""
+        if self._fixpoint_follow is None:
+            self._fixpoint_follow = compute_all_follows(self.grammar, start_symbol, self.fixpoint_first())
+        return self._fixpoint_follow
+
+    @property
+    def computation_steps(self):
+        """Text of the steps the sink kept (RingSink), otherwise empty"""
+        steps = getattr(self.sink, "steps", None)
+        return steps() if steps else []
     
     def compute_first(self, symbol):
         """Compute FIRST set with memoization and detailed steps"""
         
         # Check if already computed (memoization)
         if symbol in self.first_sets:
-            self.log_step(f"✓ FIRST({symbol}) already computed: {self.first_sets[symbol]}")
+            self.log_step("first.memo", symbol, self.first_sets[symbol])
             return self.first_sets[symbol]
         
         # Check for left recursion
         if symbol in self.first_in_progress:
-            self.log_step(f"⚠ Left recursion detected for {symbol}, returning empty set")
-            return set()
+            first = self.fixpoint_first()[symbol]
+            self.log_step("first.cycle", symbol, first)
+            return first
         
         self.first_in_progress.add(symbol)
-        self.log_step(f"\n🔄 Computing FIRST({symbol})...")
+        self.log_step("first.start", symbol)
         
         first = set()
         
         # Terminal case
         if symbol not in self.grammar:
             first.add(symbol)
-            self.log_step(f"  📝 {symbol} is terminal → FIRST({symbol}) = {{{symbol}}}")
+            self.log_step("first.terminal", symbol)
         else:
             # Non-terminal case
-            self.log_step(f"  📝 {symbol} is non-terminal with productions: {self.grammar[symbol]}")
+            self.log_step("first.nonterminal", symbol, self.grammar[symbol])
             
             for i, production in enumerate(self.grammar[symbol]):
-                self.log_step(f"    Production {i+1}: {symbol} → {' '.join(production)}")
+                self.log_step("first.production", symbol, i, production)
                 
                 if production == ["ε"]:
                     first.add("ε")
-                    self.log_step(f"      ✅ Added ε to FIRST({symbol})")
+                    self.log_step("first.epsilon", symbol)
                 else:
                     # Process each symbol in the production
                     all_have_epsilon = True
                     for j, char in enumerate(production):
-                        self.log_step(f"      🔍 Processing symbol {j+1}: {char}")
+                        self.log_step("first.symbol", symbol, j, char)
                         
                         # Recursive call with memoization
                         first_char = self.compute_first(char)
@@ -58,28 +202,26 @@ class FirstFollowCalculator:
                         # Add non-epsilon symbols
                         before_size = len(first)
                         first |= (first_char - {"ε"})
-                        new_symbols = first - (first - (first_char - {"ε"})) if before_size < len(first) else set()
-                        
-                        if new_symbols:
-                            self.log_step(f"        ➕ Added {new_symbols} from FIRST({char}) to FIRST({symbol})")
+                        if before_size < len(first):
+                            self.log_step("first.added", symbol, first & (first_char - {"ε"}), char)
                         
                         # Check if epsilon is in FIRST(char)
                         if "ε" not in first_char:
-                            self.log_step(f"        🛑 {char} doesn't derive ε, stopping here")
+                            self.log_step("first.stop", symbol, char)
                             all_have_epsilon = False
                             break
                         else:
-                            self.log_step(f"        ⏭ {char} can derive ε, continuing...")
+                            self.log_step("first.continue", symbol, char)
                     
                     # If all symbols can derive epsilon, add epsilon
                     if all_have_epsilon:
                         first.add("ε")
-                        self.log_step(f"      ✅ All symbols derive ε → Added ε to FIRST({symbol})")
+                        self.log_step("first.all_epsilon", symbol)
         
         # Store result (memoization)
         self.first_sets[symbol] = first
         self.first_in_progress.remove(symbol)
-        self.log_step(f"  ✅ Final FIRST({symbol}) = {first}")
+        self.log_step("first.done", symbol, first)
         
         return first
     
@@ -92,94 +234,88 @@ class FirstFollowCalculator:
         
         # Check for left recursion
         if symbol in self.follow_in_progress:
-            self.log_step(f"⚠ FOLLOW recursion detected for {symbol}, returning current set")
-            return self.follow_sets[symbol]
+            follow = self.fixpoint_follow(start_symbol)[symbol]
+            self.log_step("follow.cycle", symbol, follow)
+            return follow
         
         self.follow_in_progress.add(symbol)
-        self.log_step(f"\n🔄 Computing FOLLOW({symbol})...")
+        self.log_step("follow.start", symbol)
         
         initial_set = self.follow_sets[symbol].copy()
         
         # Start symbol gets $
         if symbol == start_symbol and "$" not in self.follow_sets[symbol]:
             self.follow_sets[symbol].add("$")
-            self.log_step(f"  📝 {symbol} is start symbol → Added $ to FOLLOW({symbol})")
+            self.log_step("follow.dollar", symbol)
         
         # Look for symbol in all productions
         for lhs in self.grammar:
             for prod_num, production in enumerate(self.grammar[lhs]):
-                self.log_step(f"  🔍 Checking: {lhs} → {' '.join(production)}")
+                self.log_step("follow.check", symbol, lhs, production)
                 
                 for i, char in enumerate(production):
                     if char == symbol:
-                        self.log_step(f"    ✓ Found {symbol} at position {i}")
+                        self.log_step("follow.found", symbol, i)
                         
-                        # Case 1: There's a symbol after current symbol
+                        # Case 1: There are symbols after current symbol
                         if i + 1 < len(production):
-                            next_symbol = production[i + 1]
-                            self.log_step(f"      📍 Next symbol: {next_symbol}")
-                            
-                            # Get FIRST of next symbol (might trigger computation)
-                            if next_symbol not in self.first_sets:
-                                self.compute_first(next_symbol)
-                            
-                            next_first = self.first_sets[next_symbol]
-                            before_size = len(self.follow_sets[symbol])
-                            self.follow_sets[symbol] |= (next_first - {"ε"})
-                            
-                            if len(self.follow_sets[symbol]) > before_size:
-                                added = (next_first - {"ε"})
-                                self.log_step(f"        ➕ Added {added} from FIRST({next_symbol}) to FOLLOW({symbol})")
-                            
-                            # If FIRST(next_symbol) contains ε, add FOLLOW(lhs)
-                            if "ε" in next_first:
-                                self.log_step(f"        ⚠ {next_symbol} can derive ε → Need FOLLOW({lhs})")
+                            for j in range(i + 1, len(production)):
+                                next_symbol = production[j]
+                                self.log_step("follow.next", symbol, next_symbol)
+
+                                # Get FIRST of next symbol (might trigger computation)
+                                if next_symbol not in self.first_sets:
+                                    self.compute_first(next_symbol)
+                                next_first = self.first_sets[next_symbol]
+
+                                before_size = len(self.follow_sets[symbol])
+                                self.follow_sets[symbol] |= (next_first - {"ε"})
+
+                                if len(self.follow_sets[symbol]) > before_size:
+                                    self.log_step("follow.added_first", symbol, next_first - {"ε"}, next_symbol)
+
+                                # Stop at the first symbol that cannot derive ε
+                                if "ε" not in next_first:
+                                    break
+                                if j + 1 < len(production):
+                                    self.log_step("follow.continue", symbol, next_symbol)
+                            else:
+                                # Everything after symbol can derive ε → add FOLLOW(lhs)
+                                self.log_step("follow.nullable", symbol, next_symbol, lhs)
                                 if lhs != symbol:  # Avoid infinite recursion
                                     before_size = len(self.follow_sets[symbol])
                                     follow_lhs = self.compute_follow(lhs, start_symbol)
                                     self.follow_sets[symbol] |= follow_lhs
                                     if len(self.follow_sets[symbol]) > before_size:
-                                        added = follow_lhs
-                                        self.log_step(f"        ➕ Added {added} from FOLLOW({lhs}) to FOLLOW({symbol})")
+                                        self.log_step("follow.added_follow", symbol, follow_lhs, lhs)
                         
                         # Case 2: Symbol is at the end of production
                         else:
-                            self.log_step(f"      📍 {symbol} is at end of production")
+                            self.log_step("follow.end", symbol)
                             if lhs != symbol:  # Avoid infinite recursion
-                                self.log_step(f"        ⚠ Need FOLLOW({lhs})")
+                                self.log_step("follow.need", symbol, lhs)
                                 before_size = len(self.follow_sets[symbol])
                                 follow_lhs = self.compute_follow(lhs, start_symbol)
                                 self.follow_sets[symbol] |= follow_lhs
                                 if len(self.follow_sets[symbol]) > before_size:
-                                    added = follow_lhs
-                                    self.log_step(f"        ➕ Added {added} from FOLLOW({lhs}) to FOLLOW({symbol})")
+                                    self.log_step("follow.added_follow", symbol, follow_lhs, lhs)
         
         self.follow_in_progress.remove(symbol)
         
         # Check if anything was added
         if self.follow_sets[symbol] != initial_set:
-            self.log_step(f"  ✅ Updated FOLLOW({symbol}) = {self.follow_sets[symbol]}")
+            self.log_step("follow.updated", symbol, self.follow_sets[symbol])
         else:
-            self.log_step(f"  ✅ No changes to FOLLOW({symbol}) = {self.follow_sets[symbol]}")
+            self.log_step("follow.unchanged", symbol, self.follow_sets[symbol])
         
         return self.follow_sets[symbol]
 
 def main():
-    grammar = defaultdict(list)
     filename = "grammar.txt"
 
-    # Read grammar from file
+    # Read grammar from file ('epsilon' becomes 'ε')
     print("📖 Reading grammar from file...")
-    with open(filename, "r") as f:
-        for line in f:
-            if "->" in line:
-                lhs, rhs = line.strip().split("->")
-                lhs = lhs.strip()
-                productions = rhs.strip().split("|")
-                for prod in productions:
-                    prod_symbols = prod.strip().split()
-                    prod_symbols = ["ε" if sym.lower() == "epsilon" else sym for sym in prod_symbols]
-                    grammar[lhs].append(prod_symbols)
+    grammar = read_rules(filename)
 
     print(f"📋 Grammar loaded:")
     for nt in grammar:
@@ -222,8 +358,8 @@ def main():
         print(f"  FOLLOW({nt}) = {calculator.follow_sets[nt]}")
     
     print("\n📈 COMPUTATION STATISTICS:")
-    print(f"  Total FIRST computations avoided by memoization: {len([s for s in calculator.computation_steps if 'already computed' in s])}")
-    print(f"  Total computation steps logged: {len(calculator.computation_steps)}")
+    print(f"  Total FIRST computations avoided by memoization: {calculator.memo_hits}")
+    print(f"  Total computation steps logged: {calculator.total_steps}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,68 @@
+import os
+import sys
 from collections import defaultdict
 
-def eliminate_left_recursion(grammar):
+# The transformation itself comes from the grammarcore package in the folder above
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore import (  # noqa: E402
+    eliminate_direct_left_recursion,
+    format_cycle,
+    fresh_nonterminal,
+    left_recursive_cycles,
+    read_rules,
+    split_left_recursive,
+    substitute_leading,
+)
+
+
+def report_left_recursion(grammar):
+    """Print every left-recursive cycle of the grammar and return them (left_recursive_cycles)."""
+    cycles = left_recursive_cycles(grammar)
+    if not cycles:
+        print("  No left recursion found (direct, indirect or hidden)")
+    for rec in cycles:
+        print(f"  {format_cycle(rec)}")
+        if rec.kind == 'hidden':
+            print("    ⚠️  Hidden behind a nullable prefix: remove the ε-productions of that prefix to expose it")
+    return cycles
+
+
+def substitute_earlier(non_terminal, productions, earlier, new_grammar):
+    """Indirect step: replace each leading Aj (an earlier member of the same cycle) by its new productions."""
+    for aj in earlier:
+        productions, expanded, replaced = substitute_leading(productions, aj, new_grammar[aj])
+        if not replaced:
+            continue
+        print(f"\nExpanding {aj} at the start of {non_terminal} productions (indirect left recursion):")
+        if not expanded:
+            print(f"  {aj} has no productions, so every {non_terminal} → {aj} ... is dropped")
+        for rest, beta, new_prod in expanded:
+            # β = ε leaves just γ
+            new_prod[:] = [sym for sym in new_prod if sym != 'ε'] or ['ε']
+            rest_str = " ".join(rest)
+            print(f"  {non_terminal} → {aj} {rest_str} with {aj} → {' '.join(beta)} gives {non_terminal} → {' '.join(new_prod)}")
+    return productions
+
+
+def eliminate_left_recursion(grammar, cycles=None):
+    """Eliminate direct left recursion everywhere and indirect recursion where there is some.
+
+    Non-terminals on an indirect cycle (`cycles`, from left_recursive_cycles)
+    first get the leading earlier members of that cycle substituted, in
+    grammar order; every other non-terminal is only checked for A → Aα.
+    """
+    if cycles is None:
+        cycles = left_recursive_cycles(grammar)
+    # non-terminal -> members of its cycle that come before it
+    earlier_members = {}
+    for rec in cycles:
+        for i, nt in enumerate(rec.nonterminals):
+            if len(rec.nonterminals) > 1:
+                earlier_members[nt] = rec.nonterminals[:i]
+
     print("\n" + "="*80)
     print("LEFT RECURSION ELIMINATION ALGORITHM")
     print("="*80)
@@ -23,21 +85,21 @@ def eliminate_left_recursion(grammar):
         print(f"PROCESSING NON-TERMINAL: {non_terminal}")
         print("-"*60)
         
-        alpha = []  # left recursive parts (α)
-        beta = []   # non-left recursive parts (β)
+        productions = grammar[non_terminal]
+        if earlier_members.get(non_terminal):
+            productions = substitute_earlier(non_terminal, productions, earlier_members[non_terminal], new_grammar)
+
+        # α: the parts after A in A → Aα, β: the other productions
+        alpha, beta = split_left_recursive(non_terminal, productions)
 
         print(f"\nAnalyzing productions for {non_terminal}:")
-        for i, production in enumerate(grammar[non_terminal]):
-            prod_str = " ".join(production)
-            if production[0] == non_terminal:
+        for production in productions:
+            if production and production[0] == non_terminal:
                 # A → Aα
-                alpha_part = production[1:]
-                alpha.append(alpha_part)
-                alpha_str = " ".join(alpha_part) if alpha_part else "ε"
+                alpha_str = " ".join(production[1:]) if production[1:] else "ε"
                 print(f"  {non_terminal} → {non_terminal}{alpha_str} [LEFT RECURSIVE - α = '{alpha_str}']")
             else:
                 # A → β
-                beta.append(production)
                 beta_str = " ".join(production)
                 print(f"  {non_terminal} → {beta_str} [NON-LEFT RECURSIVE - β = '{beta_str}']")
 
@@ -46,13 +108,13 @@ def eliminate_left_recursion(grammar):
 
         if alpha:
             print(f"\n🔄 LEFT RECURSION DETECTED! Applying transformation...")
-            new_nt = non_terminal + "'"
+            new_nt = fresh_nonterminal(non_terminal, set(grammar) | set(new_grammar))
             print(f"Creating new non-terminal: {new_nt}")
+            head_rhs, new_rhs = eliminate_direct_left_recursion(alpha, beta, new_nt)
             
             print(f"\nStep 1: Transform {non_terminal} productions")
             print(f"Formula: {non_terminal} → β₁{new_nt} | β₂{new_nt} | ... | βₙ{new_nt}")
-            for i, b in enumerate(beta):
-                new_prod = b + [new_nt]
+            for i, (b, new_prod) in enumerate(zip(beta, head_rhs)):
                 new_grammar[non_terminal].append(new_prod)
                 beta_str = " ".join(b)
                 new_prod_str = " ".join(new_prod)
@@ -60,15 +122,14 @@ def eliminate_left_recursion(grammar):
             
             print(f"\nStep 2: Create {new_nt} productions")
             print(f"Formula: {new_nt} → α₁{new_nt} | α₂{new_nt} | ... | αₘ{new_nt} | ε")
-            for i, a in enumerate(alpha):
-                new_prod = a + [new_nt]
+            for i, (a, new_prod) in enumerate(zip(alpha, new_rhs)):
                 new_grammar[new_nt].append(new_prod)
                 alpha_str = " ".join(a) if a else "ε"
                 new_prod_str = " ".join(new_prod)
                 print(f"  α{i+1} = '{alpha_str}' → {new_nt} → {new_prod_str}")
             
-            # Add epsilon production
-            new_grammar[new_nt].append(["ε"])
+            # Add epsilon production (the last of new_rhs)
+            new_grammar[new_nt].append(new_rhs[-1])
             print(f"  Adding epsilon: {new_nt} → ε")
             
             print(f"\n✅ Transformation complete for {non_terminal}")
@@ -81,16 +142,7 @@ def eliminate_left_recursion(grammar):
 
 
 def read_grammar_from_file(filename):
-    grammar = defaultdict(list)
-    with open(filename, "r") as f:
-        for line in f:
-            if "->" in line:
-                lhs, rhs = line.strip().split("->")
-                lhs = lhs.strip()
-                productions = rhs.strip().split("|")
-                for prod in productions:
-                    grammar[lhs].append(prod.strip().split())
-    return grammar
+    return read_rules(filename)
 
 
 def print_grammar(grammar):
@@ -116,19 +168,28 @@ def main():
     print_grammar(grammar)
     
     print(f"\n🔍 CHECKING FOR LEFT RECURSION:")
-    print("Left recursion occurs when: A → Aα (A appears as first symbol on RHS)")
+    print("Left recursion occurs when: A ⇒ ... ⇒ Aα, directly (A → Aα), through other")
+    print("non-terminals (A → Bβ, B → Aγ) or behind a nullable prefix (A → B A α, B ⇒ ε)")
+    cycles = report_left_recursion(grammar)
 
-    updated_grammar = eliminate_left_recursion(grammar)
+    updated_grammar = eliminate_left_recursion(grammar, cycles)
 
     print(f"\n" + "="*80)
     print("🎯 FINAL RESULT - GRAMMAR AFTER ELIMINATING LEFT RECURSION:")
     print("="*80)
     print_grammar(updated_grammar)
+
+    print("🔍 LEFT RECURSION REMAINING:")
+    remaining = report_left_recursion(updated_grammar)
     
     print(f"\n📚 SUMMARY:")
-    print("- Left recursion has been successfully eliminated")
+    if remaining:
+        print("- Direct and indirect left recursion have been eliminated; the cycles above remain")
+    else:
+        print("- Left recursion has been successfully eliminated")
     print("- New non-terminals with ' (prime) have been introduced")
-    print("- The grammar is now suitable for top-down parsing")
+    if not remaining:
+        print("- The grammar is now suitable for top-down parsing")
     print("- Epsilon (ε) productions handle the recursive nature")
 
 
@@ -0,0 +1,178 @@
+"""Batch parsing: check many input strings against one already-built table.
+
+The table (the dict from construct_table, a CompiledTable, an
+lalr.LALRTable or a codegen.GeneratedParser) is pickled once into a shared-memory block; every worker
+process loads it a single time in its initializer, so only the input chunks
+travel through the pool.
+
+    with BatchParser(table, start_symbol, workers=4) as bp:
+        for text, result in zip(inputs, bp.parse(inputs)):
+            ...
+        print(bp.report())
+
+Results come back in input order.  workers=0 parses in-process, which is
+handy for small batches and for debugging.  Pass a Tokenizer (built with
+the CompiledTable when parsing with one) to replace the simple tokenize().
+"""
+import os
+import pickle
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import shared_memory
+
+from expt6 import predictive_parse, tokenize
+
+# per-process state set up by _init_worker
+_worker_table = None
+_worker_start = None
+_worker_tokenizer = None
+
+
+def _load(table, start_symbol, tokenizer):
+    global _worker_table, _worker_start, _worker_tokenizer
+    _worker_table = table
+    _worker_start = start_symbol
+    _worker_tokenizer = tokenizer
+
+
+def _init_worker(shm_name, size):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        state = pickle.loads(bytes(shm.buf[:size]))
+    finally:
+        shm.close()
+    _load(*state)
+
+
+def _parse_chunk(index, inputs):
+    """Parse one chunk in the current process; returns (index, results, seconds)."""
+    t0 = time.perf_counter()
+    table, tok = _worker_table, _worker_tokenizer
+    if hasattr(table, 'encode'):
+        # CompiledTable: integer parse loop
+        if tok is not None:
+            results = [table.parse(tok.iter_codes(s)) for s in inputs]
+        else:
+            results = [table.parse(table.encode(tokenize(s))) for s in inputs]
+    elif hasattr(table, 'parse'):
+        # LALRTable (shift-reduce) or codegen.GeneratedParser
+        if tok is not None:
+            results = [table.parse(tok.tokens(s)) for s in inputs]
+        else:
+            results = [table.parse(s) for s in inputs]
+    elif tok is not None:
+        results = [predictive_parse(tok.tokens(s), _worker_start, table, trace=None) for s in inputs]
+    else:
+        results = [predictive_parse(s, _worker_start, table, trace=None) for s in inputs]
+    return index, results, time.perf_counter() - t0
+
+
+class BatchParser:
+    """Parse many inputs against one table using a pool of worker processes."""
+
+    def __init__(self, table, start_symbol=None, workers=None, chunk_size=1000, tokenizer=None):
+        self.table = table
+        self.start_symbol = start_symbol
+        self.tokenizer = tokenizer
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.batches = []  # (chunk index, inputs, accepted, seconds) per finished chunk
+        self.wall_time = 0.0
+        self._pool = None
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start(self):
+        if self._pool is not None or self.workers < 1:
+            return
+        payload = pickle.dumps((self.table, self.start_symbol, self.tokenizer), protocol=pickle.HIGHEST_PROTOCOL)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+        self._shm.buf[:len(payload)] = payload
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self._shm.name, len(payload)),
+        )
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _chunks(self, inputs):
+        it = iter(inputs)
+        index = 0
+        while True:
+            chunk = list(islice(it, self.chunk_size))
+            if not chunk:
+                return
+            yield index, chunk
+            index += 1
+
+    def _record(self, index, results, seconds):
+        self.batches.append((index, len(results), sum(1 for r in results if r), seconds))
+
+    def parse(self, inputs):
+        """Yield one ParseResult per input string, in input order.
+
+        `inputs` may be any iterable (e.g. an open file); at most two chunks
+        per worker are in flight, so memory does not grow with the input.
+        """
+        t0 = time.perf_counter()
+        try:
+            if self.workers < 1:
+                _load(self.table, self.start_symbol, self.tokenizer)
+                for index, chunk in self._chunks(inputs):
+                    _, results, seconds = _parse_chunk(index, chunk)
+                    self._record(index, results, seconds)
+                    yield from results
+                return
+
+            self._start()
+            pending = deque()
+            limit = 2 * self.workers
+            for index, chunk in self._chunks(inputs):
+                pending.append(self._pool.submit(_parse_chunk, index, chunk))
+                while len(pending) >= limit:
+                    yield from self._collect(pending.popleft())
+            while pending:
+                yield from self._collect(pending.popleft())
+        finally:
+            self.wall_time += time.perf_counter() - t0
+
+    def _collect(self, future):
+        index, results, seconds = future.result()
+        self._record(index, results, seconds)
+        return results
+
+    def report(self):
+        """Human-readable summary with per-batch timing."""
+        total = sum(b[1] for b in self.batches)
+        accepted = sum(b[2] for b in self.batches)
+        busy = sum(b[3] for b in self.batches)
+        lines = [f"{'Batch':<8}{'Inputs':<10}{'Accepted':<10}{'Seconds':<10}"]
+        for index, size, ok, seconds in sorted(self.batches):
+            lines.append(f"{index:<8}{size:<10}{ok:<10}{seconds:<10.4f}")
+        rate = total / self.wall_time if self.wall_time else 0.0
+        where = f"{self.workers} workers" if self.workers else 'in-process'
+        lines.append(f"Total: {total} inputs, {accepted} accepted, {total - accepted} rejected "
+                     f"in {self.wall_time:.3f}s wall / {busy:.3f}s parsing ({where}, {rate:.0f} inputs/s)")
+        return '\n'.join(lines)
+
+
+def parse_batch(table, inputs, start_symbol=None, workers=None, chunk_size=1000, tokenizer=None):
+    """One-shot helper: parse `inputs` and return (results, report text)."""
+    with BatchParser(table, start_symbol, workers, chunk_size, tokenizer) as bp:
+        results = list(bp.parse(inputs))
+        return results, bp.report()
@@ -0,0 +1,17 @@
+"""Benchmarks for expt6 on synthetic grammars.
+
+Run from the expt6 directory:
+
+    python -m bench --sizes 50 200 --nullable 0.1 0.3 --left-recursion 0 2
+    python -m bench --output new.json --compare baseline.json
+
+generators.py builds grammars and inputs of a chosen shape, runner.py times
+the stages and FIRST/FOLLOW engines and compares result files.
+"""
+from .generators import generate_grammar, generate_inputs
+from .runner import available_engines, compare, load_results, run_case, run_suite, save_results
+
+__all__ = [
+    'generate_grammar', 'generate_inputs', 'available_engines', 'compare',
+    'load_results', 'run_case', 'run_suite', 'save_results',
+]
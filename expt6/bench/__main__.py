@@ -0,0 +1,77 @@
+import argparse
+import itertools
+import sys
+
+from .runner import STAGES, compare, load_results, run_suite, save_results
+
+
+def _fmt(seconds):
+    return '-' if seconds is None else f"{seconds * 1000:.2f}"
+
+
+def print_case(case):
+    g = case['grammar']
+    if case['status'] != 'ok':
+        print(f"\n{case['name']}: {g['nonterminals']} non-terminals, {g['productions']} productions: "
+              f"{case['status']} (the stages did not finish within the time budget)")
+        return
+    print(f"\n{case['name']}: {g['nonterminals']} non-terminals, {g['productions']} productions, "
+          f"{case['parse']['inputs']} inputs ({case['parse']['tokens']} tokens, "
+          f"{case['parse']['accepted']} accepted), {case['parse']['conflicts']} conflicts")
+    print('  stages (ms): ' + ', '.join(f"{s} {_fmt(case['stages'][s])}" for s in STAGES))
+    for name, entry in case['engines'].items():
+        if entry['status'] != 'ok':
+            reason = entry.get('message', '').split(':')[0]
+            print(f"  {name:<16} {entry['status']}" + (f" ({reason})" if reason else ''))
+        else:
+            note = '' if entry['agrees'] else '  (sets differ from expt6)'
+            print(f"  {name:<16} {_fmt(entry['seconds'])} ms{note}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description='Benchmark expt6 on generated grammars')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 400], help='Non-terminal counts (default: 20 100 400)')
+    parser.add_argument('--alternatives', type=int, nargs='+', default=[3], help='Alternatives per head (default: 3)')
+    parser.add_argument('--terminals', type=int, default=20, help='Number of terminals (default: 20)')
+    parser.add_argument('--nullable', type=float, nargs='+', default=[0.1], help='Fraction of heads with an ε alternative (default: 0.1)')
+    parser.add_argument('--left-recursion', type=int, nargs='+', default=[0], help='Left-recursive cycle length, 0 = none (default: 0)')
+    parser.add_argument('--chain', action='store_true', help='Also run every grammar shape with a dependency chain as deep as the grammar (N{i} -> N{i+1} ...)')
+    parser.add_argument('--inputs', type=int, default=50, help='Generated inputs parsed per grammar (default: 50)')
+    parser.add_argument('--length', type=int, default=40, help='Target length of the generated inputs in tokens (default: 40)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, the fastest is kept (default: 3)')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds allowed per engine (default: 10)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--output', default='bench_results.json', help='Where to write the JSON results')
+    parser.add_argument('--compare', metavar='BASELINE', help='Report metrics slower than this earlier results file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against the baseline (default: 0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    param_list = [
+        {'nonterminals': n, 'alternatives': a, 'terminals': args.terminals, 'nullable': e, 'left_recursion': d,
+         'chain': c}
+        for n, a, e, d, c in itertools.product(args.sizes, args.alternatives, args.nullable, args.left_recursion,
+                                               [False, True] if args.chain else [False])
+    ]
+    cases = run_suite(param_list, args.inputs, args.repeat, args.timeout, args.seed, print_case, args.length)
+    save_results(cases, args.output)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(load_results(args.output), load_results(args.compare), args.tolerance)
+        if not regressions:
+            print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+            return 0
+        print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+        for name, metric, before, after in regressions:
+            if metric.endswith(':agrees'):
+                print(f"- {name} {metric[:-7]}: sets no longer agree with expt6")
+            elif after is None:
+                print(f"- {name} {metric}: {_fmt(before)} ms -> failed")
+            else:
+                print(f"- {name} {metric}: {_fmt(before)} ms -> {_fmt(after)} ms (+{after / before - 1:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
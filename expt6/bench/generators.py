@@ -0,0 +1,69 @@
+"""Synthetic grammars and inputs of a chosen shape.
+
+generate_grammar() builds a grammar that is productive and reachable from
+its start symbol by construction, so every stage has all of it to work on:
+
+- `nonterminals` heads N0 .. N{n-1} (N0 is the start symbol), each with
+  `alternatives` alternatives of `min_len` .. `max_len` symbols over
+  `terminals` terminals t0 .. t{k-1};
+- every head's first alternative starts with a terminal (productive) and
+  Ni mentions N{i+1} (reachable);
+- a `nullable` fraction of the heads also gets an ε alternative;
+- `left_recursion` = d > 0 puts every d-th head on a left-recursive cycle
+  of length d (d = 1: Ni -> Ni a, d = 2: Ni -> N{i+1} a, N{i+1} -> Ni b, ...);
+- `chain` starts every alternative with a terminal except Ni's last, which
+  starts with N{i+1}, so FIRST(N0) depends on FIRST(N1), which depends on
+  FIRST(N2), ... and FOLLOW runs the other way along the same chain:
+  dependencies as deep as the grammar.
+
+generate_inputs() derives random sentences of a grammar with
+sentences.SentenceGenerator, so they are in its language (and in the
+language of the transformed grammar the LL(1) parser uses).
+"""
+import random
+
+from sentences import SentenceGenerator
+
+
+def generate_grammar(nonterminals=50, alternatives=3, terminals=20, min_len=1, max_len=4,
+                     nullable=0.1, left_recursion=0, chain=False, seed=0):
+    """Return (productions, start_symbol) for the parameters above."""
+    rng = random.Random(seed)
+    heads = [f'N{i}' for i in range(nonterminals)]
+    terms = [f't{i}' for i in range(terminals)]
+
+    def symbol():
+        # mostly terminals, so derivations stay short
+        return rng.choice(heads) if rng.random() < 0.3 else rng.choice(terms)
+
+    productions = {}
+    for i, A in enumerate(heads):
+        alts = []
+        for k in range(alternatives):
+            body = [symbol() for _ in range(rng.randint(min_len, max_len))]
+            if k == 0 or chain:
+                body[0] = rng.choice(terms)
+            alts.append(body)
+        if i + 1 < nonterminals:
+            alts[-1].append(heads[i + 1])
+            if chain:
+                alts[-1].insert(0, heads[i + 1])
+        productions[A] = alts
+    for A in heads:
+        if rng.random() < nullable:
+            productions[A].append(['ε'])
+
+    d = left_recursion
+    if d > 0:
+        for i in range(0, nonterminals - d + 1, max(d, 1) * 2):
+            cycle = heads[i:i + d]
+            for k, A in enumerate(cycle):
+                nxt = cycle[(k + 1) % d]
+                productions[A].append([nxt, rng.choice(terms)])
+    return productions, heads[0]
+
+
+def generate_inputs(productions, start_symbol, count=100, length=40, seed=0):
+    """Return `count` random sentences (token lists) of about `length` tokens from `start_symbol`."""
+    gen = SentenceGenerator(productions, start_symbol, seed=seed)
+    return [gen.sentence(length) for _ in range(count)]
@@ -0,0 +1,311 @@
+"""Time the expt6 stages and the FIRST/FOLLOW engines on generated grammars.
+
+    cases = run_suite([{'nonterminals': 100, 'nullable': 0.2}], inputs=50)
+    save_results(cases, 'bench.json')
+    regressions = compare(load_results('bench.json'), load_results('baseline.json'))
+
+Every case generates one grammar (generators.generate_grammar) and times:
+
+- the expt6 stages: useless, left_recursion, left_factoring, first, follow,
+  table, parse (the generated inputs, parsed without a trace), codegen and
+  parse_generated (the same inputs through the codegen recursive-descent
+  module);
+- every FIRST/FOLLOW engine on the transformed grammar: the three
+  grammarcore engines ('fixpoint', 'bitset', 'numpy' when NumPy is
+  installed) and the teaching front ends of expt4 ('expt4_fixpoint', whose
+  printed steps are discarded) and expt4a_optimized ('expt4_optimized',
+  with its NullSink so no step is formatted).  Each engine result records
+  whether its sets agree with the fixpoint engine.
+
+'expt4_fixpoint' is not the unaided recursion: expt4a.py hands every
+FOLLOW(lhs) and every left-recursive FIRST to the fixpoint passes, whose
+time (once per run) is included.  It measures the traced recursion around
+them.
+
+Times are the minimum over `repeat` runs, in seconds.  An engine that runs
+past `timeout` seconds is recorded as 'timeout', one that raises (the expt4
+front ends recurse once per symbol of a FIRST chain) as 'error'.
+"""
+import importlib.util
+import io
+import json
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import codegen
+import expt6
+import grammarcore
+from testrunner import TestTimeout, time_budget
+
+from .generators import generate_grammar, generate_inputs
+
+EXPT4_DIR = Path(__file__).resolve().parents[2] / 'expt4'
+
+STAGES = ('useless', 'left_recursion', 'left_factoring', 'first', 'follow', 'table', 'parse',
+          'codegen', 'parse_generated')
+
+
+class _NullWriter(io.TextIOBase):
+    """stdout replacement that drops everything (the expt4 calculators print every step)."""
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        return len(s)
+
+
+def _load_module(name, filename):
+    path = EXPT4_DIR / filename
+    if not path.exists():
+        return None
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _expt4_fixpoint_engine(module):
+    def run(productions, start_symbol):
+        first, follow = {}, defaultdict(set)
+        fixpoint = module.fixpoint_sets(productions, start_symbol)
+        for A in productions:
+            module.compute_first(A, productions, first, fixpoint=fixpoint)
+        for A in productions:
+            module.compute_follow(A, productions, first, follow, start_symbol, fixpoint=fixpoint)
+        return first, follow
+    return run
+
+
+def _expt4_optimized_engine(module):
+    def run(productions, start_symbol):
+        calc = module.FirstFollowCalculator(productions, module.NullSink())
+        for A in productions:
+            calc.compute_first(A)
+        for A in productions:
+            calc.compute_follow(A, start_symbol)
+        return calc.first_sets, calc.follow_sets
+    return run
+
+
+def _expt6_engine(name):
+    firsts_fn, follows_fn = grammarcore.FIRST_FOLLOW_ENGINES[name]
+
+    def run(productions, start_symbol):
+        first = firsts_fn(productions)
+        return first, follows_fn(productions, start_symbol, first)
+    return run
+
+
+def available_engines():
+    """name -> run(productions, start_symbol) returning (first, follow)."""
+    engines = {'fixpoint': _expt6_engine('fixpoint'), 'bitset': _expt6_engine('bitset')}
+    if importlib.util.find_spec('numpy') is not None:
+        engines['numpy'] = _expt6_engine('numpy')
+    module = _load_module('expt4a', 'expt4a.py')
+    if module is not None:
+        engines['expt4_fixpoint'] = _expt4_fixpoint_engine(module)
+    module = _load_module('expt4a_optimized', 'expt4a_optimized.py')
+    if module is not None:
+        engines['expt4_optimized'] = _expt4_optimized_engine(module)
+    return engines
+
+
+def _best_of(repeat, fn):
+    best, value = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+def grammar_stats(productions):
+    terminals = grammarcore.terminals_from_productions(productions)
+    return {
+        'nonterminals': len(productions),
+        'terminals': len(terminals),
+        'productions': sum(len(alts) for alts in productions.values()),
+        'symbols': sum(len(p) for alts in productions.values() for p in alts),
+    }
+
+
+def time_stages(productions, start_symbol, sentences, repeat=3):
+    """Seconds per expt6 stage; returns (stages, analysis pieces, parse summary)."""
+    stages = {}
+    stages['useless'], (reduced, _) = _best_of(repeat, lambda: grammarcore.remove_useless_symbols(productions, start_symbol))
+    stages['left_recursion'], (lr, _) = _best_of(repeat, lambda: grammarcore.remove_left_recursion(reduced))
+    stages['left_factoring'], (factored, _) = _best_of(repeat, lambda: grammarcore.left_factor(lr))
+    stages['first'], first = _best_of(repeat, lambda: grammarcore.compute_all_firsts(factored))
+    stages['follow'], follow = _best_of(repeat, lambda: grammarcore.compute_all_follows(factored, start_symbol, first))
+    stages['table'], (table, conflicts, _) = _best_of(repeat, lambda: grammarcore.construct_table(factored, first, follow))
+
+    def parse_all():
+        return sum(1 for s in sentences if expt6.predictive_parse(s, start_symbol, table, trace=None))
+    stages['parse'], accepted = _best_of(repeat, parse_all)
+
+    stages['codegen'], generated = _best_of(repeat, lambda: codegen.build_parser(factored, table, start_symbol))
+    stages['parse_generated'], generated_accepted = _best_of(
+        repeat, lambda: sum(1 for s in sentences if generated.parse(s)))
+    parse = {
+        'inputs': len(sentences),
+        'tokens': sum(len(s) for s in sentences),
+        'accepted': accepted,
+        'generated_accepted': generated_accepted,
+        'conflicts': len(conflicts),
+    }
+    return stages, factored, first, follow, parse
+
+
+def _agrees(result, first, follow, nonterminals):
+    r_first, r_follow = result
+    return all(set(r_first.get(A, ())) == set(first[A]) and set(r_follow.get(A, ())) == set(follow[A])
+               for A in nonterminals)
+
+
+def time_engines(productions, start_symbol, first, follow, engines=None, repeat=3, timeout=10.0):
+    """Time each engine on `productions`; `first`/`follow` are the reference sets."""
+    engines = available_engines() if engines is None else engines
+    results = {}
+    for name, run in engines.items():
+        entry = {'status': 'ok', 'seconds': None, 'agrees': None}
+        try:
+            with redirect_stdout(_NullWriter()), time_budget(timeout):
+                entry['seconds'], result = _best_of(repeat, lambda: run(productions, start_symbol))
+            entry['agrees'] = _agrees(result, first, follow, productions)
+        except TestTimeout:
+            entry['status'] = 'timeout'
+        except (RecursionError, ImportError) as exc:
+            entry['status'] = 'error'
+            entry['message'] = f"{type(exc).__name__}: {exc}"
+        results[name] = entry
+    return results
+
+
+def run_case(params, inputs=50, repeat=3, timeout=10.0, engines=None, seed=0, length=40):
+    """Benchmark one grammar from `params` (generate_grammar keywords) on `inputs` sentences of about `length` tokens.
+
+    The stages together get `timeout` seconds, like each engine; past that
+    (left-recursion removal can blow up, and the parse never ends on
+    hidden left recursion) the case has status 'timeout' and no times.
+    """
+    params = dict(params)
+    params.setdefault('seed', seed)
+    productions, start_symbol = generate_grammar(**params)
+    sentences = generate_inputs(productions, start_symbol, count=inputs, length=length, seed=params['seed'])
+    case = {
+        'name': case_name(params),
+        'params': params,
+        'status': 'ok',
+        'grammar': grammar_stats(productions),
+    }
+    try:
+        with time_budget(timeout):
+            stages, factored, first, follow, parse = time_stages(productions, start_symbol, sentences, repeat)
+    except TestTimeout:
+        case.update(status='timeout', transformed=None, stages={}, parse=None, engines={})
+        return case
+    case.update(transformed=grammar_stats(factored), stages=stages, parse=parse,
+                engines=time_engines(factored, start_symbol, first, follow, engines, repeat, timeout))
+    return case
+
+
+def case_name(params):
+    name = 'n{nonterminals}-a{alternatives}-e{nullable}-lr{left_recursion}'.format(**{
+        'nonterminals': 50, 'alternatives': 3, 'nullable': 0.1, 'left_recursion': 0, **params})
+    return name + '-chain' if params.get('chain') else name
+
+
+def run_suite(param_list, inputs=50, repeat=3, timeout=10.0, seed=0, progress=None, length=40):
+    """Benchmark every parameter dict; `progress(case)` is called after each case.
+
+    An engine that timed out is recorded as 'skipped' for the following
+    cases with at least as many non-terminals (the recursive expt4
+    calculators blow up quickly).
+    """
+    engines = available_engines()
+    gave_up = {}  # engine -> smallest non-terminal count it timed out on
+    cases = []
+    for params in param_list:
+        size = params.get('nonterminals', 50)
+        active = {name: run for name, run in engines.items() if size < gave_up.get(name, float('inf'))}
+        case = run_case(params, inputs, repeat, timeout, active, seed, length)
+        for name in engines:
+            entry = case['engines'].get(name)
+            if entry is None:
+                case['engines'][name] = {'status': 'skipped', 'seconds': None, 'agrees': None}
+            elif entry['status'] == 'timeout':
+                gave_up[name] = min(size, gave_up.get(name, size))
+        cases.append(case)
+        if progress:
+            progress(case)
+    return cases
+
+
+def save_results(cases, path):
+    data = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'argv': sys.argv[1:],
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'cases': cases,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _metrics(case):
+    for stage, seconds in case['stages'].items():
+        yield f"stage:{stage}", seconds
+    for engine, entry in case['engines'].items():
+        yield f"engine:{engine}", entry['seconds']
+
+
+def compare(current, baseline, tolerance=0.25, min_seconds=0.0005):
+    """Return the regressions of `current` against `baseline` (both load_results() data).
+
+    A metric regresses when it is more than `tolerance` (a fraction) slower
+    than the baseline and at least `min_seconds` slower, so timer noise on
+    tiny stages is not reported; a case or engine that now times out or
+    fails, or an engine that no longer agrees with the reference sets,
+    always regresses.
+    Cases are matched by name; cases missing from either side are skipped.
+    Each regression is (case, metric, baseline, current).
+    """
+    base_cases = {c['name']: c for c in baseline['cases']}
+    regressions = []
+    for case in current['cases']:
+        base = base_cases.get(case['name'])
+        if base is None:
+            continue
+        old = dict(_metrics(base))
+        for metric, seconds in _metrics(case):
+            before = old.get(metric)
+            if before is None:
+                continue
+            if seconds is None:
+                regressions.append((case['name'], metric, before, None))
+            elif seconds > before * (1 + tolerance) and seconds - before >= min_seconds:
+                regressions.append((case['name'], metric, before, seconds))
+        if case.get('status') == 'timeout' and base.get('status', 'ok') == 'ok':
+            regressions.append((case['name'], 'stages', sum(base['stages'].values()), None))
+        for engine, entry in case['engines'].items():
+            was = base['engines'].get(engine)
+            if was and was.get('agrees') and entry.get('agrees') is False:
+                regressions.append((case['name'], f"engine:{engine}:agrees", True, False))
+    return regressions
@@ -0,0 +1,267 @@
+"""Generate a recursive-descent Python module from an LL(1) table.
+
+    source = generate_module(analysis.productions, analysis.table, start_symbol)
+    parser = build_parser(analysis.productions, analysis.table, start_symbol)   # in memory
+    parser.parse(['id', '+', 'id'])          # ParseResult, like predictive_parse
+    parser = load_parser(analysis.productions, analysis.table, start_symbol, 'out/expr_lr_ll1.py')
+
+The generated module has one function per non-terminal that branches on
+the lookahead with plain comparisons (`tok == 'id'`, `tok in _F2`) and
+calls the functions of the non-terminals in the chosen production
+directly, so no stack of symbols and no table lookups are left at parse
+time.  A production that ends with its own non-terminal (A -> α A, what
+left-recursion removal produces) becomes a loop instead of a call.  A
+module written to disk only needs the standard library:
+
+    import expr_lr_ll1
+    expr_lr_ll1.accepts(['id', '*', 'id'])   # True
+    expr_lr_ll1.parse(tokens)                # raises expr_lr_ll1.ParseError(pos, token, expected)
+
+It accepts and rejects exactly what predictive_parse does with the same
+table, with the same error position, token and expected terminals.
+
+build_parser() compiles the module in memory and writes nothing.
+load_parser() writes it to a path of the caller's choosing once and reuses
+it while the grammar, the table and this generator stay the same (the file
+records a key of all three).  A GeneratedParser falls back to predictive_parse when a trace or
+a tree is asked for, and when the input nests deeper than Python's
+recursion limit.
+"""
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+
+import expt6
+from grammarcore import format_productions
+
+_KEY_PREFIX = '# key: '
+
+
+def module_key(productions, table, start_symbol):
+    """sha256 of the generator source, the grammar and the table."""
+    h = hashlib.sha256()
+    with open(__file__, 'rb') as f:
+        h.update(f.read())
+    h.update(b'\0' + start_symbol.encode('utf-8') + b'\0')
+    h.update(format_productions(productions).encode('utf-8'))
+    for (A, t), prod in sorted(table.items(), key=lambda item: item[0]):
+        h.update(f"\0{A}\0{t}\0{' '.join(prod)}".encode('utf-8'))
+    return h.hexdigest()
+
+
+def _identifiers(nonterminals):
+    names = {}
+    used = set()
+    for A in nonterminals:
+        base = 'p_' + re.sub(r'\W', '_', A)
+        name = base
+        n = 1
+        while name in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name)
+        names[A] = name
+    return names
+
+
+def generate_module(productions, table, start_symbol, title=None):
+    """Return the source of the recursive-descent module for this table."""
+    names = _identifiers(productions)
+    consts = []  # module-level sets / tuples, emitted before the functions
+    const_ids = {}
+
+    def const(value):
+        name = const_ids.get(value)
+        if name is None:
+            prefix = '_F' if isinstance(value, frozenset) else '_E'
+            name = const_ids[value] = f"{prefix}{len(consts)}"
+            text = ('frozenset({' + ', '.join(repr(t) for t in sorted(value)) + '})'
+                    if isinstance(value, frozenset) else repr(value))
+            consts.append(f"{name} = {text}")
+        return name
+
+    funcs = []
+    for A, alts in productions.items():
+        # lookaheads per production, in production order (table values are the production lists)
+        by_prod = {}
+        for (head, t), prod in table.items():
+            if head == A:
+                by_prod.setdefault(tuple(prod), []).append(t)
+        branches = []
+        for prod in alts:
+            terms = by_prod.pop(tuple(prod), None)
+            if terms:
+                branches.append((prod, terms))
+        loop = any(prod and prod[-1] == A and prod != ['ε'] for prod, _ in branches)
+        pad = '        ' if loop else '    '
+        lines = [f"def {names[A]}(t, i):  # {A}"]
+        if loop:
+            lines.append('    while True:')
+        lines.append(pad + 'tok = t[i]')
+        for prod, terms in branches:
+            cond = f"tok == {terms[0]!r}" if len(terms) == 1 else f"tok in {const(frozenset(terms))}"
+            lines.append(f"{pad}if {cond}:  # {A} -> {' '.join(prod)}")
+            syms = [] if prod == ['ε'] else list(prod)
+            tail = loop and syms and syms[-1] == A
+            if tail:
+                syms.pop()
+            for k, s in enumerate(syms):
+                if s in productions:
+                    lines.append(f"{pad}    i = {names[s]}(t, i)")
+                elif k == 0 and terms == [s]:
+                    # chosen on this very lookahead
+                    lines.append(f"{pad}    i += 1")
+                else:
+                    lines.append(f"{pad}    if t[i] != {s!r}:")
+                    lines.append(f"{pad}        raise _Reject(i, {const((s,))})")
+                    lines.append(f"{pad}    i += 1")
+            lines.append(f"{pad}    {'continue' if tail else 'return i'}")
+        lines.append(f"{pad}raise _Reject(i, {const(tuple(expt6.expected_terminals(table, A)))})")
+        funcs.append('\n'.join(lines))
+
+    start = names[start_symbol]
+    header = f'''"""Recursive-descent parser for {title or 'a grammar'} (start symbol {start_symbol}).
+
+Generated by codegen.py from its LL(1) table; do not edit, it is rewritten
+when the grammar changes.  parse(tokens) raises ParseError for a token
+list that is not a sentence, accepts(tokens) returns a bool.
+"""
+
+
+class ParseError(Exception):
+    def __init__(self, pos, token, expected):
+        super().__init__(f"unexpected {{token!r}} at token {{pos}}; expected one of: {{', '.join(expected)}}")
+        self.pos = pos
+        self.token = token
+        self.expected = expected
+
+
+class _Reject(Exception):
+    def __init__(self, pos, expected):
+        self.pos = pos
+        self.expected = expected
+'''
+    footer = f'''
+
+def parse(tokens):
+    t = list(tokens)
+    t.append('$')
+    try:
+        i = {start}(t, 0)
+    except _Reject as e:
+        raise ParseError(e.pos, t[e.pos], list(e.expected)) from None
+    if t[i] != '$':
+        raise ParseError(i, t[i], ['$'])
+
+
+def accepts(tokens):
+    try:
+        parse(tokens)
+    except ParseError:
+        return False
+    return True
+'''
+    parts = [header.rstrip('\n'), '\n'.join(consts), '\n\n\n'.join(funcs)]
+    return '\n\n\n'.join(p for p in parts if p) + '\n' + footer
+
+
+def _load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def compile_module(source, name='generated_parser'):
+    """Execute generated source as a new module object (nothing is written)."""
+    module = type(sys)(name)
+    exec(compile(source, f"<{name}>", 'exec'), module.__dict__)
+    return module
+
+
+def module_path(directory, grammar_path, block=None):
+    """`directory`/<grammar>_ll1.py: the module of a grammar file (or of one block of a multi-test file)."""
+    stem = os.path.splitext(os.path.basename(grammar_path))[0]
+    if block:
+        stem += '_' + block
+    stem = re.sub(r'\W', '_', stem)
+    if not stem[:1].isalpha():
+        stem = 'g_' + stem
+    return os.path.join(directory, stem + '_ll1.py')
+
+
+def _cached_key(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            first = f.readline()
+    except OSError:
+        return None
+    return first[len(_KEY_PREFIX):].strip() if first.startswith(_KEY_PREFIX) else None
+
+
+def build_parser(productions, table, start_symbol):
+    """Return a GeneratedParser whose module is compiled in memory."""
+    source = generate_module(productions, table, start_symbol)
+    return GeneratedParser(compile_module(source), table, start_symbol, generated=True, source=source)
+
+
+def load_parser(productions, table, start_symbol, path):
+    """Return a GeneratedParser, writing the module to `path` unless it is up to date."""
+    key = module_key(productions, table, start_symbol)
+    generated = _cached_key(path) != key
+    if generated:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        source = generate_module(productions, table, start_symbol, os.path.basename(path))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(_KEY_PREFIX + key + '\n')
+            f.write(source)
+        os.replace(tmp, path)
+    module = _load_module(path, os.path.splitext(os.path.basename(path))[0])
+    return GeneratedParser(module, table, start_symbol, path, generated)
+
+
+class GeneratedParser:
+    """A generated module used where run_parse / BatchParser expect a table with parse().
+
+    `path` is the file the module was loaded from, or None when it was
+    compiled in memory from `source`.
+    """
+
+    def __init__(self, module, table, start_symbol, path=None, generated=False, source=None):
+        self.module = module
+        self.table = table
+        self.start_symbol = start_symbol
+        self.path = path
+        self.generated = generated
+        self.source = source
+
+    def __getstate__(self):
+        # modules do not pickle (BatchParser workers): reload from the file or the source
+        state = dict(self.__dict__)
+        state['module'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path is None:
+            self.module = compile_module(self.source)
+        else:
+            self.module = _load_module(self.path, os.path.splitext(os.path.basename(self.path))[0])
+
+    def parse(self, source, trace=None, build_tree=False):
+        """Parse a string (tokenize()), token list or iterable; returns a ParseResult."""
+        if trace is not None or build_tree:
+            return expt6.predictive_parse(source, self.start_symbol, self.table, trace, build_tree)
+        tokens = expt6.tokenize(source) if isinstance(source, str) else list(source)
+        try:
+            self.module.parse(tokens)
+        except self.module.ParseError as e:
+            return expt6.ParseResult(False, e.pos, e.token, e.expected)
+        except RecursionError:
+            return expt6.predictive_parse(tokens, self.start_symbol, self.table, trace=None)
+        return expt6.ParseResult(True)
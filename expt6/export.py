@@ -0,0 +1,131 @@
+"""Machine-readable FIRST, FOLLOW and LL(1) table of a GrammarAnalysis (--export).
+
+    export_analysis(analysis, 'expr.csv')                 # format from the extension
+    export_analysis(analysis, 'expr.out', 'json', rows=['E', "E'"])
+
+The table is written sparse: one record per filled cell, never the empty
+(non-terminal, terminal) pairs that make up most of a large grid.  The
+table is indexed by non-terminal once (the terminals of each row, no
+copies of the productions) and records are written one row at a time as
+they are produced, so no formatted output is held in memory.
+
+- csv: `section,nonterminal,symbol,production` rows; section is `first`,
+  `follow` (one row per symbol, production empty) or `table` (symbol is
+  the terminal, production the right-hand side joined by spaces).
+- json: `{"start": ..., "first": {A: [...]}, "follow": {A: [...]},
+  "table": [{"nonterminal", "terminal", "production"}], "conflicts": [...]}`,
+  productions as lists of symbols.
+- md: a FIRST/FOLLOW table and a (non-terminal, terminal, production)
+  table of the filled cells.
+"""
+import csv
+import json
+import os
+
+from expt6 import selected_nonterminals
+from grammarcore import PROD_ARROW
+
+FORMATS = ('csv', 'json', 'md')
+
+_EXTENSIONS = {'.csv': 'csv', '.json': 'json', '.md': 'md', '.markdown': 'md'}
+
+
+def export_format(path, fmt=None):
+    """`fmt`, or the format the extension of `path` names; ValueError when neither says."""
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format {fmt!r} (choose from {', '.join(FORMATS)})")
+        return fmt
+    fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"cannot tell the export format of {path!r}; use a .csv, .json or .md name or --export-format")
+    return fmt
+
+
+def table_rows(table, nonterminals):
+    """Yield (A, [(terminal, production)] sorted by terminal) for each of `nonterminals`, in order."""
+    terminals = {A: [] for A in nonterminals}
+    for A, t in table:
+        row = terminals.get(A)
+        if row is not None:
+            row.append(t)
+    for A in nonterminals:
+        row = terminals.pop(A)
+        row.sort()
+        yield A, [(t, table[A, t]) for t in row]
+
+
+def write_csv(analysis, f, nonterminals):
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(['section', 'nonterminal', 'symbol', 'production'])
+    for section, sets in (('first', analysis.first), ('follow', analysis.follow)):
+        for A in nonterminals:
+            writer.writerows((section, A, s, '') for s in sorted(sets.get(A, ())))
+    for A, row in table_rows(analysis.table, nonterminals):
+        writer.writerows(('table', A, t, ' '.join(prod)) for t, prod in row)
+
+
+def write_json(analysis, f, nonterminals):
+    dumps = json.dumps
+    f.write('{\n  "start": ' + dumps(analysis.start_symbol))
+    for section, sets in (('first', analysis.first), ('follow', analysis.follow)):
+        f.write(f',\n  "{section}": {{')
+        sep = '\n'
+        for A in nonterminals:
+            f.write(f"{sep}    {dumps(A)}: {dumps(sorted(sets.get(A, ())))}")
+            sep = ',\n'
+        f.write('\n  }')
+    f.write(',\n  "table": [')
+    sep = '\n'
+    for A, row in table_rows(analysis.table, nonterminals):
+        for t, prod in row:
+            f.write(sep + '    ' + dumps({'nonterminal': A, 'terminal': t, 'production': list(prod)}))
+            sep = ',\n'
+    f.write('\n  ],\n  "conflicts": [')
+    sep = '\n'
+    wanted = set(nonterminals)
+    for (A, t, existing, _, new, _) in analysis.conflicts:
+        if A in wanted:
+            f.write(sep + '    ' + dumps({'nonterminal': A, 'terminal': t,
+                                         'existing': list(existing), 'new': list(new)}))
+            sep = ',\n'
+    f.write('\n  ]\n}\n')
+
+
+def _md(text):
+    return text.replace('|', '\\|')
+
+
+def write_markdown(analysis, f, nonterminals):
+    f.write(f"# LL(1) analysis (start symbol `{_md(analysis.start_symbol)}`)\n\n")
+    f.write('## FIRST and FOLLOW\n\n| Non-terminal | FIRST | FOLLOW |\n|---|---|---|\n')
+    for A in nonterminals:
+        first = ', '.join(sorted(analysis.first.get(A, ())))
+        follow = ', '.join(sorted(analysis.follow.get(A, ())))
+        f.write(f"| {_md(A)} | {_md(first)} | {_md(follow)} |\n")
+    f.write('\n## Parsing table\n\n| Non-terminal | Terminal | Production |\n|---|---|---|\n')
+    for A, row in table_rows(analysis.table, nonterminals):
+        for t, prod in row:
+            f.write(f"| {_md(A)} | {_md(t)} | {_md(f'{A} {PROD_ARROW} ' + ' '.join(prod))} |\n")
+    wanted = set(nonterminals)
+    conflicts = [c for c in analysis.conflicts if c[0] in wanted]
+    if conflicts:
+        f.write('\n## Conflicts\n\n| Non-terminal | Terminal | Existing | New |\n|---|---|---|---|\n')
+        for (A, t, existing, _, new, _) in conflicts:
+            f.write(f"| {_md(A)} | {_md(t)} | {_md(' '.join(existing))} | {_md(' '.join(new))} |\n")
+
+
+WRITERS = {'csv': write_csv, 'json': write_json, 'md': write_markdown}
+
+
+def export_analysis(analysis, path, fmt=None, rows=None):
+    """Write FIRST, FOLLOW and the filled table cells of `analysis` to `path`.
+
+    `rows` limits the export to those non-terminals.  Returns the format
+    written.
+    """
+    fmt = export_format(path, fmt)
+    nonterminals = selected_nonterminals(analysis.productions, rows)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        WRITERS[fmt](analysis, f, nonterminals)
+    return fmt
@@ -1,325 +1,693 @@
 # Predictive Parser Implementation in Python
-PROD_ARROW = '⇒'  # arrow used when printing productions
-
-# Function to compute FIRST sets
-def compute_first(symbol, productions, first):
-    # If it's the epsilon symbol
-    if symbol == 'ε':
-        return {'ε'}
-    # If symbol is not a non-terminal (i.e. not a key in productions), it's a terminal
-    if symbol not in productions:
-        return {symbol}
-    result = set()
-    for prod in productions.get(symbol, []):
-        # prod is a list of symbols
-        if len(prod) == 1 and prod[0] == 'ε':
-            result.add('ε')
-        else:
-            for s in prod:
-                temp = compute_first(s, productions, first)
-                result |= (temp - {'ε'})
-                if 'ε' not in temp:
-                    break
-            else:
-                result.add('ε')
-    return result
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from collections import deque
+from itertools import repeat
+
+# The grammar analysis (FIRST/FOLLOW, transformations, the table) is the
+# grammarcore package in the folder above, shared with expt4 and expt5.
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+# The helper modules (batch, lalr, grammar_cache, ...) `import expt6`; when this
+# file runs as a script that has to be this module, not a second copy of it.
+if __name__ == '__main__':
+    sys.modules.setdefault('expt6', sys.modules[__name__])
+
+from grammarcore import perfstats  # noqa: E402
+from grammarcore.first_follow import (  # noqa: E402,F401
+    EPS_BIT,
+    FIRST_FOLLOW_ENGINES,
+    compute_all_firsts,
+    compute_all_firsts_bitset,
+    compute_all_firsts_numpy,
+    compute_all_follows,
+    compute_all_follows_bitset,
+    compute_all_follows_numpy,
+    compute_first,
+    compute_first_masks,
+    compute_follow,
+    compute_follow_masks,
+    intern_terminals,
+    mask_to_set,
+    nullable_nonterminals,
+    suffix_firsts,
+)
+from grammarcore.grammar import PROD_ARROW, format_productions, terminals_from_productions  # noqa: E402,F401
+from grammarcore.loader import load_grammar_file, load_test_blocks  # noqa: E402
+from grammarcore.table import construct_table  # noqa: E402,F401
+from grammarcore.transform import left_factor, remove_left_recursion, remove_useless_symbols  # noqa: E402,F401
 
 
-def compute_all_firsts(productions):
-    """Compute FIRST sets for all non-terminals using an iterative fixpoint algorithm.
+def pretty_sym(sym):
+    # Print symbols as-is; epsilon remains the character 'ε'
+    return sym
 
-    This is safer than naive recursion for grammars with left recursion.
-    """
-    first = {nt: set() for nt in productions}
-    changed = True
-    while changed:
-        changed = False
-        for head, prods in productions.items():
-            for prod in prods:
-                # epsilon production
-                if len(prod) == 1 and prod[0] == 'ε':
-                    if 'ε' not in first[head]:
-                        first[head].add('ε')
-                        changed = True
-                    continue
 
-                # walk symbols in RHS
-                all_eps = True
-                for sym in prod:
-                    if sym not in productions:
-                        # terminal
-                        if sym not in first[head]:
-                            first[head].add(sym)
-                            changed = True
-                        all_eps = False
-                        break
-                    else:
-                        # non-terminal: add FIRST(sym) minus epsilon
-                        before = len(first[head])
-                        to_add = first[sym] - {'ε'}
-                        if to_add - first[head]:
-                            first[head] |= to_add
-                            changed = True
-                        if 'ε' in first[sym]:
-                            # sym can produce epsilon; continue to next symbol
-                            continue
-                        else:
-                            all_eps = False
-                            break
-
-                if all_eps:
-                    # all symbols can derive epsilon
-                    if 'ε' not in first[head]:
-                        first[head].add('ε')
-                        changed = True
-
-    return first
-
-# Function to compute FOLLOW sets
-def compute_follow(symbol, productions, start_symbol, first, follow):
-    if symbol not in follow:
-        follow[symbol] = set()
-    if symbol == start_symbol:
-        follow[symbol].add('$')
-    for head, prods in productions.items():
-        for prod in prods:
-            for i, s in enumerate(prod):
-                if s == symbol:
-                    rest = prod[i+1:]
-                    temp = set()
-                    if rest:
-                        for r in rest:
-                            # if r has a FIRST set use it; otherwise r is a terminal
-                            if r in first:
-                                temp |= (first[r] - {'ε'})
-                                if 'ε' not in first[r]:
-                                    break
-                            else:
-                                temp |= {r}
-                                break
-                        else:
-                            temp |= follow.get(head, set())
-                    else:
-                        temp |= follow.get(head, set())
-                    follow[symbol] |= temp
-    return follow
-
-# Function to construct predictive parsing table
-def construct_table(productions, first, follow):
-    table = {}
-    origins = {}  # map (A, t) -> "A -> ..." string that added the entry
-    conflicts = []
-    for head, prods in productions.items():
-        for prod in prods:
-            prod_str = ' '.join(prod)
-            first_set = set()
-            if not (len(prod) == 1 and prod[0] == 'ε'):
-                for s in prod:
-                    if s in first:
-                        first_set |= (first[s] - {'ε'})
-                        if 'ε' not in first[s]:
-                            break
-                    else:
-                        # s is a terminal
-                        first_set |= {s}
-                        break
-                else:
-                    first_set.add('ε')
-            else:
-                first_set.add('ε')
-
-            for terminal in first_set - {'ε'}:
-                key = (head, terminal)
-                if key in table and table[key] != prod:
-                    conflicts.append((head, terminal, table[key], origins.get(key, ''), prod, f"{head} {PROD_ARROW} {prod_str}"))
-                else:
-                    table[key] = prod
-                    origins[key] = f"{head} {PROD_ARROW} {prod_str}"
-
-            if 'ε' in first_set:
-                for terminal in follow.get(head, set()):
-                    key = (head, terminal)
-                    if key in table and table[key] != prod:
-                        conflicts.append((head, terminal, table[key], origins.get(key, ''), prod, f"{head} {PROD_ARROW} {prod_str}"))
-                    else:
-                        table[key] = prod
-                        origins[key] = f"{head} {PROD_ARROW} {prod_str}"
-
-    return table, conflicts, origins
-
-
-def compute_all_follows(productions, start_symbol, first):
-    """Compute FOLLOW sets using an iterative fixpoint algorithm."""
-    follow = {nt: set() for nt in productions}
-    follow[start_symbol].add('$')
-    changed = True
-    while changed:
-        changed = False
-        for head, prods in productions.items():
-            for prod in prods:
-                for i, B in enumerate(prod):
-                    if B not in productions:
-                        continue
-                    # rest of symbols after B
-                    rest = prod[i+1:]
-                    # compute FIRST(rest)
-                    first_rest = set()
-                    if not rest:
-                        # add follow(head) to follow(B)
-                        before = len(follow[B])
-                        follow[B] |= follow[head]
-                        if len(follow[B]) != before:
-                            changed = True
-                    else:
-                        add_follow_head = True
-                        for sym in rest:
-                            if sym in first:
-                                before = len(follow[B])
-                                follow[B] |= (first[sym] - {'ε'})
-                                if len(follow[B]) != before:
-                                    changed = True
-                                if 'ε' in first[sym]:
-                                    # continue to next symbol
-                                    continue
-                                else:
-                                    add_follow_head = False
-                                    break
-                            else:
-                                # sym is terminal
-                                before = len(follow[B])
-                                follow[B].add(sym)
-                                if len(follow[B]) != before:
-                                    changed = True
-                                add_follow_head = False
-                                break
-                        if add_follow_head:
-                            before = len(follow[B])
-                            follow[B] |= follow[head]
-                            if len(follow[B]) != before:
-                                changed = True
-    return follow
-
-
-def terminals_from_productions(productions):
-    terms = set()
-    nonterms = set(productions.keys())
-    for rhs in productions.values():
-        for prod in rhs:
-            for sym in prod:
-                if sym == 'ε':
-                    continue
-                if sym not in nonterms:
-                    terms.add(sym)
-    return sorted(terms)
+def selected_nonterminals(productions, rows=None):
+    """Non-terminals of `productions` in grammar order, only those in `rows` when given."""
+    if not rows:
+        return list(productions)
+    wanted = set(rows)
+    return [nt for nt in productions if nt in wanted]
 
 
-def pretty_sym(sym):
-    # Print symbols as-is; epsilon remains the character 'ε'
-    return sym
+def write_lines(lines, out=None, chunk=4096):
+    """Write an iterable of lines to `out` (default: sys.stdout) a few thousand at a time."""
+    out = out or sys.stdout
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= chunk:
+            batch.append('')
+            out.write('\n'.join(batch))
+            batch = []
+    if batch:
+        batch.append('')
+        out.write('\n'.join(batch))
+
 
+def print_firsts_and_follows(productions, first, follow, rows=None, out=None):
+    """Print FIRST and FOLLOW of every non-terminal (only those in `rows` when given).
 
-def print_firsts_and_follows(productions, first, follow):
-    nonterms = list(productions.keys())
-    print('\nCalculated firsts:')
-    for nt in nonterms:
-        print(f"first({nt}) => {{{', '.join(sorted(first.get(nt, set())) )}}}")
-
-    print('\nCalculated follows:')
-    for nt in nonterms:
-        print(f"follow({nt}) => {{{', '.join(sorted(follow.get(nt, set())) )}}}")
-
-    # Nicely formatted table
-    print('\nFirsts and Follow Result table\n')
-    # prepare column widths
-    col1 = max(6, max(len(nt) for nt in nonterms)) + 2
-    col2 = max(10, max(len(str(sorted(first.get(nt, set())))) for nt in nonterms) ) + 4
-    col3 = max(10, max(len(str(sorted(follow.get(nt, set())))) for nt in nonterms) ) + 4
-    # header
-    print(f"{ 'Non-T':<{col1}}{ 'FIRST':<{col2}}{ 'FOLLOW':<{col3}}")
-    for nt in nonterms:
-        fset = sorted(first.get(nt, set()))
-        foset = sorted(follow.get(nt, set()))
-        print(f"{nt:<{col1}}{str(fset):<{col2}}{str(foset):<{col3}}")
-
-
-def print_parsing_table(productions, table):
-    nonterms = list(productions.keys())
+    Each set is sorted and formatted once and the text goes to `out` in
+    large pieces.
+    """
+    nonterms = selected_nonterminals(productions, rows)
+    firsts = [sorted(first.get(nt, ())) for nt in nonterms]
+    follows = [sorted(follow.get(nt, ())) for nt in nonterms]
+    first_cells = [str(f) for f in firsts]
+    follow_cells = [str(f) for f in follows]
+
+    def lines():
+        yield '\nCalculated firsts:'
+        for nt, f in zip(nonterms, firsts):
+            yield f"first({nt}) => {{{', '.join(f)}}}"
+        yield '\nCalculated follows:'
+        for nt, f in zip(nonterms, follows):
+            yield f"follow({nt}) => {{{', '.join(f)}}}"
+
+        # Nicely formatted table
+        yield '\nFirsts and Follow Result table\n'
+        col1 = max(6, max(map(len, nonterms), default=0)) + 2
+        col2 = max(10, max(map(len, first_cells), default=0)) + 4
+        col3 = max(10, max(map(len, follow_cells), default=0)) + 4
+        yield f"{'Non-T':<{col1}}{'FIRST':<{col2}}{'FOLLOW':<{col3}}"
+        for nt, fc, foc in zip(nonterms, first_cells, follow_cells):
+            yield f"{nt:<{col1}}{fc:<{col2}}{foc:<{col3}}"
+
+    write_lines(lines(), out)
+
+
+def print_parsing_table(productions, table, rows=None, out=None):
+    """Print the parsing table grid (only the rows of `rows` when given).
+
+    The filled cells are formatted once, straight from the table, and the
+    grid goes to `out` in large pieces.
+    """
+    nonterms = selected_nonterminals(productions, rows)
     terms = terminals_from_productions(productions)
     # include $ and ensure unique & keep order
     if '$' not in terms:
         terms = terms + ['$']
-    # compute column widths based on content
-    col_widths = {}
-    # header widths
-    col_widths['nonterm'] = max(6, max(len(nt) for nt in nonterms)) + 2
-    for t in terms:
-        max_cell = len(t)
+    column = {t: i for i, t in enumerate(terms)}
+    cells = {A: {} for A in nonterms}
+    for (A, t), prod in table.items():
+        row = cells.get(A)
+        if row is not None and t in column:
+            row[t] = f"{A} {PROD_ARROW} {' '.join(pretty_sym(s) for s in prod)}"
+    # column widths based on content
+    widths = [len(t) for t in terms]
+    for row in cells.values():
+        for t, cell in row.items():
+            i = column[t]
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
+    widths = [w + 2 for w in widths]
+    blanks = [' ' * w for w in widths]
+    first_col = max(6, max(map(len, nonterms), default=0)) + 2
+
+    def lines():
+        yield '\nGenerated parsing table:\n'
+        yield ' ' * first_col + ''.join(t.ljust(w) for t, w in zip(terms, widths))
         for A in nonterms:
-            if (A, t) in table:
-                prod = table[(A, t)]
-                cell = f"{A} {PROD_ARROW} {' '.join(pretty_sym(s) for s in prod)}"
-                max_cell = max(max_cell, len(cell))
-        col_widths[t] = max_cell + 2
-
-    # print header
-    header = f"{'' :<{col_widths['nonterm']}}"
-    for t in terms:
-        header += f"{t:<{col_widths[t]}}"
-    print('\nGenerated parsing table:\n')
-    print(header)
-    # print rows
-    for A in nonterms:
-        row = f"{A:<{col_widths['nonterm']}}"
-        for t in terms:
-            cell = ''
-            if (A, t) in table:
-                prod = table[(A, t)]
-                cell = f"{A} {PROD_ARROW} {' '.join(pretty_sym(s) for s in prod)}"
-            row += f"{cell:<{col_widths[t]}}"
-        print(row)
+            row = cells[A]
+            if not row:
+                yield A.ljust(first_col) + ''.join(blanks)
+                continue
+            yield A.ljust(first_col) + ''.join(row[t].ljust(w) if t in row else b
+                                               for t, w, b in zip(terms, widths, blanks))
+
+    write_lines(lines(), out)
+
+
+# ---------------------------------------------------------------------------
+# Parse results and trace sinks
+# ---------------------------------------------------------------------------
+
+class ParseResult:
+    """Outcome of a parse.  Truthy when the input was accepted.
+
+    error_pos is the index of the offending token (the end marker counts as
+    position len(tokens)), error_token the token itself and expected the
+    sorted terminals that would have been accepted there.  steps is the
+    number of parser steps taken (None when the parser does not count them).
+    tree is the ParseTree of an accepted input when one was asked for.
+    errors lists (error_pos, error_token, expected) for every error found
+    when the parser recovered from errors (the first one is also in the
+    fields above), and is empty otherwise.
+    """
+    __slots__ = ('accepted', 'error_pos', 'error_token', 'expected', 'steps', 'tree', 'errors')
+
+    def __init__(self, accepted, error_pos=None, error_token=None, expected=(), steps=None, tree=None, errors=()):
+        self.accepted = accepted
+        self.error_pos = error_pos
+        self.error_token = error_token
+        self.expected = list(expected)
+        self.steps = steps
+        self.tree = tree
+        self.errors = list(errors)
+
+    def __bool__(self):
+        return self.accepted
+
+    def __repr__(self):
+        if self.accepted:
+            return f"ParseResult(accepted=True, steps={self.steps})"
+        more = f", errors={len(self.errors)}" if len(self.errors) > 1 else ''
+        return (f"ParseResult(accepted=False, error_pos={self.error_pos}, "
+                f"error_token={self.error_token!r}, expected={self.expected}{more})")
+
+
+class ParseStep:
+    """One parser step handed to a trace callback.
+
+    kind is 'match', 'expand', 'accept' or 'error' ('skip', 'pop' and
+    'restart' are error-recovery moves, 'shift' and 'reduce' come from the LALR parser,
+    see lalr.lr_parse).  `stack` (top last, top
+    not yet popped) and `tokens` are the parser's live lists: they are only
+    valid during the callback, so copy what you need to keep.  `tokens` is
+    None when the input is streamed from an iterator.
+    """
+    __slots__ = ('index', 'kind', 'top', 'lookahead', 'pos', 'prod', 'stack', 'tokens')
+
+    def __init__(self, index, kind, top, lookahead, pos, prod, stack, tokens):
+        self.index = index
+        self.kind = kind
+        self.top = top
+        self.lookahead = lookahead
+        self.pos = pos
+        self.prod = prod
+        self.stack = stack
+        self.tokens = tokens
+
+
+def print_trace_step(step):
+    """Default trace: the textbook Buffer | Stack | Action table."""
+    if step.index == 0:
+        print(f"{'Buffer':<30}{'Stack':<30}{'Action'}")
+    if step.tokens is not None:
+        buffer_str = ' '.join(step.tokens[step.pos:])
+    else:
+        # streamed input: only the lookahead is known
+        buffer_str = step.lookahead if step.lookahead == '$' else f"{step.lookahead} ..."
+
+    # display stack with top on the left (reverse of internal list)
+    stack_str = ' '.join(reversed(step.stack))
+    if step.kind == 'accept':
+        print(f"{buffer_str:<30}{stack_str:<30}{'Accept'}")
+    elif step.kind == 'match':
+        print(f"{buffer_str:<30}{stack_str:<30}{'Matched:' + step.lookahead}")
+    elif step.kind == 'expand':
+        top, prod = step.top, step.prod
+        action = f"T[{top}][{step.lookahead}] = {top} {PROD_ARROW} {' '.join(pretty_sym(s) for s in prod)}"
+        print(f"{buffer_str:<30}{stack_str:<30}{action}")
+        # after pushing, show updated stack state
+        pushed = [] if (len(prod) == 1 and prod[0] == 'ε') else list(reversed(prod))
+        new_stack_str = ' '.join(reversed(step.stack[:-1] + pushed))
+        print(f"{buffer_str:<30}{new_stack_str:<30}{''}")
+    elif step.kind == 'skip':
+        print(f"{buffer_str:<30}{stack_str:<30}{'Recover: skip ' + step.lookahead}")
+    elif step.kind == 'pop':
+        print(f"{buffer_str:<30}{stack_str:<30}{'Recover: pop ' + step.top}")
+    elif step.kind == 'restart':
+        print(f"{buffer_str:<30}{stack_str:<30}{'Recover: restart'}")
+    else:
+        print(f"{buffer_str:<30}{stack_str:<30}{'Error: no rule'}")
+
+
+class RingTrace:
+    """Trace sink that keeps only the last `maxlen` steps as plain tuples.
+
+    Each record is (index, kind, top, lookahead, pos, prod, stack_depth).
+    """
+
+    def __init__(self, maxlen=100):
+        self.records = deque(maxlen=maxlen)
+
+    def __call__(self, step):
+        self.records.append((step.index, step.kind, step.top, step.lookahead, step.pos, step.prod, len(step.stack)))
+
+    def format(self):
+        lines = []
+        for index, kind, top, lookahead, pos, prod, depth in self.records:
+            detail = f"{top} {PROD_ARROW} {' '.join(prod)}" if kind in ('expand', 'reduce') else top
+            lines.append(f"#{index:<6} {kind:<7} pos={pos:<6} depth={depth:<5} lookahead={lookahead:<8} {detail}")
+        return '\n'.join(lines)
+
+
+def _preorder_blocks(sym, first, count):
+    """Copies of a tree's arrays with the child blocks in preorder of their parents."""
+    n = len(sym)
+    new_sym = array('i', repeat(0, n))
+    new_first = array('i', repeat(-1, n))
+    new_count = array('i', repeat(0, n))
+    if n:
+        new_sym[0] = sym[0]
+    nxt = 1
+    stack = [(0, 0)] if n else []  # (old node, new node)
+    while stack:
+        v, w = stack.pop()
+        f, c = first[v], count[v]
+        if f < 0:
+            continue
+        new_first[w] = nxt
+        new_count[w] = c
+        new_sym[nxt:nxt + c] = sym[f:f + c]
+        stack.extend(zip(range(f + c - 1, f - 1, -1), range(nxt + c - 1, nxt - 1, -1)))
+        nxt += c
+    return new_sym, new_first, new_count
+
+
+class ParseTree:
+    """Derivation tree of an accepted parse.
+
+    Nodes are ints indexing parallel arrays: `sym` (index into `names`),
+    `first` (first child, -1 for a leaf) and `count` (number of children).
+    All children of a node come from one expansion, so they are the
+    consecutive nodes first .. first+count-1 and need no sibling links.
+    Node 0 is the root; an ε-production gets a single 'ε' leaf.  `start`
+    and `end` give every node's token span [start, end) and are computed on
+    first use.
+
+    The parsers only log the productions they apply (a leftmost derivation,
+    i.e. the expansions in preorder); from_derivation() lays the tree out
+    from that log once the input is accepted.
+    """
+
+    MAGIC = b'LLPT'
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self.sym = array('i')
+        self.first = array('i')
+        self.count = array('i')
+        self._spans = None
+
+    def symbol_id(self, name):
+        i = self._ids.get(name)
+        if i is None:
+            i = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    @classmethod
+    def from_derivation(cls, names, root, rules, applied, nonterminals, rightmost=False):
+        """Lay out the tree of a leftmost derivation.
+
+        `rules` lists the child symbol ids of each production, `applied`
+        the rule indexes in the order the parser expanded them and
+        `nonterminals` the symbol ids that get expanded.  Only the expanded
+        nodes are visited; leaves are written a whole rule at a time.
+        With rightmost=True `applied` is a rightmost derivation instead (an
+        LR parser's reductions, last first); its child blocks come out in the
+        order they were expanded and are then moved into preorder, the layout
+        to_bytes() relies on.
+        """
+        tree = cls(names)
+        rule_syms = [array('i', r) for r in rules]
+        lens = [len(r) for r in rules]
+        # offsets of the non-terminal children in stack order: the child
+        # expanded next goes last
+        step = 1 if rightmost else -1
+        rule_nts = [[k for k in range(len(r))[::step] if r[k] in nonterminals] for r in rules]
+        total = 1 + sum(map(lens.__getitem__, applied))
+        sym = array('i', repeat(0, total))
+        first = array('i', repeat(-1, total))
+        count = array('i', repeat(0, total))
+        sym[0] = root
+        applied = iter(applied)
+        nxt = 1
+        stack = [0] if root in nonterminals else []
+        pop, push = stack.pop, stack.extend
+        while stack:
+            v = pop()
+            r = next(applied)
+            k = lens[r]
+            sym[nxt:nxt + k] = rule_syms[r]
+            first[v] = nxt
+            count[v] = k
+            push(map(nxt.__add__, rule_nts[r]))
+            nxt += k
+        if rightmost:
+            sym, first, count = _preorder_blocks(sym, first, count)
+        tree.sym, tree.first, tree.count = sym, first, count
+        return tree
+
+    def _compute_spans(self):
+        n = len(self.sym)
+        start = array('i', repeat(0, n))
+        end = array('i', repeat(0, n))
+        eps = self._ids.get('ε', -1)
+        sym, first, count = self.sym, self.first, self.count
+        pos = 0
+        stack = [0] if n else []
+        while stack:
+            v = stack.pop()
+            if v < 0:
+                end[~v] = pos
+                continue
+            start[v] = pos
+            f = first[v]
+            if f < 0:
+                if sym[v] != eps:
+                    pos += 1
+                end[v] = pos
+            else:
+                stack.append(~v)
+                stack.extend(range(f + count[v] - 1, f - 1, -1))
+        self._spans = (start, end)
+        return self._spans
+
+    @property
+    def start(self):
+        return (self._spans or self._compute_spans())[0]
+
+    @property
+    def end(self):
+        return (self._spans or self._compute_spans())[1]
+
+    def __len__(self):
+        return len(self.sym)
+
+    def label(self, node):
+        return self.names[self.sym[node]]
+
+    def children(self, node):
+        f = self.first[node]
+        return range(f, f + self.count[node]) if f >= 0 else range(0)
+
+    def span(self, node):
+        start, end = self._spans or self._compute_spans()
+        return start[node], end[node]
+
+    def walk(self, node=0):
+        """Yield (node, depth) in preorder, without recursion."""
+        stack = [(node, 0)]
+        while stack:
+            v, depth = stack.pop()
+            yield v, depth
+            f = self.first[v]
+            if f >= 0:
+                stack.extend((c, depth + 1) for c in range(f + self.count[v] - 1, f - 1, -1))
+
+    def leaves(self, node=0):
+        """Terminal leaves under `node` in input order (ε leaves skipped)."""
+        eps = self._ids.get('ε', -1)
+        return [v for v, _ in self.walk(node) if self.first[v] < 0 and self.sym[v] != eps]
+
+    def format(self, node=0):
+        """Indented text with one node per line and its token span."""
+        start, end = self._spans or self._compute_spans()
+        lines = []
+        for v, depth in self.walk(node):
+            name = self.names[self.sym[v]]
+            if name == 'ε':
+                lines.append('  ' * depth + name)
+            else:
+                lines.append(f"{'  ' * depth}{name} [{start[v]}:{end[v]}]")
+        return '\n'.join(lines)
+
+    def to_bytes(self):
+        """Compact form: header, symbol names, then sym and count per node.
+
+        Child blocks are laid out in preorder, so `first` and the spans are
+        recomputed on load rather than stored.
+        """
+        names = '\n'.join(self.names).encode('utf-8')
+        body = array('i', self.sym)
+        body.extend(self.count)
+        if sys.byteorder == 'big':
+            body.byteswap()
+        header = self.MAGIC + len(self.sym).to_bytes(4, 'little') + len(names).to_bytes(4, 'little')
+        return header + names + body.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        if bytes(data[:4]) != cls.MAGIC:
+            raise ValueError('not a serialized ParseTree')
+        n = int.from_bytes(data[4:8], 'little')
+        size = int.from_bytes(data[8:12], 'little')
+        names = bytes(data[12:12 + size]).decode('utf-8')
+        names = names.split('\n') if names else []
+        body = array('i')
+        body.frombytes(data[12 + size:12 + size + 8 * n])
+        if sys.byteorder == 'big':
+            body.byteswap()
+        tree = cls(names)
+        if not n:
+            return tree
+        sym, count = body[:n], body[n:]
+        # child blocks follow each other in preorder of their parents
+        first = array('i', repeat(-1, n))
+        nxt = 1
+        stack = [0]
+        while stack:
+            v = stack.pop()
+            c = count[v]
+            if c:
+                first[v] = nxt
+                stack.extend(range(nxt + c - 1, nxt - 1, -1))
+                nxt += c
+        tree.sym, tree.first, tree.count = sym, first, count
+        return tree
+
+
+def expected_terminals(table, top):
+    """Terminals that have an entry for `top` in the dict table (for error reports)."""
+    return sorted(t for (A, t) in table if A == top)
+
+
+class PanicRecovery:
+    """Sets for panic-mode error recovery, computed once per table.
+
+    sync[A] holds the tokens at which the parser gives up on non-terminal A
+    and pops it: FOLLOW(A), the extra `sync_tokens` (e.g. ';' or ')') and
+    '$'.  expected[A] is the sorted row of A in the table, reported with
+    each error.
+    """
+
+    def __init__(self, table, follow, sync_tokens=()):
+        extra = frozenset(sync_tokens) | {'$'}
+        self.sync = {A: frozenset(f) | extra for A, f in follow.items()}
+        rows = {}
+        for (A, t) in table:
+            rows.setdefault(A, []).append(t)
+        self.expected = {A: sorted(ts) for A, ts in rows.items()}
+        for A in self.sync:
+            self.expected.setdefault(A, [])
+
+
+def _derivation_tree(start_symbol, applied):
+    """ParseTree for the (head, production) expansions logged by predictive_parse."""
+    tree = ParseTree()
+    sid = tree.symbol_id
+    rule_of = {}
+    rules = []
+    order = array('i')
+    for _, prod in applied:
+        r = rule_of.get(id(prod))
+        if r is None:
+            r = rule_of[id(prod)] = len(rules)
+            rules.append([sid(sym) for sym in prod])
+        order.append(r)
+    nonterminals = {sid(A) for A, _ in applied}
+    return ParseTree.from_derivation(tree.names, sid(start_symbol), rules, order, nonterminals)
+
+
+def input_tokens(input_string):
+    """(buffer, stream) for a parser input.
+
+    A string is tokenized with tokenize() and a list is taken as tokens;
+    both get the '$' end marker and keep the buffer for the trace.  Any
+    other iterable is streamed and the buffer is None.
+    """
+    if isinstance(input_string, str):
+        # Tokenize input string into grammar tokens (space separated tokens expected)
+        tokens = tokenize(input_string)
+        tokens.append('$')
+        return tokens, iter(tokens)
+    if isinstance(input_string, list):
+        # already tokenized (e.g. by a Tokenizer): keep the buffer for the trace
+        tokens = input_string + ['$']
+        return tokens, iter(tokens)
+    return None, iter(input_string)
 
 
 # Parsing function
-def predictive_parse(input_string, start_symbol, table):
-    # Tokenize input string into grammar tokens (space separated tokens expected)
-    tokens = tokenize(input_string)
-    tokens.append('$')
+def _count_parse(stats, steps, max_stack):
+    stats.count('parse.inputs')
+    stats.count('parse.steps', steps)
+    stats.maximum('parse.max_stack', max_stack)
+
+
+def predictive_parse(input_string, start_symbol, table, trace=print_trace_step, build_tree=False, recover=None):
+    """Table-driven LL(1) parse of `input_string`.
+
+    `input_string` is either a string (tokenized with tokenize()), a list
+    of tokens, or any other iterable of tokens, e.g. iter_file_tokens(path).  Tokens are consumed one
+    lookahead at a time, so for an iterator memory is bounded by the stack
+    depth; the trace then shows only the lookahead instead of the whole
+    remaining buffer.
+
+    `trace` is called with a ParseStep for every step; the default prints
+    the Buffer | Stack | Action table, and trace=None parses silently in
+    linear time.  Returns a ParseResult (truthy when accepted); with
+    build_tree=True an accepted result carries the ParseTree in `.tree`.
+
+    With `recover` (a PanicRecovery for this table) the parser does not stop
+    at the first error: it records it, then pops a mismatched terminal, pops
+    a non-terminal when the lookahead is in its sync set and otherwise skips
+    the lookahead, and carries on; input left over once only '$' remains on
+    the stack is parsed as a new start symbol.  Errors right after an error
+    are not reported again until a token has been matched.  The result then lists
+    every error in `.errors`.
+    """
+    tokens, stream = input_tokens(input_string)
     stack = ['$']
     stack.append(start_symbol)
+    stats = perfstats.ACTIVE
+    max_stack = len(stack)
+    applied = []  # (head, production) per expansion, when building a tree
+    errors = []
+    recovering = False  # inside an error, until the next matched token
     i = 0
+    n = 0
+    current_input = next(stream, '$')
 
-    print(f"{'Buffer':<30}{'Stack':<30}{'Action'}")
     while True:
-        buffer_str = ' '.join(tokens[i:])
-        # display stack with top on the left (reverse of internal list)
-        stack_str = ' '.join(reversed(stack))
-        # peek top
-        top = stack.pop() if stack else None
-        current_input = tokens[i] if i < len(tokens) else '$'
-        action = ''
+        top = stack[-1] if stack else None
         if top == current_input == '$':
-            print(f"{buffer_str:<30}{stack_str:<30}{'Accept'}")
-            return True
+            if stats is not None:
+                _count_parse(stats, n + 1, max_stack)
+            if errors:
+                pos, token, expected = errors[0]
+                return ParseResult(False, pos, token, expected, n + 1, errors=errors)
+            if trace:
+                trace(ParseStep(n, 'accept', top, current_input, i, None, stack, tokens))
+            tree = _derivation_tree(start_symbol, applied) if build_tree else None
+            return ParseResult(True, steps=n + 1, tree=tree)
         elif top == current_input:
-            action = f"Matched:{current_input}"
-            print(f"{buffer_str:<30}{stack_str:<30}{action}")
+            if trace:
+                trace(ParseStep(n, 'match', top, current_input, i, None, stack, tokens))
+            stack.pop()
             i += 1
+            current_input = next(stream, '$')
+            recovering = False
         elif (top, current_input) in table:
             prod = table[(top, current_input)]
-            action = f"T[{top}][{current_input}] = {top} {PROD_ARROW} {' '.join(pretty_sym(s) for s in prod)}"
-            print(f"{buffer_str:<30}{stack_str:<30}{action}")
+            if trace:
+                trace(ParseStep(n, 'expand', top, current_input, i, prod, stack, tokens))
+            stack.pop()
             # push RHS in reverse (unless epsilon)
             if not (len(prod) == 1 and prod[0] == 'ε'):
-                for symbol in reversed(prod):
-                    stack.append(symbol)
-            # after pushing, show updated stack state
-            new_stack_str = ' '.join(reversed(stack))
-            print(f"{buffer_str:<30}{new_stack_str:<30}{''}")
+                stack.extend(reversed(prod))
+                if stats is not None and len(stack) > max_stack:
+                    max_stack = len(stack)
+            if build_tree:
+                applied.append((top, prod))
+        elif recover is None:
+            if trace:
+                trace(ParseStep(n, 'error', top, current_input, i, None, stack, tokens))
+            # a non-terminal expects its table row; a terminal only itself
+            expected = expected_terminals(table, top) or [top]
+            if stats is not None:
+                _count_parse(stats, n + 1, max_stack)
+            return ParseResult(False, i, current_input, expected, n + 1)
         else:
-            action = 'Error: no rule'
-            print(f"{buffer_str:<30}{stack_str:<30}{action}")
-            return False
+            sync = recover.sync.get(top)
+            if not recovering:
+                if trace:
+                    trace(ParseStep(n, 'error', top, current_input, i, None, stack, tokens))
+                n += 1
+                errors.append((i, current_input, recover.expected[top] if sync is not None else [top]))
+                recovering = True
+            if top != '$' and (sync is None or current_input in sync):
+                # give up on this terminal / non-terminal
+                if trace:
+                    trace(ParseStep(n, 'pop', top, current_input, i, None, stack, tokens))
+                stack.pop()
+            elif top == '$' and (start_symbol, current_input) in table:
+                # input left over after the start symbol was given up: parse it as a new one
+                if trace:
+                    trace(ParseStep(n, 'restart', top, current_input, i, None, stack, tokens))
+                stack.append(start_symbol)
+            else:
+                if trace:
+                    trace(ParseStep(n, 'skip', top, current_input, i, None, stack, tokens))
+                i += 1
+                current_input = next(stream, '$')
+        n += 1
+
 
+def iter_file_tokens(path, chunk_size=1 << 16, tokenizer=None):
+    """Yield the tokens of a file without reading it into memory.
+
+    The file is read in pieces of at most `chunk_size` characters (so a
+    single multi-gigabyte line is fine); a token cut at a piece boundary is
+    carried over to the next piece, so tokens must not contain whitespace.
+    Lines starting with '#' are skipped.  `tokenizer` (default: tokenize)
+    turns each piece into tokens; pass Tokenizer.iter_codes to get codes.
+    """
+    if tokenizer is None:
+        tokenizer = tokenize
+    with open(path, 'r', encoding='utf-8') as f:
+        carry = ''
+        in_comment = False
+        blank_so_far = True  # nothing but whitespace seen on the current line
+        while True:
+            piece = f.readline(chunk_size)
+            if not piece:
+                break
+            if blank_so_far:
+                head = piece.lstrip()
+                if head:
+                    in_comment = head.startswith('#')
+                    blank_so_far = False
+            if piece.endswith('\n'):
+                blank_so_far = True
+                if in_comment:
+                    in_comment = False
+                    continue
+            if in_comment:
+                continue
+            text = carry + piece
+            cut = max(text.rfind(ws) for ws in ' \t\r\n\f\v')
+            if cut < 0:
+                carry = text
+                continue
+            carry = text[cut + 1:]
+            yield from tokenizer(text[:cut + 1])
+        if carry:
+            yield from tokenizer(carry)
 
 
 def tokenize(s):
@@ -347,8 +715,433 @@ def tokenize(s):
         i = j
     return tokens
 
-import argparse
-import sys
+
+# ---------------------------------------------------------------------------
+# Grammar-driven regex tokenizer
+# ---------------------------------------------------------------------------
+
+class Tokenizer:
+    r"""Tokenizer compiled from a grammar's terminal set.
+
+    All terminals and the optional token classes (`patterns`, e.g.
+    {'id': r'[A-Za-z_]\w*', 'num': r'\d+'}) are combined into one regular
+    expression with one capturing group per alternative, so the group
+    number of a match maps straight to a terminal code:
+
+    - token classes are tried first, so a class like -?\d+ wins over a '-'
+      operator; a class match spelled exactly like a terminal (a keyword such
+      as `if` against an `id` class) becomes that terminal;
+    - the remaining terminals are matched literally, longest first; a
+      terminal ending in a word character only matches at a word boundary,
+      so `id` does not match the start of `idx`;
+    - anything else becomes an unknown token (a whole word, or a single
+      character), which the parser rejects.
+
+    `term_id` maps terminal names to the codes emitted by codes(); pass a
+    CompiledTable's term_id to feed its integer parse loop directly.
+    Unknown tokens get code -1.
+    """
+
+    def __init__(self, terminals, patterns=None, term_id=None):
+        self.terminals = list(terminals)
+        self.patterns = dict(patterns or {})
+        if term_id is None:
+            term_id = {t: i for i, t in enumerate(self.terminals)}
+        self.term_id = term_id
+
+        alternatives = []
+        group_names = []  # terminal name per alternative (None = unknown)
+        keywords = {}
+        class_res = []
+        for name, pattern in self.patterns.items():
+            alternatives.append(pattern)
+            group_names.append(name)
+            class_res.append(re.compile(pattern))
+        literals = []
+        for t in self.terminals:
+            if t in self.patterns:
+                continue
+            if any(r.fullmatch(t) for r in class_res):
+                keywords[t] = term_id.get(t, -1)
+            else:
+                literals.append(t)
+        for t in sorted(literals, key=len, reverse=True):
+            alternatives.append(re.escape(t) + (r'(?!\w)' if t[-1:].isalnum() or t[-1:] == '_' else ''))
+            group_names.append(t)
+        alternatives.append(r'\w+|\S')
+        group_names.append(None)
+
+        # wrap each alternative in one capturing group and remember which
+        # group number belongs to which terminal (user patterns may contain
+        # groups of their own, which shift the numbering)
+        parts = []
+        self._group_name = [None]
+        self._group_code = [-1]
+        self._group_is_class = [False]
+        for alt, name in zip(alternatives, group_names):
+            parts.append(f'({alt})')
+            inner = re.compile(alt).groups
+            self._group_name.append(name)
+            self._group_code.append(term_id.get(name, -1) if name is not None else -1)
+            self._group_is_class.append(name in self.patterns)
+            for _ in range(inner):
+                self._group_name.append(None)
+                self._group_code.append(-1)
+                self._group_is_class.append(False)
+        self.regex = re.compile('|'.join(parts))
+        self.keywords = keywords
+        # without token classes every token is its own spelling, so a
+        # group-free pattern and findall() (all in C) are enough
+        self._plain = None
+        if not self.patterns:
+            self._plain = re.compile('|'.join(f'(?:{alt})' for alt in alternatives))
+            self._text_code = {t: term_id.get(t, -1) for t in literals}
+
+    def _resolve(self, m):
+        g = m.lastindex
+        # lastindex is the outermost group that closed last, i.e. our wrapper
+        name = self._group_name[g]
+        if name is None:
+            return m.group(g), -1
+        if self._group_is_class[g]:
+            text = m.group(g)
+            if text in self.keywords:
+                return text, self.keywords[text]
+        return name, self._group_code[g]
+
+    def tokens(self, s):
+        """Return the list of terminal names (unknown text is kept as-is)."""
+        if self._plain is not None:
+            return self._plain.findall(s)
+        return [self._resolve(m)[0] for m in self.regex.finditer(s)]
+
+    __call__ = tokens
+
+    def iter_codes(self, s):
+        """Yield terminal codes for `s` (-1 for unknown tokens)."""
+        if self._plain is not None:
+            return map(self._text_code.get, self._plain.findall(s), repeat(-1))
+        return self._iter_class_codes(s)
+
+    def _iter_class_codes(self, s):
+        group_code, is_class, keywords = self._group_code, self._group_is_class, self.keywords
+        for m in self.regex.finditer(s):
+            g = m.lastindex
+            if is_class[g]:
+                text = m.group(g)
+                if text in keywords:
+                    yield keywords[text]
+                    continue
+            yield group_code[g]
+
+    def codes(self, s):
+        """Return terminal codes for `s` as a list (-1 for unknown tokens)."""
+        return list(self.iter_codes(s))
+
+
+_tokenizer_cache = {}
+
+
+def make_tokenizer(productions, patterns=None, compiled=None):
+    """Build (or reuse) the Tokenizer for a grammar.
+
+    Terminals come from terminals_from_productions; with a CompiledTable
+    the emitted codes are that table's terminal codes.  Tokenizers are cached
+    per terminal set and patterns, so repeated calls for the same grammar
+    reuse the compiled regular expression.
+    """
+    terminals = tuple(compiled.terms if compiled is not None else terminals_from_productions(productions))
+    key = (terminals, tuple(sorted((patterns or {}).items())), compiled is not None)
+    tok = _tokenizer_cache.get(key)
+    if tok is None:
+        tok = Tokenizer(terminals, patterns, compiled.term_id if compiled is not None else None)
+        _tokenizer_cache[key] = tok
+    return tok
+
+
+# ---------------------------------------------------------------------------
+# Compiled (integer-indexed, row-displacement compressed) parse table
+# ---------------------------------------------------------------------------
+
+class CompiledTable:
+    """LL(1) table compiled from the dict returned by construct_table.
+
+    Symbols get dense integer codes: terminals (including '$') are
+    0 .. len(terms)-1 and non-terminals follow, so `code >= nterms_base`
+    means "non-terminal".  Every production is stored once as a tuple of
+    codes, already reversed so it can be pushed onto the stack directly.
+
+    Rows are compressed with row displacement: the most common production of
+    each row becomes that row's default and the remaining cells are packed
+    into shared `next`/`check` arrays at offset `base[A]`.  A per-row bitmask
+    of valid terminals keeps error detection exact (a default is never used
+    for a terminal that had no entry).
+    """
+
+    def __init__(self, productions, table, start_symbol):
+        nonterms = list(productions)
+        for A, _ in table:
+            if A not in productions and A not in nonterms:
+                nonterms.append(A)
+        is_nt = set(nonterms)
+        # terminals: '$', everything on a RHS that is not a non-terminal, and
+        # any lookahead that only appears in the table (e.g. via FOLLOW)
+        terms = ['$']
+        seen = {'$'}
+        for prods in productions.values():
+            for prod in prods:
+                if len(prod) == 1 and prod[0] == 'ε':
+                    continue
+                for sym in prod:
+                    if sym not in is_nt and sym not in seen:
+                        seen.add(sym)
+                        terms.append(sym)
+        for _, t in table:
+            if t not in seen:
+                seen.add(t)
+                terms.append(t)
+
+        self._set_symbols(terms, nonterms, start_symbol)
+
+        # productions stored once, in order of first appearance in the table
+        self.prod_heads = []
+        self.prod_rhs = []       # original symbols, for printing
+        self.prod_push = []      # reversed integer codes ('ε' productions push nothing)
+        prod_index = {}
+        rows = [dict() for _ in nonterms]
+        for (A, t), prod in table.items():
+            key = (A, tuple(prod))
+            if key not in prod_index:
+                prod_index[key] = len(self.prod_rhs)
+                self._add_production(A, prod)
+            rows[self.nt_id[A] - self.nterms_base][self.term_id[t]] = prod_index[key]
+
+        self._pack(rows)
+
+    @classmethod
+    def from_arrays(cls, terms, nonterms, start_symbol, prods, default, valid, base, nxt, check):
+        """Rebuild a compiled table from its parts without packing again.
+
+        `prods` is the list of (head, rhs) in production-index order and the
+        four integer arrays may be any int sequences, e.g. memoryviews over a
+        memory-mapped cache file (see grammar_cache.py).
+        """
+        self = cls.__new__(cls)
+        self._set_symbols(list(terms), list(nonterms), start_symbol)
+        self.prod_heads = []
+        self.prod_rhs = []
+        self.prod_push = []
+        for A, prod in prods:
+            self._add_production(A, prod)
+        self.default = default
+        self.valid = list(valid)
+        self.base = base
+        self.next = nxt
+        self.check = check
+        return self
+
+    def __getstate__(self):
+        # memoryviews (cache-backed tables) cannot be pickled; copy them out
+        state = self.__dict__.copy()
+        for name in ('default', 'base', 'next', 'check'):
+            if isinstance(state[name], memoryview):
+                arr = array('i')
+                arr.frombytes(state[name].cast('B'))
+                state[name] = arr
+        return state
+
+    def _set_symbols(self, terms, nonterms, start_symbol):
+        self.terms = terms
+        self.nonterms = nonterms
+        self.term_id = {t: i for i, t in enumerate(terms)}
+        self.nterms_base = len(terms)
+        self.nt_id = {A: self.nterms_base + i for i, A in enumerate(nonterms)}
+        self.start = self.nt_id[start_symbol]
+        self.end = self.term_id['$']
+
+    def _add_production(self, A, prod):
+        self.prod_heads.append(A)
+        self.prod_rhs.append(list(prod))
+        if len(prod) == 1 and prod[0] == 'ε':
+            self.prod_push.append(())
+        else:
+            term_id, nt_id = self.term_id, self.nt_id
+            self.prod_push.append(tuple(nt_id[s] if s in nt_id else term_id[s] for s in reversed(prod)))
+
+    def _pack(self, rows):
+        n = len(rows)
+        self.default = array('i', [-1] * n)
+        self.valid = [0] * n
+        self.base = array('i', [0] * n)
+        nxt = array('i')
+        check = array('i')
+        used = bytearray()
+        # densest rows first gives the tightest first-fit packing
+        for r in sorted(range(n), key=lambda r: -len(rows[r])):
+            row = rows[r]
+            if not row:
+                continue
+            counts = {}
+            for p in row.values():
+                counts[p] = counts.get(p, 0) + 1
+            default = max(counts, key=counts.get)
+            self.default[r] = default
+            mask = 0
+            for t in row:
+                mask |= 1 << t
+            self.valid[r] = mask
+            cells = sorted(t for t, p in row.items() if p != default)
+            if not cells:
+                continue
+            # first fit: try every free slot for the lowest cell, skipping used
+            # slots with bytearray.find (a C-level scan)
+            first, rest = cells[0], cells[1:]
+            pos = used.find(0, first)
+            while pos != -1:
+                b = pos - first
+                if all(b + t >= len(used) or not used[b + t] for t in rest):
+                    break
+                pos = used.find(0, pos + 1)
+            else:
+                b = max(len(used) - first, 0)
+            top = b + cells[-1] + 1
+            if top > len(check):
+                grow = top - len(check)
+                nxt.extend([-1] * grow)
+                check.extend([-1] * grow)
+                used.extend(bytes(grow))
+            for t in cells:
+                nxt[b + t] = row[t]
+                check[b + t] = r
+                used[b + t] = 1
+            self.base[r] = b
+        self.next = nxt
+        self.check = check
+
+    def lookup(self, nt_code, term_code):
+        """Return the production index for T[A][t], or -1 if the cell is empty."""
+        r = nt_code - self.nterms_base
+        if term_code < 0 or not (self.valid[r] >> term_code) & 1:
+            return -1
+        i = self.base[r] + term_code
+        if i < len(self.check) and self.check[i] == r:
+            return self.next[i]
+        return self.default[r]
+
+    def encode(self, tokens):
+        """Map token strings to terminal codes (-1 for unknown tokens)."""
+        get = self.term_id.get
+        return [get(tok, -1) for tok in tokens]
+
+    def encode_iter(self, tokens):
+        """Lazy version of encode() for streamed tokens."""
+        get = self.term_id.get
+        return (get(tok, -1) for tok in tokens)
+
+    def parse(self, codes, build_tree=False):
+        """Run the predictive parse on terminal codes; returns a ParseResult.
+
+        `codes` is any iterable (consumed one code at a time) and must not
+        include the end marker; it is supplied when the input runs out.
+        With build_tree=True an accepted result carries a ParseTree whose
+        symbol ids are this table's codes.
+        """
+        if build_tree:
+            return self._parse_tree(codes)
+        codes = iter(codes)
+        end = self.end
+        nbase = self.nterms_base
+        valid, base, default = self.valid, self.base, self.default
+        check, nxt, push = self.check, self.next, self.prod_push
+        ncheck = len(check)
+        stack = [end, self.start]
+        i = 0
+        cur = next(codes, end)
+        while True:
+            top = stack.pop()
+            if top == cur:
+                if cur == end:
+                    return ParseResult(True)
+                i += 1
+                cur = next(codes, end)
+            elif top >= nbase and cur >= 0 and (valid[top - nbase] >> cur) & 1:
+                r = top - nbase
+                j = base[r] + cur
+                p = nxt[j] if j < ncheck and check[j] == r else default[r]
+                stack.extend(push[p])
+            else:
+                return ParseResult(False, i, self.terms[cur] if cur >= 0 else None, self.expected(top))
+
+    def _parse_tree(self, codes):
+        # parse() plus a log of the productions applied, replayed into a tree
+        codes = iter(codes)
+        end = self.end
+        nbase = self.nterms_base
+        valid, base, default = self.valid, self.base, self.default
+        check, nxt, push = self.check, self.next, self.prod_push
+        ncheck = len(check)
+        applied = array('i')
+        log = applied.append
+        stack = [end, self.start]
+        i = 0
+        cur = next(codes, end)
+        while True:
+            top = stack.pop()
+            if top == cur:
+                if cur == end:
+                    return ParseResult(True, tree=self._tree(applied))
+                i += 1
+                cur = next(codes, end)
+            elif top >= nbase and cur >= 0 and (valid[top - nbase] >> cur) & 1:
+                r = top - nbase
+                j = base[r] + cur
+                p = nxt[j] if j < ncheck and check[j] == r else default[r]
+                stack.extend(push[p])
+                log(p)
+            else:
+                return ParseResult(False, i, self.terms[cur] if cur >= 0 else None, self.expected(top))
+
+    def _tree(self, applied):
+        names = self.terms + self.nonterms
+        nonterminals = range(self.nterms_base, len(names))
+        if 'ε' not in names:
+            names.append('ε')
+        eps = names.index('ε')
+        rules = [push[::-1] if push else (eps,) for push in self.prod_push]
+        return ParseTree.from_derivation(names, self.start, rules, applied, nonterminals)
+
+    def expected(self, code):
+        """Terminals acceptable with `code` on top of the stack."""
+        if code < self.nterms_base:
+            return [self.terms[code]]
+        return sorted(mask_to_set(self.valid[code - self.nterms_base], self.terms))
+
+    def stats(self):
+        """Sizes of the compiled form (useful for comparing with the dict table)."""
+        filled = sum(bin(m).count('1') for m in self.valid)
+        return {
+            'nonterminals': len(self.nonterms),
+            'terminals': len(self.terms),
+            'productions': len(self.prod_rhs),
+            'filled_cells': filled,
+            'dense_cells': len(self.nonterms) * len(self.terms),
+            'packed_cells': len(self.check),
+            'bytes': (self.base.itemsize * len(self.base) + self.default.itemsize * len(self.default)
+                      + self.next.itemsize * len(self.next) + self.check.itemsize * len(self.check)
+                      + sum((m.bit_length() + 7) // 8 for m in self.valid)),
+        }
+
+
+def compile_table(productions, table, start_symbol):
+    """Convenience wrapper: compile the dict table returned by construct_table."""
+    return CompiledTable(productions, table, start_symbol)
+
+
+def print_compiled_stats(compiled):
+    st = compiled.stats()
+    print(f"\nCompiled table: {st['nonterminals']} non-terminals x {st['terminals']} terminals, "
+          f"{st['productions']} productions, {st['filled_cells']} filled cells "
+          f"packed into {st['packed_cells']} slots (~{st['bytes']} bytes)")
 
 
 def load_grammar(path):
@@ -359,38 +1152,12 @@ def load_grammar(path):
     - Start: S         (optional; overrides first non-terminal)
     - Input: b a       (optional; input tokens separated by spaces)
     - A -> a b | c     (productions)
+
+    Returns (productions, start_symbol, input_tokens); the file is read by
+    grammarcore's streaming loader.
     """
-    productions = {}
-    start_symbol = None
-    input_tokens = None
-    with open(path, 'r', encoding='utf-8') as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith('#'):
-                continue
-            if line.lower().startswith('start:'):
-                start_symbol = line.split(':', 1)[1].strip()
-                continue
-            if line.lower().startswith('input:'):
-                input_tokens = line.split(':', 1)[1].strip()
-                continue
-            if '->' in line:
-                head, rhs = line.split('->', 1)
-                head = head.strip()
-                alternatives = [alt.strip() for alt in rhs.split('|')]
-                prods = []
-                for alt in alternatives:
-                    if alt == '' or alt == 'ε' or alt.lower() == 'eps':
-                        prods.append(['ε'])
-                    else:
-                        tokens = alt.split()
-                        prods.append(tokens)
-                productions.setdefault(head, []).extend(prods)
-    # If no start symbol provided, pick first LHS
-    if not start_symbol:
-        if productions:
-            start_symbol = next(iter(productions))
-    return productions, start_symbol, input_tokens
+    grammar = load_grammar_file(path)
+    return grammar.productions(), grammar.start, grammar.input
 
 
 def load_multi_tests(path):
@@ -405,218 +1172,160 @@ def load_multi_tests(path):
 
     Returns a list of dicts with keys: name, productions, start, valid, invalid
     """
-    tests = []
-    current = None
-    def ensure_current():
-        nonlocal current
-        if current is None:
-            current = {
-                'name': None,
-                'productions': {},
-                'start': None,
-                'valid': None,
-                'invalid': None,
-            }
+    return [{
+        'name': block.name,
+        'productions': block.productions(),
+        'start': block.start,
+        'valid': block.valid,
+        'invalid': block.invalid,
+    } for block in load_test_blocks(path)]
+
+
+# ---------------------------------------------------------------------------
+# Whole-grammar analysis (transformations, FIRST/FOLLOW, table)
+# ---------------------------------------------------------------------------
+
+class GrammarAnalysis:
+    """Everything derived from one grammar before any input is parsed.
+
+    Holds the grammar after useless-symbol removal, after left-recursion
+    removal and after left factoring (with the steps that produced them),
+    FIRST/FOLLOW, the parsing table and its conflicts.  Built by analyse_grammar() or loaded from the on-disk
+    cache (grammar_cache.py); `compiled` is filled in by compile().
+    """
 
-    with open(path, 'r', encoding='utf-8') as f:
-        for raw in f:
-            line = raw.strip()
-            if not line:
-                # blank line: if we have a populated block, finalize it
-                if current and current['productions'] and current['start']:
-                    tests.append(current)
-                    current = None
-                continue
-            if line.startswith('#'):
-                continue
-            if line.lower().startswith('test:'):
-                # finalize previous test if any
-                if current and current['productions'] and current['start']:
-                    tests.append(current)
-                current = {
-                    'name': line.split(':', 1)[1].strip(),
-                    'productions': {},
-                    'start': None,
-                    'valid': None,
-                    'invalid': None,
-                }
-                continue
-            ensure_current()
-            if line.lower().startswith('start:'):
-                current['start'] = line.split(':', 1)[1].strip()
-                continue
-            if line.lower().startswith('valid:'):
-                current['valid'] = line.split(':', 1)[1].strip()
-                continue
-            if line.lower().startswith('invalid:'):
-                current['invalid'] = line.split(':', 1)[1].strip()
-                continue
-            if '->' in line:
-                head, rhs = line.split('->', 1)
-                head = head.strip()
-                alternatives = [alt.strip() for alt in rhs.split('|')]
-                prods = []
-                for alt in alternatives:
-                    if alt == '' or alt == 'ε' or alt.lower() == 'eps':
-                        prods.append(['ε'])
-                    else:
-                        tokens = alt.split()
-                        prods.append(tokens)
-                current['productions'].setdefault(head, []).extend(prods)
-
-    # finalize last block
-    if current and current['productions'] and current['start']:
-        tests.append(current)
-
-    return tests
-
-
-def format_productions(productions):
-    """Return a human friendly string of the grammar productions."""
-    lines = []
-    for head, prods in productions.items():
-        alts = [' '.join(p) for p in prods]
-        lines.append(f"{head} {PROD_ARROW} {' | '.join(alts)}")
-    return '\n'.join(lines)
-
-
-def remove_left_recursion(productions):
-    """Remove left recursion (indirect + direct) from the grammar.
-
-    Returns (new_productions, steps) where steps is a list of human-readable
-    descriptions of each change performed.
+    def __init__(self, start_symbol, reduced_productions, useless_steps, lr_productions, lr_steps,
+                 productions, lf_steps, first, follow, table, conflicts, compiled=None):
+        self.start_symbol = start_symbol
+        self.reduced_productions = reduced_productions
+        self.useless_steps = useless_steps
+        self.lr_productions = lr_productions
+        self.lr_steps = lr_steps
+        self.productions = productions
+        self.lf_steps = lf_steps
+        self.first = first
+        self.follow = follow
+        self.table = table
+        self.conflicts = conflicts
+        self.compiled = compiled
+
+    def compile(self):
+        """Return the CompiledTable for this grammar, building it once."""
+        if self.compiled is None:
+            self.compiled = compile_table(self.productions, self.table, self.start_symbol)
+        return self.compiled
+
+
+def analyse_grammar(productions, start_symbol, engine='fixpoint', reduce=True, timings=None):
+    """Transform the grammar and build FIRST/FOLLOW and the LL(1) table.
+
+    With reduce=False useless symbols are kept (reduced_productions is then
+    the grammar as given and useless_steps is None).  A `timings` dict gets
+    the seconds spent in each stage.
     """
-    steps = []
-    # Work on a copy
-    prods = {nt: [list(p) for p in rhs] for nt, rhs in productions.items()}
-    nonterminals = list(prods.keys())
-
-    def make_new_nt(base):
-        # append a prime marker; ensure uniqueness
-        candidate = base + "'"
-        while candidate in prods:
-            candidate += "'"
-        return candidate
-
-    for i, Ai in enumerate(nonterminals):
-        # replace Ai -> Aj α where j < i (indirect left recursion elimination)
-        for j in range(i):
-            Aj = nonterminals[j]
-            new_rhs = []
-            changed = False
-            for prod in prods[Ai]:
-                if prod and prod[0] == Aj:
-                    # replace Aj γ with β γ for each Aj -> β
-                    rest = prod[1:]
-                    for beta in prods[Aj]:
-                        new_prod = list(beta) + rest
-                        new_rhs.append(new_prod)
-                        steps.append(f"In {Ai}: replaced {Ai} {PROD_ARROW} {Aj} {' '.join(rest) if rest else ''} with {Ai} {PROD_ARROW} {' '.join(new_prod)} (expanding {Aj} {PROD_ARROW} {' '.join(beta)})")
-                    changed = True
-                else:
-                    new_rhs.append(prod)
-            if changed:
-                steps.append(f"After expanding {Aj} in {Ai}, {Ai} productions become: {[' '.join(p) for p in new_rhs]}")
-                prods[Ai] = new_rhs
-
-        # now remove direct left recursion for Ai
-        alpha = []  # productions where Ai -> Ai α
-        beta = []   # productions where Ai -> β (not starting with Ai)
-        for prod in prods[Ai]:
-            if prod and prod[0] == Ai:
-                alpha.append(prod[1:])
-            else:
-                beta.append(prod)
-
-        if alpha:
-            Aip = make_new_nt(Ai)
-            steps.append(f"Direct left recursion detected in {Ai}. Creating new non-terminal {Aip} and rewriting productions.")
-            # Ai -> beta Aip
-            new_Ai_rhs = []
-            for b in beta:
-                if b == ['ε']:
-                    new_Ai_rhs.append([Aip])
-                else:
-                    new_Ai_rhs.append(list(b) + [Aip])
-            prods[Ai] = new_Ai_rhs
-            # Aip -> alpha Aip | ε
-            prods[Aip] = []
-            for a in alpha:
-                prods[Aip].append(list(a) + [Aip])
-            prods[Aip].append(['ε'])
-            steps.append(f"{Ai} rewritten as: {[' '.join(p) for p in prods[Ai]]}")
-            steps.append(f"{Aip} productions: {[' '.join(p) for p in prods[Aip]]}")
-            # also record the new nonterminal in order list so subsequent iterations can use it
-            nonterminals.insert(i+1, Aip)
-
-    return prods, steps
-
-
-def left_factor(productions):
-    """Apply left factoring to the grammar. Returns (new_productions, steps).
-
-    This does a simple factoring: when a non-terminal has two or more
-    alternatives that share a common prefix (at least the first symbol),
-    it pulls the common prefix into a new non-terminal.
+    firsts_fn, follows_fn = FIRST_FOLLOW_ENGINES[engine]
+    clock = [time.perf_counter()]
+
+    def stage(name):
+        if timings is not None:
+            now = time.perf_counter()
+            timings[name] = now - clock[0]
+            clock[0] = now
+
+    if reduce:
+        reduced, useless_steps = remove_useless_symbols(productions, start_symbol)
+    else:
+        reduced, useless_steps = productions, None
+    stage('useless')
+    lr_productions, lr_steps = remove_left_recursion(reduced)
+    stage('left_recursion')
+    factored, lf_steps = left_factor(lr_productions)
+    stage('left_factoring')
+    first = firsts_fn(factored)
+    stage('first')
+    # FIRST of every production suffix, shared by FOLLOW and the table
+    index = suffix_firsts(factored, first)
+    follow = follows_fn(factored, start_symbol, first, index)
+    stage('follow')
+    table, conflicts, _ = construct_table(factored, first, follow, index)
+    stage('table')
+    return GrammarAnalysis(start_symbol, reduced, useless_steps, lr_productions, lr_steps,
+                           factored, lf_steps, first, follow, table, conflicts)
+
+
+def print_analysis(analysis, rows=None):
+    """Print the transformation steps, FIRST/FOLLOW, the table and the LL(1) verdict.
+
+    `rows` limits FIRST/FOLLOW and the table to those non-terminals.
     """
-    prods = {nt: [list(p) for p in rhs] for nt, rhs in productions.items()}
-    steps = []
-
-    def make_new_nt(base):
-        candidate = base + "'"
-        while candidate in prods:
-            candidate += "'"
-        return candidate
-
-    changed = True
-    while changed:
-        changed = False
-        for A, alternatives in list(prods.items()):
-            if len(alternatives) < 2:
-                continue
-            # group by first symbol
-            groups = {}
-            for prod in alternatives:
-                key = prod[0] if prod else 'ε'
-                groups.setdefault(key, []).append(prod)
-
-            for key, group in groups.items():
-                if len(group) < 2:
-                    continue
-                # find longest common prefix among these prods
-                prefix = []
-                for symbols in zip(*group):
-                    if all(sym == symbols[0] for sym in symbols):
-                        prefix.append(symbols[0])
-                    else:
-                        break
-                if not prefix:
-                    continue
-                # create new non-terminal
-                A_dash = make_new_nt(A)
-                steps.append(f"Left factoring on {A}: common prefix {' '.join(prefix)} found; created {A_dash}.")
-                # build new alternatives
-                new_A_alts = []
-                for prod in alternatives:
-                    if prod[:len(prefix)] == prefix:
-                        # moved under A_dash
-                        suffix = prod[len(prefix):]
-                        if not suffix:
-                            prods.setdefault(A_dash, []).append(['ε'])
-                        else:
-                            prods.setdefault(A_dash, []).append(suffix)
-                    else:
-                        new_A_alts.append(prod)
-                # A -> prefix A_dash | other_alts
-                new_A_alts.append(list(prefix) + [A_dash])
-                prods[A] = new_A_alts
-                changed = True
-                break
-            if changed:
-                break
+    if analysis.useless_steps:
+        print("--- Useless Symbol Removal Steps ---")
+        for s in analysis.useless_steps:
+            print("-", s)
+        print('\nGrammar after removing useless symbols:\n')
+        print(format_productions(analysis.reduced_productions))
+        print('\n')
+    elif analysis.useless_steps is not None:
+        print("No useless symbols found.\n")
 
-    return prods, steps
+    if analysis.lr_steps:
+        print("--- Left Recursion Removal Steps ---")
+        for s in analysis.lr_steps:
+            print("-", s)
+        print('\nGrammar after left recursion removal:\n')
+        print(format_productions(analysis.lr_productions))
+        print('\n')
+    else:
+        print("No left recursion detected.\n")
 
+    if analysis.lf_steps:
+        print("--- Left Factoring Steps ---")
+        for s in analysis.lf_steps:
+            print("-", s)
+        print('\nGrammar after left factoring:\n')
+        print(format_productions(analysis.productions))
+        print('\n')
+    else:
+        print("No left factoring needed.\n")
+
+    if rows:
+        missing = [A for A in rows if A not in analysis.productions]
+        if missing:
+            print(f"Not in the transformed grammar (--rows): {', '.join(missing)}")
+    print_firsts_and_follows(analysis.productions, analysis.first, analysis.follow, rows)
+    print_parsing_table(analysis.productions, analysis.table, rows)
+    # Report LL(1) status
+    if analysis.conflicts:
+        print('\nGrammar is NOT LL(1). Conflicts found in parsing table:')
+        for (A, t, existing_prod, existing_origin, new_prod, new_origin) in analysis.conflicts:
+            existing_str = existing_origin or (' '.join(existing_prod))
+            new_str = new_origin or (' '.join(new_prod))
+            print(f"- Conflict at T[{A}][{t}]: existing -> {existing_str}, new -> {new_str}")
+    else:
+        print('\nGrammar appears to be LL(1) (no table conflicts detected).')
+
+
+def find_input_line(path, chunk_size=1 << 16):
+    """Return the value of the first `Input:` line in `path`, or None.
+
+    Reads at most `chunk_size` characters at a time, so very long lines of
+    plain tokens do not have to fit in memory.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        at_line_start = True
+        while True:
+            piece = f.readline(chunk_size)
+            if not piece:
+                return None
+            if at_line_start and piece.lstrip().lower().startswith('input:'):
+                line = piece
+                while not line.endswith('\n'):
+                    more = f.readline(chunk_size)
+                    if not more:
+                        break
+                    line += more
+                return line.split(':', 1)[1].strip()
+            at_line_start = piece.endswith('\n')
 
 
 def read_ops_file(path):
@@ -627,12 +1336,359 @@ def read_ops_file(path):
         return None
 
 
-def main(argv=None):
+def run_parse(input_string, start_symbol, table, compiled, tokenizer, args, input_path=None, recover=None):
+    """Parse one input the way the command-line flags ask and print the result.
+
+    `tokenizer` is a Tokenizer (built for `compiled` when that is given) or
+    None for the simple tokenize().  With `input_path` the tokens are
+    streamed from that file instead of taken from `input_string`.  `table`
+    may also be an lalr.LALRTable, which parses with the shift-reduce parser,
+    or a codegen.GeneratedParser.
+    `recover` (a PanicRecovery) makes the predictive parser report every
+    error instead of stopping at the first.
+    """
+    tail = None
+    build_tree = bool(args.tree or args.tree_file)
+    if compiled is not None:
+        if tokenizer is not None:
+            codes = (iter_file_tokens(input_path, tokenizer=tokenizer.iter_codes) if input_path
+                     else tokenizer.iter_codes(input_string))
+        else:
+            tokens = iter_file_tokens(input_path) if input_path else tokenize(input_string)
+            codes = compiled.encode_iter(tokens)
+        result = compiled.parse(codes, build_tree)
+    else:
+        if args.trace_tail:
+            trace = tail = RingTrace(args.trace_tail)
+        elif args.no_trace:
+            trace = None
+        elif hasattr(table, 'action'):
+            from lalr import print_lr_step
+
+            trace = print_lr_step
+        else:
+            trace = print_trace_step
+        if input_path:
+            source = iter_file_tokens(input_path, tokenizer=tokenizer)
+        elif tokenizer is not None:
+            source = tokenizer.tokens(input_string)
+        else:
+            source = input_string
+        if hasattr(table, 'parse'):
+            # LALRTable or codegen.GeneratedParser
+            result = table.parse(source, trace=trace, build_tree=build_tree)
+        else:
+            result = predictive_parse(source, start_symbol, table, trace=trace, build_tree=build_tree,
+                                      recover=recover)
+    if tail is not None:
+        print(f"Last {len(tail.records)} parser steps:")
+        print(tail.format())
+    print('\nParse result:', 'Accepted' if result else 'Rejected')
+    if not result:
+        for pos, token, expected in result.errors or [(result.error_pos, result.error_token, result.expected)]:
+            print(f"Error at token {pos} ({token}); expected one of: {', '.join(expected)}")
+        if result.errors:
+            print(f"{len(result.errors)} syntax error(s) found")
+    elif result.tree is not None:
+        if args.tree:
+            print('\nParse tree:')
+            print(result.tree.format())
+        if args.tree_file:
+            with open(args.tree_file, 'wb') as f:
+                f.write(result.tree.to_bytes())
+            print(f"Parse tree ({len(result.tree)} nodes) written to {args.tree_file}")
+    return result
+
+
+def run_batch(path, table, start_symbol, tokenizer, args):
+    """Parse each non-empty line of `path` with a worker pool and print the report."""
+    from batch import BatchParser
+
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = (line.strip() for line in f)
+        inputs = (line for line in lines if line and not line.startswith('#'))
+        with BatchParser(table, start_symbol, workers=args.workers, chunk_size=args.chunk_size,
+                         tokenizer=tokenizer) as bp:
+            for _ in bp.parse(inputs):
+                pass
+            print('\nBatch report:')
+            print(bp.report())
+
+
+def get_analysis(productions, start_symbol, args, timings=None):
+    """analyse_grammar(), through the on-disk cache when --cache is given.
+
+    `timings` collects per-stage seconds ('cache_load' on a cache hit).
+    """
+    reduce = not args.keep_useless
+    if not args.cache or args.no_cache:
+        return analyse_grammar(productions, start_symbol, args.engine, reduce, timings)
+    from grammar_cache import GrammarCache, grammar_key
+
+    cache = GrammarCache(args.cache_dir)
+    key = grammar_key(productions, start_symbol, reduce)
+    t0 = time.perf_counter()
+    analysis = cache.load(key)
+    if analysis is None:
+        analysis = analyse_grammar(productions, start_symbol, args.engine, reduce, timings)
+        t0 = time.perf_counter()
+        analysis.compile()
+        cache.store(key, analysis)
+        if timings is not None:
+            timings['cache_store'] = time.perf_counter() - t0
+    elif timings is not None:
+        timings['cache_load'] = time.perf_counter() - t0
+    return analysis
+
+
+def get_lalr(productions, start_symbol):
+    """Build and print the LALR(1) table of the untransformed grammar."""
+    from lalr import build_lalr, print_lalr
+
+    table = build_lalr(productions, start_symbol)
+    print_lalr(table)
+    return table
+
+
+def get_generated(analysis, args, name=None):
+    """The recursive-descent parser of the grammar: compiled in memory, or kept in --codegen-out."""
+    from codegen import build_parser, load_parser, module_path
+
+    if not args.codegen_out:
+        print("\nRecursive-descent parser: generated in memory")
+        return build_parser(analysis.productions, analysis.table, analysis.start_symbol)
+    path = module_path(args.codegen_out, args.grammar, name)
+    parser = load_parser(analysis.productions, analysis.table, analysis.start_symbol, path)
+    print(f"\nRecursive-descent parser: {'generated' if parser.generated else 'reusing'} {path}")
+    return parser
+
+
+def export_table(analysis, args, timings=None, name=None):
+    """Write FIRST/FOLLOW and the table to args.export (one file per block of a multi-test file)."""
+    from export import export_analysis
+
+    path = args.export
+    if name:
+        root, ext = os.path.splitext(path)
+        path = root + '_' + re.sub(r'\W', '_', name) + ext
+    t0 = time.perf_counter()
+    fmt = export_analysis(analysis, path, args.export_format, args.rows)
+    if timings is not None:
+        timings['export'] = time.perf_counter() - t0
+    print(f"\nExported FIRST/FOLLOW and the parsing table ({fmt}) to {path}")
+
+
+def prepare_parser(productions, start_symbol, args, token_patterns, timings=None, name=None):
+    """Print the analysis of one grammar and set up what run_parse needs.
+
+    Returns (productions, table, compiled, tokenizer, recover): the grammar
+    the table was built for, the dict table (or LALRTable, or with
+    --codegen the GeneratedParser), the CompiledTable with --compiled, the
+    grammar Tokenizer and the PanicRecovery with --recover.  `name` names
+    the block of a multi-test file (for the --codegen module).
+    """
+    recover = None
+    if args.parser == 'lalr':
+        # LALR(1) works on the grammar as written
+        t0 = time.perf_counter()
+        table, compiled = get_lalr(productions, start_symbol), None
+        if timings is not None:
+            timings['lalr'] = time.perf_counter() - t0
+    else:
+        # Transform, compute FIRST/FOLLOW and the table (or load them from the cache)
+        analysis = get_analysis(productions, start_symbol, args, timings)
+        t0 = time.perf_counter()
+        print_analysis(analysis, args.rows)
+        if timings is not None:
+            timings['print'] = time.perf_counter() - t0
+        if args.export:
+            export_table(analysis, args, timings, name)
+
+        # Use the transformed grammar from here on
+        productions, table = analysis.productions, analysis.table
+        compiled = analysis.compile() if args.compiled else None
+        if args.recover:
+            recover = PanicRecovery(table, analysis.follow, args.sync_token)
+        if args.codegen:
+            t0 = time.perf_counter()
+            table = get_generated(analysis, args, name)
+            if timings is not None:
+                timings['codegen'] = time.perf_counter() - t0
+    if compiled is not None:
+        print_compiled_stats(compiled)
+
+    tokenizer = None
+    if args.tokenizer == 'grammar':
+        tokenizer = make_tokenizer(productions, token_patterns, compiled)
+    return productions, table, compiled, tokenizer, recover
+
+
+def run_test_block(test, args, token_patterns, timings=None):
+    """Print and run one block of a multi-test file; True when Valid parses and Invalid does not."""
+    name = test['name'] or 'unnamed'
+    productions = test['productions']
+    start_symbol = test['start']
+
+    print('=' * 80)
+    print(f"Test: {name}")
+    print(f"Start symbol: {start_symbol}")
+    print("Original grammar:\n")
+    print(format_productions(productions))
+    print('\n')
+
+    productions, table, compiled, tokenizer, recover = prepare_parser(
+        productions, start_symbol, args, token_patterns, timings, name)
+
+    # Run valid and invalid inputs
+    case_results = []
+    t0 = time.perf_counter()
+    for label, input_string in [('Valid', test['valid']), ('Invalid', test['invalid'])]:
+        print(f"\n{label} Input: {input_string}\n")
+        res = run_parse(input_string, start_symbol, table, compiled, tokenizer, args, recover=recover)
+        case_results.append((label, bool(res)))
+    if timings is not None:
+        timings['parse'] = time.perf_counter() - t0
+
+    # record summary: expect Valid->True, Invalid->False
+    expected = {'Valid': True, 'Invalid': False}
+    return all((expected[label] == res) for (label, res) in case_results)
+
+
+def run_grammar_file(args, token_patterns, timings=None):
+    """Single-grammar mode: print the analysis of args.grammar and parse its input.
+
+    Returns the ParseResult (None for --batch-file).
+    """
+    t0 = time.perf_counter()
+    productions, start_symbol, input_from_grammar = load_grammar(args.grammar)
+    if timings is not None:
+        timings['load'] = time.perf_counter() - t0
+    if not productions:
+        print(f"No productions loaded from {args.grammar}")
+        sys.exit(1)
+    input_path = None
+    if args.input_string:
+        input_string = args.input_string
+    elif args.input_file:
+        # an Input: line wins; otherwise the whole file is streamed as tokens
+        input_string = find_input_line(args.input_file)
+        if input_string is None:
+            input_path = args.input_file
+    elif input_from_grammar:
+        input_string = input_from_grammar
+    elif args.batch_file:
+        input_string = None
+    else:
+        print('No input string provided (use --input-string, --batch-file or provide Input: in grammar file).')
+        sys.exit(1)
+
+    # Show original grammar
+    print(f"Using grammar from: {args.grammar}")
+    print(f"Start symbol: {start_symbol}")
+    print("Original grammar:\n")
+    print(format_productions(productions))
+    print('\n')
+
+    productions, table, compiled, tokenizer, recover = prepare_parser(
+        productions, start_symbol, args, token_patterns, timings)
+
+    if args.batch_file:
+        run_batch(args.batch_file, compiled if compiled is not None else table, start_symbol, tokenizer, args)
+        return None
+
+    if input_path:
+        print(f"\nInput: <tokens streamed from {input_path}>\n")
+    else:
+        print(f"\nInput: {input_string}\n")
+
+    # Run parser (detailed trace unless --no-trace / --trace-tail / --compiled)
+    t0 = time.perf_counter()
+    result = run_parse(input_string, start_symbol, table, compiled, tokenizer, args, input_path, recover)
+    if timings is not None:
+        timings['parse'] = time.perf_counter() - t0
+    return result
+
+
+def build_arg_parser():
     parser = argparse.ArgumentParser(description='Predictive parser that loads grammar from a file')
     parser.add_argument('--grammar', '-g', default='grammar.txt', help='Path to grammar file or consolidated tests file (default: grammar.txt)')
     parser.add_argument('--input-string', '-s', help='Input string to parse (tokens separated by spaces where appropriate). If omitted uses Input: from grammar file')
-    parser.add_argument('--input-file', '-i', help='File that contains an Input: line or plain input string')
+    parser.add_argument('--input-file', '-i', help='File that contains an Input: line or plain input tokens (streamed, so it may be very large)')
+    parser.add_argument('--parser', choices=['ll1', 'lalr'], default='ll1', help="'ll1' transforms the grammar and parses predictively (default); 'lalr' builds an LALR(1) table for the grammar as written and parses shift-reduce")
+    parser.add_argument('--engine', choices=sorted(FIRST_FOLLOW_ENGINES), default='fixpoint', help='Algorithm used for FIRST/FOLLOW sets (default: fixpoint)')
+    parser.add_argument('--compiled', action='store_true', help='Parse with the compiled integer table (no step-by-step trace)')
+    parser.add_argument('--codegen', action='store_true', help='Generate a recursive-descent Python module from the LL(1) table (in memory) and parse with it when no trace or tree is asked for')
+    parser.add_argument('--codegen-out', metavar='DIR', help='Write the --codegen module to DIR/<grammar>_ll1.py and reuse it while the grammar is unchanged; implies --codegen')
+    parser.add_argument('--no-trace', action='store_true', help='Do not print the parse trace, only the result')
+    parser.add_argument('--trace-tail', type=int, metavar='N', help='Instead of the full trace, print the last N parser steps after parsing')
+    parser.add_argument('--tokenizer', choices=['grammar', 'simple'], default='grammar', help="Input tokenizer: 'grammar' matches the grammar's terminals (default), 'simple' is the old id/operator splitter")
+    parser.add_argument('--token-pattern', action='append', default=[], metavar='NAME=REGEX', help='Regex for a terminal class when using the grammar tokenizer, e.g. id=[A-Za-z_]\\w* (repeatable)')
+    parser.add_argument('--batch-file', help='Parse every non-empty line of this file as a separate input (no trace) and print a batch report')
+    parser.add_argument('--workers', type=int, help='Worker processes for --batch-file (default: CPU count, 0 = in-process)')
+    parser.add_argument('--jobs', type=int, metavar='N', help='Run the blocks of a multi-test file on N worker processes (default: one after another in this process)')
+    parser.add_argument('--test-timeout', type=float, default=10.0, metavar='SECONDS', help='Time budget per block of a multi-test file (default: 10)')
+    parser.add_argument('--json-results', metavar='PATH', help='Also write the multi-test results, with per-stage timings, as JSON')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Inputs per worker task for --batch-file (default: 1000)')
+    parser.add_argument('--recover', action='store_true', help='Panic-mode error recovery: report every syntax error in one pass instead of stopping at the first')
+    parser.add_argument('--sync-token', action='append', default=[], metavar='TOKEN', help='Extra synchronizing token for --recover, e.g. ";" (repeatable; FOLLOW sets are always used)')
+    parser.add_argument('--keep-useless', action='store_true', help='Do not remove non-productive or unreachable non-terminals before the other transformations')
+    parser.add_argument('--tree', action='store_true', help='Build the parse tree and print it after an accepted parse')
+    parser.add_argument('--tree-file', help='Build the parse tree and save it in compact binary form (ParseTree.from_bytes reads it)')
+    parser.add_argument('--cache', action='store_true', help='Load the analysed grammar from the compiled-grammar cache, or store it there (off by default)')
+    parser.add_argument('--no-cache', action='store_true', help='Always rebuild the table, even with --cache or --cache-dir (the default)')
+    parser.add_argument('--clear-cache', action='store_true', help='Delete every cached grammar before running')
+    parser.add_argument('--cache-dir', help='Directory for the compiled-grammar cache; implies --cache (default: $EXPT6_CACHE_DIR, else $XDG_CACHE_HOME/expt6, else ~/.cache/expt6)')
+    parser.add_argument('--rows', action='append', metavar='A,B', help='Print FIRST/FOLLOW and parsing-table rows only for these non-terminals of the transformed grammar (comma-separated, repeatable)')
+    parser.add_argument('--export', metavar='PATH', help='Write FIRST, FOLLOW and the filled table cells (sparse) to PATH as CSV, JSON or Markdown')
+    parser.add_argument('--export-format', choices=['csv', 'json', 'md'], help='Format for --export (default: from the file extension)')
+    parser.add_argument('--stats', action='store_true', help='Print time, peak memory and algorithm counters per stage at the end')
+    parser.add_argument('--stats-json', metavar='PATH', help='Write the --stats report as JSON (per block for a multi-test file)')
+    return parser
+
+
+def report_stats(stats, args):
+    """Print and/or save a perfstats.Stats as --stats / --stats-json ask."""
+    if args.stats:
+        print('\n' + stats.report())
+    if args.stats_json:
+        stats.write_json(args.stats_json)
+
+
+def main(argv=None):
+    parser = build_arg_parser()
     args = parser.parse_args(argv)
+    if args.codegen_out:
+        args.codegen = True
+    if args.parser == 'lalr' and (args.compiled or args.codegen):
+        parser.error('--compiled and --codegen only apply to --parser ll1')
+    if args.compiled and args.codegen:
+        parser.error('choose one of --compiled and --codegen')
+    if args.recover and (args.compiled or args.codegen or args.parser == 'lalr'):
+        parser.error('--recover only applies to the predictive parser (--parser ll1 without --compiled or --codegen)')
+    if args.rows:
+        args.rows = [A.strip() for spec in args.rows for A in spec.split(',') if A.strip()]
+    if args.parser == 'lalr' and (args.rows or args.export):
+        parser.error('--rows and --export only apply to --parser ll1')
+    if args.export and not args.export_format:
+        from export import export_format
+
+        try:
+            export_format(args.export)
+        except ValueError as exc:
+            parser.error(str(exc))
+    if args.cache_dir:
+        args.cache = True
+    if args.clear_cache:
+        from grammar_cache import GrammarCache
+
+        removed = GrammarCache(args.cache_dir).clear()
+        print(f"Cleared {removed} cached grammar(s).")
+    token_patterns = {}
+    for spec in args.token_pattern:
+        name, sep, pattern = spec.partition('=')
+        if not sep or not name:
+            parser.error(f"--token-pattern expects NAME=REGEX, got {spec!r}")
+        token_patterns[name.strip()] = pattern
 
     # Detect consolidated tests file by presence of "Test:" or Valid/Invalid lines
     file_text = ''
@@ -658,70 +1714,23 @@ def main(argv=None):
         except Exception:
             pass
 
-        overall = []
-        for t in tests:
-            name = t['name'] or 'unnamed'
-            productions = t['productions']
-            start_symbol = t['start']
-
-            print('=' * 80)
-            print(f"Test: {name}")
-            print(f"Start symbol: {start_symbol}")
-            print("Original grammar:\n")
-            print(format_productions(productions))
-            print('\n')
-
-            # Transformations
-            productions_lr_removed, lr_steps = remove_left_recursion(productions)
-            if lr_steps:
-                print("--- Left Recursion Removal Steps ---")
-                for s in lr_steps:
-                    print("-", s)
-                print('\nGrammar after left recursion removal:\n')
-                print(format_productions(productions_lr_removed))
-                print('\n')
-            else:
-                print("No left recursion detected.\n")
-
-            productions_factored, lf_steps = left_factor(productions_lr_removed)
-            if lf_steps:
-                print("--- Left Factoring Steps ---")
-                for s in lf_steps:
-                    print("-", s)
-                print('\nGrammar after left factoring:\n')
-                print(format_productions(productions_factored))
-                print('\n')
-            else:
-                print("No left factoring needed.\n")
-
-            productions = productions_factored
-            first = compute_all_firsts(productions)
-            follow = compute_all_follows(productions, start_symbol, first)
-            table, conflicts, origins = construct_table(productions, first, follow)
-
-            print_firsts_and_follows(productions, first, follow)
-            print_parsing_table(productions, table)
-            if conflicts:
-                print('\nGrammar is NOT LL(1). Conflicts found in parsing table:')
-                for (A, tok, existing_prod, existing_origin, new_prod, new_origin) in conflicts:
-                    existing_str = existing_origin or (' '.join(existing_prod))
-                    new_str = new_origin or (' '.join(new_prod))
-                    print(f"- Conflict at T[{A}][{tok}]: existing -> {existing_str}, new -> {new_str}")
-            else:
-                print('\nGrammar appears to be LL(1) (no table conflicts detected).')
-
-            # Run valid and invalid inputs
-            case_results = []
-            for label, input_string in [('Valid', t['valid']), ('Invalid', t['invalid'])]:
-                print(f"\n{label} Input: {input_string}\n")
-                res = predictive_parse(input_string, start_symbol, table)
-                print('\nParse result:', 'Accepted' if res else 'Rejected')
-                case_results.append((label, res))
+        from testrunner import TestRunner, block_cases
 
-            # record summary: expect Valid->True, Invalid->False
-            expected = {'Valid': True, 'Invalid': False}
-            ok = all((expected[label] == res) for (label, res) in case_results)
-            overall.append((name, ok))
+        # blocks run one after another here, or across a worker pool with --jobs;
+        # output is printed in file order either way
+        runner = TestRunner(args, token_patterns, workers=args.jobs or 0, timeout=args.test_timeout)
+        overall = []
+        for outcome in runner.run(block_cases(tests)):
+            print(outcome.output, end='')
+            if outcome.status in ('ERROR', 'TIMEOUT'):
+                print(f"\n{outcome.status}: {outcome.message}")
+            overall.append((outcome.name, outcome.status == 'PASS'))
+        if args.json_results:
+            runner.write_json(args.json_results)
+        if args.stats_json:
+            with open(args.stats_json, 'w', encoding='utf-8') as f:
+                json.dump({o.name: o.stats for o in runner.outcomes}, f, indent=2)
+                f.write('\n')
 
         print('\n' + '=' * 80)
         print('Summary:')
@@ -735,34 +1744,6 @@ def main(argv=None):
         print('Tests: ' + ('PASS' if all(ok for _, ok in overall) else 'FAIL'))
         return
 
-    # Single-grammar legacy mode
-    productions, start_symbol, input_from_grammar = load_grammar(args.grammar)
-    if not productions:
-        print(f"No productions loaded from {args.grammar}")
-        sys.exit(1)
-    if args.input_string:
-        input_string = args.input_string
-    elif args.input_file:
-        # try to read first non-empty line or an Input: line
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            # if file contains lines, try to find Input:
-            for raw in content.splitlines():
-                line = raw.strip()
-                if not line or line.startswith('#'):
-                    continue
-                if line.lower().startswith('input:'):
-                    input_string = line.split(':', 1)[1].strip()
-                    break
-            else:
-                # fallback: use entire content as input
-                input_string = content
-    elif input_from_grammar:
-        input_string = input_from_grammar
-    else:
-        print('No input string provided (use --input-string or provide Input: in grammar file).')
-        sys.exit(1)
-
     # Ensure stdout/stderr use UTF-8 so symbols like 'ε' print correctly on Windows
     try:
         sys.stdout.reconfigure(encoding='utf-8')
@@ -771,69 +1752,13 @@ def main(argv=None):
         # older Python or streams that don't support reconfigure
         pass
 
-    # Show original grammar
-    print(f"Using grammar from: {args.grammar}")
-    print(f"Start symbol: {start_symbol}")
-    print("Original grammar:\n")
-    print(format_productions(productions))
-    print('\n')
-
-    # Remove left recursion and show steps
-    productions_lr_removed, lr_steps = remove_left_recursion(productions)
-    if lr_steps:
-        print("--- Left Recursion Removal Steps ---")
-        for s in lr_steps:
-            print("-", s)
-        print('\nGrammar after left recursion removal:\n')
-        print(format_productions(productions_lr_removed))
-        print('\n')
-    else:
-        print("No left recursion detected.\n")
-
-    # Apply left factoring and show steps
-    productions_factored, lf_steps = left_factor(productions_lr_removed)
-    if lf_steps:
-        print("--- Left Factoring Steps ---")
-        for s in lf_steps:
-            print("-", s)
-        print('\nGrammar after left factoring:\n')
-        print(format_productions(productions_factored))
-        print('\n')
-    else:
-        print("No left factoring needed.\n")
-
-    # Use the transformed grammar from here on
-    productions = productions_factored
-
-    # Compute FIRST sets (use iterative algorithm)
-    first = compute_all_firsts(productions)
-
-    # Compute FOLLOW sets (iterative)
-    follow = compute_all_follows(productions, start_symbol, first)
-
-    # Construct Parsing Table and detect LL(1) conflicts
-    table, conflicts, origins = construct_table(productions, first, follow)
-
-    # Print FIRST and FOLLOW nicely
-    print_firsts_and_follows(productions, first, follow)
-
-    # Print parsing table
-    print_parsing_table(productions, table)
-    # Report LL(1) status
-    if conflicts:
-        print('\nGrammar is NOT LL(1). Conflicts found in parsing table:')
-        for (A, t, existing_prod, existing_origin, new_prod, new_origin) in conflicts:
-            existing_str = existing_origin or (' '.join(existing_prod))
-            new_str = new_origin or (' '.join(new_prod))
-            print(f"- Conflict at T[{A}][{t}]: existing -> {existing_str}, new -> {new_str}")
+    # Single-grammar legacy mode
+    if args.stats or args.stats_json:
+        with perfstats.collecting() as stats:
+            run_grammar_file(args, token_patterns, stats)
+        report_stats(stats, args)
     else:
-        print('\nGrammar appears to be LL(1) (no table conflicts detected).')
-
-    print(f"\nInput: {input_string}\n")
-
-    # Run parser (detailed trace)
-    result = predictive_parse(input_string, start_symbol, table)
-    print('\nParse result:', 'Accepted' if result else 'Rejected')
+        run_grammar_file(args, token_patterns)
 
     # Note: ops/trace file display was removed per user request.
 
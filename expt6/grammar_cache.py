@@ -0,0 +1,351 @@
+"""On-disk cache of analysed grammars.
+
+Building the table for a large grammar (left-recursion removal, left
+factoring, FIRST/FOLLOW, construct_table, row-displacement packing) costs far
+more than parsing a short input, so the result is stored once per grammar and
+memory-mapped on later runs:
+
+    cache = GrammarCache()                  # see default_cache_dir()
+    key = grammar_key(productions, start)
+    analysis = cache.load(key)              # GrammarAnalysis or None
+    if analysis is None:
+        analysis = analyse_grammar(productions, start)
+        analysis.compile()
+        cache.store(key, analysis)
+
+The key hashes the grammar (productions in file order plus the start symbol)
+together with the format version and the source of expt6.py, of the
+grammarcore package and of this module, so editing the tool invalidates
+every entry.  Entries are written to a temporary file and
+renamed into place, so a crashed run never leaves a half-written entry.
+
+File layout (all integers native-endian, int32 unless noted; sections are
+8-byte aligned so they can be cast in place):
+
+    header   magic b'LL1CACHE', u32 format version, i32 0x01020304 (rejects
+             files written on a machine of the other byte order), u32 section
+             count, then (u64 offset, u64 length) per section in SECTIONS order
+    meta     UTF-8 JSON: start symbol, transformation steps, row width
+    symbols  every symbol name, UTF-8, one per line; symbol ids below index it
+    reduced, lr, grammar
+             productions after useless-symbol removal / left-recursion
+             removal / left factoring:
+             n, then per non-terminal: head, #alts, then per alt: len, symbols
+    first, follow
+             per non-terminal: head, #symbols, symbols
+    table    (head, terminal, production) triples in table order; production
+             numbers count the alternatives of `grammar` in order
+    conflicts
+             (head, terminal, existing production, new production) quadruples
+    compiled tables of the CompiledTable: terms, nonterms, production numbers,
+             then default/base/next/check (used straight from the mapping)
+             and `valid` as fixed-width little-endian row bitmasks
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+import expt6
+import grammarcore
+
+FORMAT_VERSION = 2
+MAGIC = b'LL1CACHE'
+SECTIONS = ('meta', 'symbols', 'reduced', 'lr', 'grammar', 'first', 'follow', 'table', 'conflicts',
+            'c_terms', 'c_nonterms', 'c_prods', 'c_default', 'c_base', 'c_next', 'c_check', 'c_valid')
+_HEADER = struct.Struct('=8sIiI')
+_ENTRY = struct.Struct('=QQ')
+_BYTE_ORDER_PROBE = 0x01020304
+_SUFFIX = '.llc'
+
+_tool_version = None
+
+
+def tool_version():
+    """Format version plus a hash of expt6.py, grammarcore and this module (computed once)."""
+    global _tool_version
+    if _tool_version is None:
+        h = hashlib.sha256()
+        core = os.path.dirname(grammarcore.__file__)
+        core_files = sorted(os.path.join(core, name) for name in os.listdir(core) if name.endswith('.py'))
+        for path in (expt6.__file__, *core_files, __file__):
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        _tool_version = f"{FORMAT_VERSION}-{h.hexdigest()[:16]}"
+    return _tool_version
+
+
+def grammar_key(productions, start_symbol, reduce=True):
+    """Cache key for a grammar: sha256 of the tool version, options and grammar text."""
+    h = hashlib.sha256()
+    h.update(tool_version().encode())
+    h.update(b'reduce' if reduce else b'keep')
+    h.update(b'\0' + start_symbol.encode('utf-8') + b'\0')
+    h.update(grammarcore.format_productions(productions).encode('utf-8'))
+    return h.hexdigest()
+
+
+def default_cache_dir():
+    """$EXPT6_CACHE_DIR, else $XDG_CACHE_HOME/expt6, else ~/.cache/expt6."""
+    path = os.environ.get('EXPT6_CACHE_DIR')
+    if path:
+        return path
+    base = os.environ.get('XDG_CACHE_HOME')
+    if not base or not os.path.isabs(base):  # the XDG spec says to ignore relative paths
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'expt6')
+
+
+class _Interner:
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def __call__(self, sym):
+        i = self.ids.get(sym)
+        if i is None:
+            i = self.ids[sym] = len(self.names)
+            self.names.append(sym)
+        return i
+
+
+def _encode_grammar(productions, sym):
+    out = array('i', [len(productions)])
+    for A, alts in productions.items():
+        out.append(sym(A))
+        out.append(len(alts))
+        for prod in alts:
+            out.append(len(prod))
+            out.extend(map(sym, prod))
+    return out
+
+
+def _decode_grammar(data, names):
+    data = data.tolist()
+    name = names.__getitem__
+    productions = {}
+    i = 1
+    for _ in range(data[0]):
+        alts = productions[names[data[i]]] = []
+        count = data[i + 1]
+        i += 2
+        for _ in range(count):
+            n = data[i]
+            alts.append(list(map(name, data[i + 1:i + 1 + n])))
+            i += 1 + n
+    return productions
+
+
+def _encode_sets(sets, ids):
+    # every member is already interned, so plain dict lookups suffice
+    out = array('i')
+    get = ids.__getitem__
+    for A, members in sets.items():
+        out.append(get(A))
+        out.append(len(members))
+        out.extend(map(get, members))
+    return out
+
+
+def _decode_sets(data, names):
+    data = data.tolist()
+    name = names.__getitem__
+    sets = {}
+    i = 0
+    while i < len(data):
+        n = data[i + 1]
+        sets[names[data[i]]] = set(map(name, data[i + 2:i + 2 + n]))
+        i += 2 + n
+    return sets
+
+
+def encode_analysis(analysis):
+    """Serialize a GrammarAnalysis (compiled table included) to bytes."""
+    sym = _Interner()
+    compiled = analysis.compile()
+    reduced = _encode_grammar(analysis.reduced_productions, sym)
+    lr = _encode_grammar(analysis.lr_productions, sym)
+    grammar = _encode_grammar(analysis.productions, sym)
+    # FIRST/FOLLOW and the table only add these to the grammar's symbols
+    for extra in ('ε', '$', *compiled.terms):
+        sym(extra)
+
+    # productions are referenced by their position among all alternatives
+    prod_no = {}
+    by_value = {}
+    for A, alts in analysis.productions.items():
+        for prod in alts:
+            prod_no[id(prod)] = len(prod_no)
+            by_value.setdefault((A, tuple(prod)), prod_no[id(prod)])
+
+    def number(A, prod):
+        n = prod_no.get(id(prod))
+        return by_value[(A, tuple(prod))] if n is None else n
+
+    table = array('i')
+    for (A, t), prod in analysis.table.items():
+        table.extend((sym(A), sym(t), number(A, prod)))
+    conflicts = array('i')
+    for A, t, existing, _, new, _ in analysis.conflicts:
+        conflicts.extend((sym(A), sym(t), number(A, existing), number(A, new)))
+
+    width = (len(compiled.terms) + 7) // 8
+    valid = b''.join(m.to_bytes(width, 'little') for m in compiled.valid)
+    sections = {
+        'reduced': reduced,
+        'lr': lr,
+        'grammar': grammar,
+        'first': _encode_sets(analysis.first, sym.ids),
+        'follow': _encode_sets(analysis.follow, sym.ids),
+        'table': table,
+        'conflicts': conflicts,
+        'c_terms': array('i', map(sym, compiled.terms)),
+        'c_nonterms': array('i', map(sym, compiled.nonterms)),
+        'c_prods': array('i', (number(A, prod) for A, prod in zip(compiled.prod_heads, compiled.prod_rhs))),
+        'c_default': array('i', compiled.default),
+        'c_base': array('i', compiled.base),
+        'c_next': array('i', compiled.next),
+        'c_check': array('i', compiled.check),
+        'c_valid': valid,
+    }
+    meta = {
+        'start': analysis.start_symbol,
+        'useless_steps': analysis.useless_steps,
+        'lr_steps': analysis.lr_steps,
+        'lf_steps': analysis.lf_steps,
+        'valid_width': width,
+    }
+    sections['meta'] = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    sections['symbols'] = '\n'.join(sym.names).encode('utf-8')
+
+    blobs = [sections[name] if isinstance(sections[name], bytes) else sections[name].tobytes()
+             for name in SECTIONS]
+    offset = _HEADER.size + _ENTRY.size * len(SECTIONS)
+    entries = []
+    body = bytearray()
+    for blob in blobs:
+        pad = -(offset + len(body)) % 8
+        body += bytes(pad)
+        entries.append(_ENTRY.pack(offset + len(body), len(blob)))
+        body += blob
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, _BYTE_ORDER_PROBE, len(SECTIONS))
+    return header + b''.join(entries) + bytes(body)
+
+
+def decode_analysis(buf):
+    """Rebuild a GrammarAnalysis from a cache entry (bytes or an mmap).
+
+    Returns None when `buf` is not a valid entry for this tool version.  The
+    compiled table's integer arrays are memoryviews into `buf`, so an mmap
+    must stay open for as long as the table is in use.
+    """
+    view = memoryview(buf)
+    if len(view) < _HEADER.size:
+        return None
+    magic, version, probe, count = _HEADER.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION or probe != _BYTE_ORDER_PROBE or count != len(SECTIONS):
+        return None
+    sec = {}
+    for i, name in enumerate(SECTIONS):
+        off, length = _ENTRY.unpack_from(view, _HEADER.size + i * _ENTRY.size)
+        sec[name] = view[off:off + length]
+
+    meta = json.loads(bytes(sec['meta']).decode('utf-8'))
+    names = bytes(sec['symbols']).decode('utf-8').split('\n')
+    ints = {name: sec[name].cast('i') for name in SECTIONS
+            if name not in ('meta', 'symbols', 'c_valid')}
+
+    reduced = _decode_grammar(ints['reduced'], names)
+    lr_productions = _decode_grammar(ints['lr'], names)
+    productions = _decode_grammar(ints['grammar'], names)
+    prods = [(A, prod) for A, alts in productions.items() for prod in alts]
+
+    table = {}
+    t = ints['table'].tolist()
+    for i in range(0, len(t), 3):
+        table[(names[t[i]], names[t[i + 1]])] = prods[t[i + 2]][1]
+    conflicts = []
+    c = ints['conflicts'].tolist()
+    arrow = grammarcore.PROD_ARROW
+    for i in range(0, len(c), 4):
+        A, tok = names[c[i]], names[c[i + 1]]
+        existing, new = prods[c[i + 2]][1], prods[c[i + 3]][1]
+        conflicts.append((A, tok, existing, f"{A} {arrow} {' '.join(existing)}",
+                          new, f"{A} {arrow} {' '.join(new)}"))
+
+    width = meta['valid_width']
+    vbytes = bytes(sec['c_valid'])
+    valid = [int.from_bytes(vbytes[i:i + width], 'little') for i in range(0, len(vbytes), width)]
+    compiled = expt6.CompiledTable.from_arrays(
+        [names[i] for i in ints['c_terms']],
+        [names[i] for i in ints['c_nonterms']],
+        meta['start'],
+        [prods[i] for i in ints['c_prods']],
+        ints['c_default'], valid, ints['c_base'], ints['c_next'], ints['c_check'],
+    )
+    return expt6.GrammarAnalysis(
+        meta['start'], reduced, meta['useless_steps'], lr_productions, meta['lr_steps'],
+        productions, meta['lf_steps'],
+        _decode_sets(ints['first'], names), _decode_sets(ints['follow'], names),
+        table, conflicts, compiled,
+    )
+
+
+class GrammarCache:
+    """A directory of cache entries, one file per grammar key."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_cache_dir()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def load(self, key):
+        """Return the cached GrammarAnalysis for `key`, or None on a miss."""
+        try:
+            with open(self.path(key), 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            return decode_analysis(mm)
+        except (ValueError, KeyError, IndexError, TypeError, StopIteration, struct.error):
+            # truncated or corrupt entry: treat as a miss, store() replaces it
+            return None
+
+    def store(self, key, analysis):
+        """Write `analysis` for `key`; failures (read-only disk, ...) are ignored."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            data = encode_analysis(analysis)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self.path(key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            return False
+        return True
+
+    def clear(self):
+        """Delete every entry; returns how many were removed."""
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            if name.endswith(_SUFFIX) or name.endswith('.tmp'):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                if name.endswith(_SUFFIX):
+                    removed += 1
+        return removed
@@ -0,0 +1,343 @@
+"""Editable grammar whose FIRST/FOLLOW sets and LL(1) table stay up to date.
+
+    g = IncrementalGrammar(productions, 'E')
+    g.add_production('F', ['num'])
+    g.remove_production("T'", ['ε'])
+    g.first, g.follow, g.table, g.conflicts   # same as a full recompute
+
+After an edit only the sets that can depend on the edited non-terminal are
+recomputed, and only the table rows whose predict sets can have changed are
+rebuilt:
+
+- Adding a production to an existing non-terminal can only make sets grow,
+  so the new production is evaluated and the growth is propagated along the
+  dependency edges (FIRST: "X occurs in a production of B"; FOLLOW: "Y
+  occurs in a production of X").
+- Removing a production (or giving productions to a symbol that was used as
+  a terminal until now) can make sets shrink.  The terminals that may have
+  lost their support are deleted along the same edges and then derived again
+  from what is left (delete and re-derive), so sets that never depended on
+  the removed production are not touched.
+
+The grammar is analysed as given: no useless-symbol removal, left-recursion
+removal or left factoring is applied.  `conflicts` lists the same entries
+as construct_table, grouped by non-terminal.
+"""
+import os
+import sys
+from collections import Counter, deque
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore import FIRST_FOLLOW_ENGINES, PROD_ARROW  # noqa: E402
+
+
+class IncrementalGrammar:
+    """A grammar with add_production / remove_production and live LL(1) analysis."""
+
+    def __init__(self, productions, start_symbol, engine='bitset'):
+        self.productions = {A: [list(p) for p in alts] for A, alts in productions.items()}
+        self.start_symbol = start_symbol
+        firsts_fn, follows_fn = FIRST_FOLLOW_ENGINES[engine]
+        self.first = firsts_fn(self.productions)
+        self.follow = follows_fn(self.productions, start_symbol, self.first)
+        # occurs[X][B] = number of occurrences of X in the productions of B
+        self._occurs = {}
+        for B, alts in self.productions.items():
+            for prod in alts:
+                self._count(B, prod, 1)
+        self.table = {}
+        self._rows = {}       # head -> terminals of its filled cells
+        self._conflicts = {}  # head -> conflicts found while building its row
+        for A in self.productions:
+            self._build_row(A)
+        self.last_update = {'first': 0, 'follow': 0, 'rows': 0}
+
+    # -- public API --------------------------------------------------------
+
+    @property
+    def conflicts(self):
+        return [c for A in self.productions for c in self._conflicts.get(A, ())]
+
+    def add_production(self, head, prod):
+        """Append `head -> prod` (a list of symbols; [] means ε)."""
+        prod = list(prod) or ['ε']
+        self.last_update = {'first': 0, 'follow': 0, 'rows': 0}
+        new_head = head not in self.productions
+        lost_first = {}
+        lost_follow = {}
+        if new_head:
+            # `head` was a terminal until now: every set it was added to may lose it
+            self.productions[head] = []
+            self.first[head] = set()
+            self.follow[head] = set()
+            lost_first = {B: {head} for B in self._users(head)}
+            self._lose_as_first(lost_follow, head, {head})
+        self.productions[head].append(prod)
+        self._count(head, prod, 1)
+        changed_first, shrunk = self._update_first(lost_first, {head})
+        if new_head:
+            changed_first.add(head)
+        grow = self._follow_seeds(prod, changed_first)
+        if new_head:
+            grow.add(head)
+        changed_follow = self._update_follow(lost_follow, shrunk, grow)
+        self._refresh_rows(head, changed_first, changed_follow)
+
+    def remove_production(self, head, prod):
+        """Remove the first `head -> prod` alternative; ValueError if there is none.
+
+        A non-terminal whose last production is removed stays in the grammar
+        with no productions.
+        """
+        prod = list(prod) or ['ε']
+        if prod not in self.productions.get(head, ()):
+            raise ValueError(f"no production {head} {PROD_ARROW} {' '.join(prod)}")
+        self.last_update = {'first': 0, 'follow': 0, 'rows': 0}
+        # what the production contributed, measured before anything changes
+        lost_first = {head: self._first_of_prod(prod)}
+        lost_follow = {}
+        for i, sym in enumerate(prod):
+            if sym in self.productions:
+                lost_follow.setdefault(sym, set()).update(self._follow_at(prod, i, head))
+        self.productions[head].remove(prod)
+        self._count(head, prod, -1)
+        changed_first, shrunk = self._update_first(lost_first, set())
+        changed_follow = self._update_follow(lost_follow, shrunk, self._follow_seeds((), changed_first))
+        self._refresh_rows(head, changed_first, changed_follow)
+
+    # -- bookkeeping -------------------------------------------------------
+
+    def _count(self, head, prod, delta):
+        for sym in prod:
+            occ = self._occurs.setdefault(sym, Counter())
+            occ[head] += delta
+            if occ[head] <= 0:
+                del occ[head]
+
+    def _users(self, sym):
+        """Non-terminals with a production that mentions `sym`."""
+        return self._occurs.get(sym, ())
+
+    def _members(self, sym):
+        """Non-terminals mentioned in the productions of `sym`."""
+        prods = self.productions
+        return {s for prod in prods.get(sym, ()) for s in prod if s in prods}
+
+    # -- FIRST -------------------------------------------------------------
+
+    def _first_of_prod(self, prod):
+        prods, first = self.productions, self.first
+        if len(prod) == 1 and prod[0] == 'ε':
+            return {'ε'}
+        out = set()
+        for sym in prod:
+            if sym not in prods:
+                out.add(sym)
+                return out
+            out |= first[sym] - {'ε'}
+            if 'ε' not in first[sym]:
+                return out
+        out.add('ε')
+        return out
+
+    def _first_of(self, A):
+        """FIRST(A) from its productions and the current sets (one step of compute_all_firsts)."""
+        out = set()
+        for prod in self.productions[A]:
+            out |= self._first_of_prod(prod)
+        return out
+
+    def _update_first(self, lost, grow):
+        """Delete-and-rederive FIRST.
+
+        Returns the non-terminals whose FIRST changed and, for those that
+        shrank, the terminals they lost.
+
+        `lost` maps non-terminals to terminals they may no longer derive.
+        Those are removed, together with everything derived from them by the
+        users of the non-terminal (losing ε may cost a user anything).  Then
+        the shrunken non-terminals and `grow` are evaluated again and any
+        growth is propagated.
+        """
+        first = self.first
+        old = {}
+        work = list(lost.items())
+        while work:
+            A, d = work.pop()
+            d = d & first[A]
+            if not d:
+                continue
+            if A not in old:
+                old[A] = set(first[A])
+            first[A] -= d
+            for B in self._users(A):
+                work.append((B, set(first[B]) if 'ε' in d else d - {'ε'}))
+        grown = set()
+        work = deque(set(old) | grow)
+        queued = set(work)
+        while work:
+            A = work.popleft()
+            queued.discard(A)
+            self.last_update['first'] += 1
+            new = self._first_of(A)
+            if not new <= first[A]:
+                first[A] |= new
+                grown.add(A)
+                for B in self._users(A):
+                    if B not in queued:
+                        queued.add(B)
+                        work.append(B)
+        shrunk = {A: s - first[A] for A, s in old.items() if s - first[A]}
+        return {A for A in old if first[A] != old[A]} | (grown - set(old)), shrunk
+
+    # -- FOLLOW ------------------------------------------------------------
+
+    def _follow_at(self, prod, i, head):
+        """What the occurrence prod[i] adds to its FOLLOW set (head is the production's head)."""
+        first = self.first
+        out = set()
+        for r in prod[i + 1:]:
+            if r in first:
+                out |= first[r] - {'ε'}
+                if 'ε' not in first[r]:
+                    return out
+            else:
+                out.add(r)
+                return out
+        return out | self.follow[head]
+
+    def _follow_of(self, X):
+        """FOLLOW(X) from its occurrences and the current sets (one step of compute_all_follows)."""
+        out = {'$'} if X == self.start_symbol else set()
+        for B in self._users(X):
+            for prod in self.productions[B]:
+                for i, sym in enumerate(prod):
+                    if sym == X:
+                        out |= self._follow_at(prod, i, B)
+        return out
+
+    def _tails(self, X):
+        """Non-terminals that inherit FOLLOW(X): those ending a production of X, up to nullable symbols."""
+        prods, first = self.productions, self.first
+        out = set()
+        for prod in prods.get(X, ()):
+            for sym in reversed(prod):
+                if sym in prods:
+                    out.add(sym)
+                    if 'ε' in first[sym]:
+                        continue
+                elif sym == 'ε' and len(prod) == 1:
+                    continue
+                break
+        return out
+
+    def _lose_as_first(self, lost, C, d):
+        """Record that symbols placed before C may lose d (whatever C began with)."""
+        prods, follow = self.productions, self.follow
+        for B in self._users(C):
+            for prod in prods[B]:
+                if C not in prod:
+                    continue
+                for sym in prod[:len(prod) - prod[::-1].index(C) - 1]:
+                    if sym in prods:
+                        lost.setdefault(sym, set()).update(follow[sym] if 'ε' in d else d)
+
+    def _follow_seeds(self, prod, changed_first):
+        """Non-terminals whose FOLLOW formula saw the edit or a changed FIRST set."""
+        prods = self.productions
+        seeds = {s for s in prod if s in prods}
+        for C in changed_first:
+            for B in self._users(C):
+                for p in prods[B]:
+                    if C in p:
+                        seeds.update(s for s in p if s in prods)
+        return seeds
+
+    def _update_follow(self, lost, shrunk, grow):
+        """Delete-and-rederive FOLLOW, as _update_first does for FIRST."""
+        for C, d in shrunk.items():
+            self._lose_as_first(lost, C, d)
+        follow = self.follow
+        old = {}
+        work = list(lost.items())
+        while work:
+            X, d = work.pop()
+            d = d & follow[X]
+            if not d:
+                continue
+            if X not in old:
+                old[X] = set(follow[X])
+            follow[X] -= d
+            for Y in self._tails(X):
+                work.append((Y, d))
+        grown = set()
+        work = deque(set(old) | grow)
+        queued = set(work)
+        while work:
+            X = work.popleft()
+            queued.discard(X)
+            self.last_update['follow'] += 1
+            new = self._follow_of(X)
+            if not new <= follow[X]:
+                follow[X] |= new
+                grown.add(X)
+                for Y in self._members(X):
+                    if Y not in queued:
+                        queued.add(Y)
+                        work.append(Y)
+        return {X for X in old if follow[X] != old[X]} | (grown - set(old))
+
+    # -- table -------------------------------------------------------------
+
+    def _refresh_rows(self, head, changed_first, changed_follow):
+        rows = {head} | changed_follow
+        for C in changed_first:
+            rows.update(self._users(C))
+        for A in rows:
+            if A in self.productions:
+                self._build_row(A)
+        self.last_update = dict(self.last_update, rows=len(rows))
+
+    def _build_row(self, head):
+        """Rebuild T[head][*] exactly as construct_table fills it."""
+        table, first, follow = self.table, self.first, self.follow
+        for t in self._rows.pop(head, ()):
+            del table[(head, t)]
+        filled = []
+        conflicts = []
+        origins = {}
+        for prod in self.productions[head]:
+            prod_str = ' '.join(prod)
+            first_set = set()
+            if not (len(prod) == 1 and prod[0] == 'ε'):
+                for s in prod:
+                    if s in first:
+                        first_set |= (first[s] - {'ε'})
+                        if 'ε' not in first[s]:
+                            break
+                    else:
+                        first_set.add(s)
+                        break
+                else:
+                    first_set.add('ε')
+            else:
+                first_set.add('ε')
+            # sorted like construct_table, so the conflicts come out in its order
+            lookaheads = sorted(first_set - {'ε'})
+            if 'ε' in first_set:
+                lookaheads += sorted(follow.get(head, ()))
+            origin = f"{head} {PROD_ARROW} {prod_str}"
+            for t in lookaheads:
+                key = (head, t)
+                if key in table and table[key] != prod:
+                    conflicts.append((head, t, table[key], origins.get(t, ''), prod, origin))
+                else:
+                    if key not in table:
+                        filled.append(t)
+                    table[key] = prod
+                    origins[t] = origin
+        self._rows[head] = filled
+        self._conflicts[head] = conflicts
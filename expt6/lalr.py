@@ -0,0 +1,401 @@
+"""LALR(1) tables and a table-driven shift-reduce parser.
+
+The LL(1) path has to remove left recursion and left factor a grammar
+before construct_table accepts it.  An LALR(1) table is built from the
+grammar as written, so `E -> E + T | T` parses directly and the stack
+stays as deep as the nesting of the input, not as long as it.
+
+    table = build_lalr(productions, start_symbol)
+    print_lalr(table)                 # states, ACTION/GOTO grid, conflicts
+    result = table.parse('id + id * id', trace=None)
+
+Construction follows the "efficient construction of LALR parsing tables"
+method: build the LR(0) item sets, then for every kernel item work out once
+which lookaheads its closure generates spontaneously and which it passes on
+to kernel items of the successor states, and propagate along those links
+until nothing changes.  The closure lookaheads depend only on the item, not
+on the state, so they are computed once per LR(0) item.
+
+Conflicts are resolved the way yacc does (shift over reduce, the earlier
+production on reduce/reduce) and every one of them is listed in
+`conflicts`, like construct_table lists LL(1) conflicts.
+"""
+from array import array
+
+from expt6 import ParseResult, ParseStep, ParseTree, input_tokens, pretty_sym
+from grammarcore import PROD_ARROW
+
+ACCEPT = ~0  # action code of "reduce by the augmented production"
+
+
+def _rhs(prod):
+    return tuple(s for s in prod if s != 'ε')
+
+
+class LALRTable:
+    """ACTION/GOTO tables of one grammar.
+
+    `prods` lists (head, rhs) with the augmented start production at
+    index 0.  `action[state]` maps a terminal to a code: j >= 0 shifts and
+    goes to state j, ~p reduces by production p (ACCEPT for production 0).
+    `goto[state]` maps a non-terminal to the next state.  `kernels` holds
+    the kernel items (production, dot) of every state, and `conflicts` the
+    tuples (state, terminal, kind, kept code, dropped code).
+    """
+
+    def __init__(self, start_symbol, prods, nonterminals, terminals, kernels, action, goto, conflicts):
+        self.start_symbol = start_symbol
+        self.prods = prods
+        self.nonterminals = nonterminals
+        self.terminals = terminals
+        self.kernels = kernels
+        self.action = action
+        self.goto = goto
+        self.conflicts = conflicts
+
+    def expected(self, state):
+        return sorted(self.action[state])
+
+    def describe(self, code):
+        """'shift 4', 'reduce E ⇒ E + T' or 'accept' for an action code."""
+        if code >= 0:
+            return f"shift {code}"
+        if code == ACCEPT:
+            return 'accept'
+        head, rhs = self.prods[~code]
+        return f"reduce {head} {PROD_ARROW} {' '.join(rhs) or 'ε'}"
+
+    def parse(self, input_string, trace=None, build_tree=False):
+        return lr_parse(input_string, self, trace, build_tree)
+
+
+def build_lalr(productions, start_symbol):
+    """Build the LALR(1) table for `productions` (dict head -> list of alternatives)."""
+    aug = start_symbol + "'"
+    while aug in productions:
+        aug += "'"
+    prods = [(aug, (start_symbol,))]
+    by_head = {}
+    for A, alts in productions.items():
+        for prod in alts:
+            by_head.setdefault(A, []).append(len(prods))
+            prods.append((A, _rhs(prod)))
+    by_head[aug] = [0]
+    nonterminals = [A for A in productions]
+    terminals = []
+    seen = set(productions)
+    for _, rhs in prods:
+        for s in rhs:
+            if s not in seen:
+                seen.add(s)
+                terminals.append(s)
+    terminals.append('$')
+
+    first, nullable = _first_sets(prods, by_head)
+
+    def first_of(seq):
+        out = set()
+        for s in seq:
+            if s not in by_head:
+                out.add(s)
+                return out, False
+            out |= first[s]
+            if s not in nullable:
+                return out, False
+        return out, True
+
+    # LR(0) item sets: a state is its sorted tuple of kernel items
+    starts = {}  # non-terminal -> non-terminals whose productions its closure adds
+    for A in by_head:
+        reach = [A]
+        seen = {A}
+        for B in reach:
+            for q in by_head[B]:
+                rhs = prods[q][1]
+                if rhs and rhs[0] in by_head and rhs[0] not in seen:
+                    seen.add(rhs[0])
+                    reach.append(rhs[0])
+        starts[A] = reach
+
+    kernels = [((0, 0),)]
+    index = {kernels[0]: 0}
+    trans = []  # state -> {symbol: state}
+    for kernel in kernels:
+        closed = set()
+        items = list(kernel)
+        for p, d in kernel:
+            rhs = prods[p][1]
+            if d < len(rhs) and rhs[d] in by_head:
+                for B in starts[rhs[d]]:
+                    if B not in closed:
+                        closed.add(B)
+                        items.extend((q, 0) for q in by_head[B])
+        moves = {}
+        for p, d in items:
+            rhs = prods[p][1]
+            if d < len(rhs):
+                moves.setdefault(rhs[d], []).append((p, d + 1))
+        row = {}
+        for sym, succ in moves.items():
+            succ = tuple(sorted(succ))
+            j = index.get(succ)
+            if j is None:
+                j = index[succ] = len(kernels)
+                kernels.append(succ)
+            row[sym] = j
+        trans.append(row)
+
+    # closure lookaheads per LR(0) item: non-terminal -> lookaheads, '#'
+    # standing for "whatever the item itself has"
+    item_la = {}
+
+    def closure_la(p, d):
+        key = (p, d)
+        la = item_la.get(key)
+        if la is not None:
+            return la
+        la = {}
+        rhs = prods[p][1]
+        if d < len(rhs) and rhs[d] in by_head:
+            look, null = first_of(rhs[d + 1:])
+            if null:
+                look.add('#')
+            la[rhs[d]] = look
+            work = [rhs[d]]
+            while work:
+                B = work.pop()
+                for q in by_head[B]:
+                    r = prods[q][1]
+                    if r and r[0] in by_head:
+                        look, null = first_of(r[1:])
+                        if null:
+                            look |= la[B]
+                        cur = la.setdefault(r[0], set())
+                        if not look <= cur:
+                            cur |= look
+                            work.append(r[0])
+        item_la[key] = la
+        return la
+
+    # kernel item ids: offsets[state] + position in its kernel
+    offsets = []
+    total = 0
+    for kernel in kernels:
+        offsets.append(total)
+        total += len(kernel)
+    kid = {}
+    for s, kernel in enumerate(kernels):
+        for k, item in enumerate(kernel):
+            kid[(s, item)] = offsets[s] + k
+    lookahead = [set() for _ in range(total)]
+    links = [[] for _ in range(total)]
+    lookahead[0].add('$')
+    for s, kernel in enumerate(kernels):
+        row = trans[s]
+        for k, (p, d) in enumerate(kernel):
+            src = offsets[s] + k
+            rhs = prods[p][1]
+            if d < len(rhs):
+                links[src].append(kid[(row[rhs[d]], (p, d + 1))])
+            for B, look in closure_la(p, d).items():
+                spont = look - {'#'}
+                for q in by_head[B]:
+                    r = prods[q][1]
+                    if not r:
+                        continue
+                    dst = kid[(row[r[0]], (q, 1))]
+                    lookahead[dst] |= spont
+                    if '#' in look:
+                        links[src].append(dst)
+    work = [i for i in range(total) if lookahead[i]]
+    while work:
+        src = work.pop()
+        look = lookahead[src]
+        for dst in links[src]:
+            if not look <= lookahead[dst]:
+                lookahead[dst] |= look
+                work.append(dst)
+
+    action = []
+    goto = []
+    conflicts = []
+    for s, kernel in enumerate(kernels):
+        row = {}
+        gt = {}
+        for sym, j in trans[s].items():
+            if sym in by_head:
+                gt[sym] = j
+            else:
+                row[sym] = j
+        reduces = {}
+        for k, (p, d) in enumerate(kernel):
+            if d == len(prods[p][1]):
+                reduces.setdefault(p, set()).update(lookahead[offsets[s] + k])
+            for B, look in closure_la(p, d).items():
+                for q in by_head[B]:
+                    if not prods[q][1]:
+                        got = reduces.setdefault(q, set())
+                        got |= look - {'#'}
+                        if '#' in look:
+                            got |= lookahead[offsets[s] + k]
+        for p in sorted(reduces):
+            code = ~p
+            for t in sorted(reduces[p]):
+                old = row.get(t)
+                if old is None:
+                    row[t] = code
+                elif old >= 0:
+                    conflicts.append((s, t, 'shift/reduce', old, code))
+                elif prods[~old] != prods[p]:
+                    # identical alternatives are no conflict (as in construct_table)
+                    conflicts.append((s, t, 'reduce/reduce', old, code))
+        action.append(row)
+        goto.append(gt)
+    return LALRTable(start_symbol, prods, nonterminals, terminals, kernels, action, goto, conflicts)
+
+
+def _first_sets(prods, by_head):
+    """FIRST (without ε) and the nullable non-terminals of numbered productions."""
+    first = {A: set() for A in by_head}
+    nullable = set()
+    changed = True
+    while changed:
+        changed = False
+        for A, rhs in prods:
+            cur = first[A]
+            size = len(cur)
+            for s in rhs:
+                if s not in by_head:
+                    cur.add(s)
+                    break
+                cur |= first[s]
+                if s not in nullable:
+                    break
+            else:
+                if A not in nullable:
+                    nullable.add(A)
+                    changed = True
+            if len(cur) != size:
+                changed = True
+    return first, nullable
+
+
+def print_lr_step(step):
+    """Trace: Buffer | Stack | Action, with the stack top on the right."""
+    if step.index == 0:
+        print(f"{'Buffer':<30}{'Stack':<30}{'Action'}")
+    if step.tokens is not None:
+        buffer_str = ' '.join(step.tokens[step.pos:])
+    else:
+        buffer_str = step.lookahead if step.lookahead == '$' else f"{step.lookahead} ..."
+    stack_str = ' '.join(step.stack)
+    if step.kind == 'shift':
+        action = f"Shift {step.lookahead}, goto {step.top}"
+    elif step.kind == 'reduce':
+        action = f"Reduce {step.top} {PROD_ARROW} {' '.join(pretty_sym(s) for s in step.prod) or 'ε'}"
+    elif step.kind == 'accept':
+        action = 'Accept'
+    else:
+        action = 'Error: no action'
+    print(f"{buffer_str:<30}{stack_str:<30}{action}")
+
+
+def lr_parse(input_string, table, trace=print_lr_step, build_tree=False):
+    """Shift-reduce parse of `input_string` with an LALRTable.
+
+    Takes the same inputs and trace callbacks as predictive_parse.  The
+    ParseStep kinds are 'shift' (top = the state entered), 'reduce' (top
+    = head, prod = right-hand side), 'accept' and 'error' (top = the
+    current state); `stack` is the symbol stack, bottom first.
+    """
+    tokens, stream = input_tokens(input_string)
+    action, goto, prods = table.action, table.goto, table.prods
+    states = [0]
+    symbols = ['$']
+    reductions = array('i')  # production per reduction when building a tree
+    i = 0
+    n = 0
+    current_input = next(stream, '$')
+    while True:
+        code = action[states[-1]].get(current_input)
+        if code is None:
+            if trace:
+                trace(ParseStep(n, 'error', states[-1], current_input, i, None, symbols, tokens))
+            return ParseResult(False, i, current_input, table.expected(states[-1]), n + 1)
+        if code >= 0:
+            if trace:
+                trace(ParseStep(n, 'shift', code, current_input, i, None, symbols, tokens))
+            states.append(code)
+            symbols.append(current_input)
+            i += 1
+            current_input = next(stream, '$')
+        elif code == ACCEPT:
+            if trace:
+                trace(ParseStep(n, 'accept', states[-1], current_input, i, None, symbols, tokens))
+            tree = _reduction_tree(table, reductions) if build_tree else None
+            return ParseResult(True, steps=n + 1, tree=tree)
+        else:
+            p = ~code
+            head, rhs = prods[p]
+            if trace:
+                trace(ParseStep(n, 'reduce', head, current_input, i, rhs, symbols, tokens))
+            k = len(rhs)
+            if k:
+                del states[-k:]
+                del symbols[-k:]
+            states.append(goto[states[-1]][head])
+            symbols.append(head)
+            if build_tree:
+                reductions.append(p)
+        n += 1
+
+
+def _reduction_tree(table, reductions):
+    """ParseTree from the reductions of an accepted parse (a rightmost derivation in reverse)."""
+    tree = ParseTree()
+    sid = tree.symbol_id
+    rules = [[sid(s) for s in rhs] or [sid('ε')] for _, rhs in table.prods]
+    nonterminals = {sid(A) for A in table.nonterminals}
+    return ParseTree.from_derivation(tree.names, sid(table.start_symbol), rules, reductions[::-1],
+                                     nonterminals, rightmost=True)
+
+
+def print_lalr(table):
+    """Print the numbered productions, the item sets, the ACTION/GOTO grid and the conflicts."""
+    prods = table.prods
+    print('Numbered productions:\n')
+    for p, (head, rhs) in enumerate(prods):
+        print(f"  {p}: {head} {PROD_ARROW} {' '.join(pretty_sym(s) for s in rhs) or 'ε'}")
+
+    print('\nLALR(1) item sets (kernel items):\n')
+    for s, kernel in enumerate(table.kernels):
+        items = []
+        for p, d in kernel:
+            head, rhs = prods[p]
+            items.append(f"{head} {PROD_ARROW} {' '.join(rhs[:d] + ('·',) + rhs[d:])}")
+        print(f"  I{s}: " + ' | '.join(items))
+
+    terms, nonterms = table.terminals, table.nonterminals
+    cells = []
+    for s in range(len(table.kernels)):
+        row = {}
+        for t, code in table.action[s].items():
+            row[t] = 'acc' if code == ACCEPT else (f"s{code}" if code >= 0 else f"r{~code}")
+        for A, j in table.goto[s].items():
+            row[A] = str(j)
+        cells.append(row)
+    cols = terms + nonterms
+    widths = {c: max([len(c)] + [len(r.get(c, '')) for r in cells]) + 2 for c in cols}
+    state_w = max(6, len(str(len(cells)))) + 2
+    print('\nACTION / GOTO table:\n')
+    print(f"{'State':<{state_w}}" + ''.join(f"{c:<{widths[c]}}" for c in cols))
+    for s, row in enumerate(cells):
+        print(f"{s:<{state_w}}" + ''.join(f"{row.get(c, ''):<{widths[c]}}" for c in cols))
+
+    if table.conflicts:
+        print('\nGrammar is NOT LALR(1). Conflicts found in ACTION table:')
+        for s, t, kind, kept, dropped in table.conflicts:
+            print(f"- {kind} conflict at ACTION[{s}][{t}]: existing -> {table.describe(kept)}, "
+                  f"new -> {table.describe(dropped)} (existing kept)")
+    else:
+        print('\nGrammar is LALR(1) (no ACTION conflicts detected).')
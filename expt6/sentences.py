@@ -0,0 +1,232 @@
+"""Random sentences of a grammar, for building load-test corpora.
+
+    gen = SentenceGenerator(analysis.productions, analysis.start_symbol, analysis.table, seed=1)
+    gen.sentence(50)                      # a valid token list of at most 50 tokens
+    gen.invalid(50)                       # a valid sentence with one edit that the table rejects
+    gen.write('corpus.txt', 100000, 50, invalid=0.1)
+
+Every non-terminal's shortest derivation (fewest terminals) is found once
+with Knuth's generalisation of Dijkstra's algorithm.  While a sentence is
+generated the generator knows how many tokens the symbols still on its
+stack need at least, so it only picks alternatives that fit in what is left
+of the target length and finishes every non-terminal along its shortest
+derivation once nothing is left: no recursion, no runaway sentences.
+Alternatives that make the sentence longer are preferred while much of the
+target length is still unused, so sentences come out close to it.
+
+invalid() deletes, inserts, replaces or swaps tokens of a valid sentence;
+with the LL(1) `table` of a conflict-free grammar it retries until the
+table rejects the result.  The grammar should be the transformed one
+(GrammarAnalysis.productions), which derives the same sentences.
+
+Command line (one sentence per line, ready for --batch-file):
+
+    python sentences.py -g tests/grammars/expr_lr.txt -n 100000 --length 40 --invalid 0.1 -o corpus.txt
+"""
+import heapq
+import random
+from bisect import bisect_right
+
+from expt6 import predictive_parse
+
+
+def shortest_derivations(productions):
+    """Return (min_len, best): fewest terminals each non-terminal derives, and the alternative doing so.
+
+    best[A] is an index into productions[A]; following best never cycles,
+    because a non-terminal is only settled after every non-terminal of its
+    chosen alternative.  Non-terminals that derive no terminal string are
+    left out of both dicts.
+    """
+    min_len, best = {}, {}
+    waiting = {}  # non-terminal -> [(head, index)] of alternatives using it
+    unsettled = []  # per alternative: non-terminal occurrences not yet settled
+    known = []  # per alternative: terminals it contains
+    refs = []
+    heap = []
+    for head, alts in productions.items():
+        for k, prod in enumerate(alts):
+            a = len(refs)
+            refs.append((head, k))
+            nts = [s for s in prod if s in productions]
+            known.append(sum(1 for s in prod if s not in productions and s != 'ε'))
+            unsettled.append(len(nts))
+            for s in nts:
+                waiting.setdefault(s, []).append(a)
+            if not nts:
+                heapq.heappush(heap, (known[a], a))
+    while heap:
+        length, a = heapq.heappop(heap)
+        head, k = refs[a]
+        if head in min_len:
+            continue
+        min_len[head], best[head] = length, k
+        for b in waiting.get(head, ()):
+            known[b] += length
+            unsettled[b] -= 1
+            if not unsettled[b]:
+                heapq.heappush(heap, (known[b], b))
+    return min_len, best
+
+
+class SentenceGenerator:
+    """Generate random sentences of (productions, start_symbol); see the module docstring."""
+
+    def __init__(self, productions, start_symbol, table=None, conflicts=None, seed=None):
+        self.start_symbol = start_symbol
+        self.table = table
+        # only a conflict-free table tells valid from invalid reliably
+        self.checked = table is not None and not conflicts
+        self.min_len, best = shortest_derivations(productions)
+        if start_symbol not in self.min_len:
+            raise ValueError(f"{start_symbol} derives no terminal string")
+        self.rng = random.Random(seed)
+        self.terminals = sorted({s for alts in productions.values() for p in alts
+                                 for s in p if s not in productions and s != 'ε'})
+        # per non-terminal: usable alternatives sorted by extra length over the
+        # shortest one, as reversed tuples ready to push on the stack
+        self.alts = {}
+        for A, alts in productions.items():
+            if A not in self.min_len:
+                continue
+            entries = []
+            for k, prod in enumerate(alts):
+                syms = [s for s in prod if s != 'ε']
+                if any(s in productions and s not in self.min_len for s in syms):
+                    continue
+                extra = sum(self.min_len.get(s, 1) for s in syms) - self.min_len[A]
+                # the shortest derivation's own alternative goes first
+                entries.append((extra, k != best[A], k, tuple(reversed(syms))))
+            entries.sort()
+            extras = [e[0] for e in entries]
+            self.alts[A] = ([e[3] for e in entries], extras, bisect_right(extras, 0))
+
+    def sentence(self, length):
+        """Return a random sentence (list of tokens) of at most max(length, shortest) tokens."""
+        alts = self.alts
+        rand = self.rng.random
+        out = []
+        emit = out.append
+        stack = [self.start_symbol]
+        pop, push = stack.pop, stack.extend
+        reserved = self.min_len[self.start_symbol]  # tokens the stack needs at least
+        budget = 4 * length + 64  # expansions allowed before only shortest ones are taken
+        while stack:
+            sym = pop()
+            entry = alts.get(sym)
+            if entry is None:
+                emit(sym)
+                reserved -= 1
+                continue
+            bodies, extras, zero = entry
+            slack = length - len(out) - reserved
+            budget -= 1
+            if slack <= 0 or budget < 0:
+                k = 0
+            else:
+                hi = bisect_right(extras, slack)
+                if hi > zero and rand() * length < slack:
+                    k = zero + int(rand() * (hi - zero))
+                else:
+                    k = int(rand() * hi)
+                reserved += extras[k]
+            push(bodies[k])
+        return out
+
+    def mutate(self, tokens):
+        """Return a copy of `tokens` with one random delete, insert, replace or swap.
+
+        A grammar without terminals has nothing to insert or replace with, so
+        only deletes and swaps are left; empty `tokens` then come back unchanged.
+        """
+        rng = self.rng
+        tokens = list(tokens)
+        n = len(tokens)
+        if self.terminals:
+            op = rng.randrange(4) if n > 1 else rng.choice((1, 2)) if n else 1
+        elif n:
+            op = rng.choice((0, 3)) if n > 1 else 0
+        else:
+            return tokens
+        i = rng.randrange(n) if n else 0
+        if op == 0:
+            del tokens[i]
+        elif op == 1:
+            tokens.insert(rng.randrange(n + 1), rng.choice(self.terminals))
+        elif op == 2:
+            tokens[i] = rng.choice(self.terminals)
+        else:
+            j = i + 1 if i + 1 < n else i - 1
+            tokens[i], tokens[j] = tokens[j], tokens[i]
+        return tokens
+
+    def invalid(self, length, attempts=20):
+        """Return a near-valid sentence: a valid one with one edit (rejected by the table when checked).
+
+        The sentence is returned unedited when the grammar has no terminals.
+        """
+        tokens = self.sentence(length)
+        mutated = self.mutate(tokens)
+        if self.checked:
+            for _ in range(attempts):
+                if not predictive_parse(mutated, self.start_symbol, self.table, trace=None):
+                    break
+                mutated = self.mutate(tokens)
+        return mutated
+
+    def sentences(self, count, length, invalid=0.0):
+        """Yield `count` sentences; a fraction `invalid` of them are invalid()."""
+        rand = self.rng.random
+        for _ in range(count):
+            if invalid and rand() < invalid:
+                yield self.invalid(length)
+            else:
+                yield self.sentence(length)
+
+    def write(self, path, count, length, invalid=0.0, chunk=1000):
+        """Stream `count` sentences to `path`, one per line; returns the number of tokens written."""
+        tokens = 0
+        lines = []
+        with open(path, 'w', encoding='utf-8') as f:
+            for s in self.sentences(count, length, invalid):
+                tokens += len(s)
+                lines.append(' '.join(s))
+                if len(lines) >= chunk:
+                    lines.append('')
+                    f.write('\n'.join(lines))
+                    lines = []
+            if lines:
+                lines.append('')
+                f.write('\n'.join(lines))
+        return tokens
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    from expt6 import analyse_grammar, load_grammar
+
+    parser = argparse.ArgumentParser(description='Write random sentences of a grammar, one per line')
+    parser.add_argument('--grammar', '-g', default='grammar.txt', help='Grammar file (default: grammar.txt)')
+    parser.add_argument('--count', '-n', type=int, default=1000, help='Number of sentences (default: 1000)')
+    parser.add_argument('--length', '-l', type=int, default=20, help='Target sentence length in tokens (default: 20)')
+    parser.add_argument('--invalid', type=float, default=0.0, help='Fraction of mutated, invalid sentences (default: 0)')
+    parser.add_argument('--seed', type=int, help='Random seed')
+    parser.add_argument('--output', '-o', default='corpus.txt', help='Output file (default: corpus.txt)')
+    args = parser.parse_args(argv)
+
+    productions, start_symbol, _ = load_grammar(args.grammar)
+    analysis = analyse_grammar(productions, start_symbol, 'bitset')
+    gen = SentenceGenerator(analysis.productions, start_symbol, analysis.table, analysis.conflicts, args.seed)
+    t0 = time.perf_counter()
+    tokens = gen.write(args.output, args.count, args.length, args.invalid)
+    seconds = time.perf_counter() - t0
+    print(f"Wrote {args.count} sentences ({tokens} tokens) to {args.output} in {seconds:.2f}s "
+          f"({tokens / seconds if seconds else 0:,.0f} tokens/s)")
+    if args.invalid and not gen.checked:
+        print('The grammar is not LL(1): mutated sentences were not checked and may still be valid.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Run grammar files and multi-test blocks in this process or across a worker pool.
+
+Every worker imports expt6 once and then runs whole tests in-process, with
+the printed output captured, so a suite costs about as much as its slowest
+test instead of one interpreter start-up per grammar.
+
+    runner = TestRunner(args, token_patterns, workers=4, timeout=10)
+    for outcome in runner.run(file_cases(paths)):   # in the order given
+        print(outcome.name, outcome.status, outcome.timings)
+    runner.write_json('results.json')
+
+`args` is the argparse namespace of expt6 (build_arg_parser()), shared by
+all tests; file cases only replace its `grammar`.  workers=0 runs the
+tests one after another in this process.  A test that runs past `timeout`
+seconds (None: no budget) is stopped and reported as TIMEOUT, and the other
+tests carry on.  Where SIGALRM is not available (Windows) the runner stops
+waiting for it instead and terminates the pool at the end of the run.
+"""
+import argparse
+import io
+import json
+import os
+import signal
+import time
+import traceback
+from contextlib import contextmanager, nullcontext, redirect_stderr, redirect_stdout
+from multiprocessing import Pool
+from multiprocessing import TimeoutError as PoolTimeout
+
+import expt6
+from grammarcore import perfstats
+
+# per-process state set up by _init_worker
+_worker_args = None
+_worker_patterns = None
+
+
+class TestTimeout(Exception):
+    pass
+
+
+class TestCase:
+    """One test: a grammar file ('file') or a block of a multi-test file ('block')."""
+    __slots__ = ('kind', 'name', 'source', 'test')
+
+    def __init__(self, kind, name, source, test=None):
+        self.kind = kind
+        self.name = name
+        self.source = source
+        self.test = test
+
+
+class TestOutcome:
+    """Result of one TestCase.
+
+    status is PASS / FAIL (a block's Valid and Invalid inputs behaved as
+    expected, a file's input was accepted), ERROR or TIMEOUT.  `result` is
+    the last 'Accepted' / 'Rejected' parse result, `output` the printed
+    output, `message` the error text and `timings` the seconds per stage.
+    With --stats, `stats` is the perfstats report of the test as a dict.
+    """
+    __slots__ = ('name', 'kind', 'source', 'status', 'result', 'message', 'output', 'seconds', 'timings', 'stats')
+
+    def __init__(self, name, kind, source, status, result, message, output, seconds, timings, stats=None):
+        self.name = name
+        self.kind = kind
+        self.source = source
+        self.status = status
+        self.result = result
+        self.message = message
+        self.output = output
+        self.seconds = seconds
+        self.timings = timings
+        self.stats = stats
+
+    def as_dict(self):
+        data = {
+            'name': self.name,
+            'kind': self.kind,
+            'source': self.source,
+            'status': self.status,
+            'result': self.result,
+            'message': self.message,
+            'seconds': round(self.seconds, 6),
+            'timings': {k: round(v, 6) for k, v in self.timings.items()},
+        }
+        if self.stats is not None:
+            data['stats'] = self.stats
+        return data
+
+
+def file_cases(paths):
+    return [TestCase('file', os.path.splitext(os.path.basename(str(p)))[0], str(p)) for p in paths]
+
+
+def block_cases(tests, source=None):
+    return [TestCase('block', t['name'] or 'unnamed', source, t) for t in tests]
+
+
+def has_alarm():
+    return hasattr(signal, 'setitimer') and hasattr(signal, 'SIGALRM')
+
+
+@contextmanager
+def time_budget(seconds):
+    """Raise TestTimeout in this process after `seconds` (no-op without SIGALRM)."""
+    if not seconds or not has_alarm():
+        yield
+        return
+
+    def expired(signum, frame):
+        raise TestTimeout()
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _init_worker(args, token_patterns):
+    global _worker_args, _worker_patterns
+    _worker_args = args
+    _worker_patterns = token_patterns
+
+
+def _run_case(index, case, timeout):
+    """Run one case in the current process; returns (index, TestOutcome)."""
+    collect = getattr(_worker_args, 'stats', False) or getattr(_worker_args, 'stats_json', None)
+    timings = {}
+    out = io.StringIO()
+    err = io.StringIO()
+    status, result, message = 'ERROR', None, ''
+    t0 = time.perf_counter()
+    try:
+        with redirect_stdout(out), redirect_stderr(err), time_budget(timeout), \
+                (perfstats.collecting() if collect else nullcontext({})) as timings:
+            if case.kind == 'block':
+                ok = expt6.run_test_block(case.test, _worker_args, _worker_patterns, timings)
+                status = 'PASS' if ok else 'FAIL'
+            else:
+                args = argparse.Namespace(**vars(_worker_args))
+                args.grammar = case.source
+                res = expt6.run_grammar_file(args, _worker_patterns, timings)
+                status = 'PASS' if res or res is None else 'FAIL'
+            if collect and _worker_args.stats:
+                print('\n' + timings.report())
+    except TestTimeout:
+        status, message = 'TIMEOUT', f"stopped after {timeout}s"
+    except SystemExit as exc:
+        message = f"exit status {exc.code}"
+    except Exception:
+        message = traceback.format_exc()
+    seconds = time.perf_counter() - t0
+    output = out.getvalue()
+    for line in reversed(output.splitlines()):
+        if 'Parse result:' in line:
+            result = line.split('Parse result:')[-1].strip()
+            break
+    if err.getvalue():
+        message = (err.getvalue() + message).strip()
+    stats = timings.as_dict() if isinstance(timings, perfstats.Stats) else None
+    return index, TestOutcome(case.name, case.kind, case.source, status, result, message, output, seconds,
+                              dict(timings), stats)
+
+
+class TestRunner:
+    """Run TestCases on `workers` processes (0 = in this process), `timeout` seconds each."""
+
+    def __init__(self, args, token_patterns=None, workers=None, timeout=10.0):
+        self.args = args
+        self.token_patterns = token_patterns or {}
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.timeout = timeout
+        self.outcomes = []
+        self.wall_time = 0.0
+
+    def run(self, cases):
+        """Yield a TestOutcome per case, in the order of `cases`."""
+        cases = list(cases)
+        t0 = time.perf_counter()
+        try:
+            if self.workers < 1 or len(cases) < 2:
+                _init_worker(self.args, self.token_patterns)
+                for i, case in enumerate(cases):
+                    outcome = _run_case(i, case, self.timeout)[1]
+                    self.outcomes.append(outcome)
+                    yield outcome
+                return
+
+            pool = Pool(min(self.workers, len(cases)), initializer=_init_worker,
+                        initargs=(self.args, self.token_patterns))
+            stuck = False
+            try:
+                pending = [pool.apply_async(_run_case, (i, case, self.timeout)) for i, case in enumerate(cases)]
+                # with SIGALRM the workers stop overdue tests themselves
+                wait = None if has_alarm() or not self.timeout else self.timeout
+                for case, job in zip(cases, pending):
+                    try:
+                        outcome = job.get(wait)[1]
+                    except PoolTimeout:
+                        stuck = True
+                        outcome = TestOutcome(case.name, case.kind, case.source, 'TIMEOUT', None,
+                                              f"no result after {self.timeout}s", '', self.timeout, {})
+                    self.outcomes.append(outcome)
+                    yield outcome
+            finally:
+                if stuck:
+                    pool.terminate()
+                else:
+                    pool.close()
+                pool.join()
+        finally:
+            self.wall_time += time.perf_counter() - t0
+
+    def summary(self):
+        counts = {}
+        for o in self.outcomes:
+            counts[o.status] = counts.get(o.status, 0) + 1
+        return {
+            'tests': len(self.outcomes),
+            'statuses': counts,
+            'wall_seconds': round(self.wall_time, 6),
+            'busy_seconds': round(sum(o.seconds for o in self.outcomes), 6),
+            'workers': self.workers,
+            'timeout': self.timeout,
+        }
+
+    def write_json(self, path):
+        data = {'summary': self.summary(), 'tests': [o.as_dict() for o in self.outcomes]}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write('\n')
@@ -1,4 +1,4 @@
-import subprocess
+import argparse
 import sys
 from pathlib import Path
 
@@ -7,39 +7,37 @@ GRAM_DIR = ROOT / 'grammars'
 RESULT_DIR = ROOT / 'results'
 RESULT_DIR.mkdir(exist_ok=True)
 
+sys.path.insert(0, str(ROOT.parent))
+import expt6  # noqa: E402
+from testrunner import TestRunner, file_cases  # noqa: E402
+
+cli = argparse.ArgumentParser(description='Run expt6.py on every grammar in tests/grammars')
+cli.add_argument('--jobs', type=int, metavar='N', help='Run the grammars on N worker processes (default: one after another in this process)')
+cli.add_argument('--timeout', type=float, default=10.0, help='Seconds allowed per grammar (default: 10)')
+cli.add_argument('--json', default=str(RESULT_DIR / 'results.json'), help='Where to write the JSON results')
+opts, extra = cli.parse_known_args()
+
 files = sorted(GRAM_DIR.glob('*.txt'))
 if not files:
     print('No grammar files found in', GRAM_DIR)
     sys.exit(1)
 
+# any other options are passed on to expt6.py, e.g. --engine bitset
+args = expt6.build_arg_parser().parse_args(extra)
 summary = []
-for g in files:
-    name = g.stem
-    out_file = RESULT_DIR / (name + '.out')
-    print('Running test:', name)
-    cmd = [sys.executable, str(Path(__file__).parent.parent / 'expt6.py'), '--grammar', str(g)]
-    try:
-        env = dict(**subprocess.os.environ)
-        env['PYTHONIOENCODING'] = 'utf-8'
-        proc = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', timeout=10, env=env)
-        output = proc.stdout + '\n' + proc.stderr
-    except subprocess.TimeoutExpired:
-        output = 'TIMEOUT'
-
+runner = TestRunner(args, workers=opts.jobs or 0, timeout=opts.timeout)
+for outcome in runner.run(file_cases(files)):
+    print('Running test:', outcome.name)
+    out_file = RESULT_DIR / (outcome.name + '.out')
+    output = outcome.output + '\n' + outcome.message if outcome.status != 'TIMEOUT' else 'TIMEOUT'
     out_file.write_text(output, encoding='utf-8')
-    # extract parse result if present
-    if 'Parse result:' in output:
-        # find the last occurrence
-        for line in reversed(output.splitlines()):
-            if 'Parse result:' in line:
-                parse_res = line.split('Parse result:')[-1].strip()
-                break
-    else:
-        parse_res = 'Unknown'
-    summary.append((name, parse_res))
+    summary.append((outcome.name, outcome.result or ('TIMEOUT' if outcome.status == 'TIMEOUT' else 'Unknown')))
+runner.write_json(opts.json)
 
 print('\nSummary:')
 for name, parse_res in summary:
     print(f"- {name}: {parse_res}")
 
 print('\nDetailed outputs are saved in', RESULT_DIR)
+print(f"JSON results (with per-stage timings) written to {opts.json}; "
+      f"{len(files)} grammars in {runner.wall_time:.2f}s")
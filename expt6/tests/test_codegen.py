@@ -0,0 +1,119 @@
+"""Generated recursive-descent parsers against predictive_parse and CompiledTable.parse."""
+import os
+import pickle
+import random
+import sys
+import tempfile
+import unittest
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+import codegen  # noqa: E402
+from expt6 import analyse_grammar, predictive_parse  # noqa: E402
+from sentences import SentenceGenerator  # noqa: E402
+
+GRAMMARS = {
+    'expr': ({
+        'E': [['E', '+', 'T'], ['T']],
+        'T': [['T', '*', 'F'], ['F']],
+        'F': [['(', 'E', ')'], ['id']],
+    }, 'E'),
+    'nullable': ({
+        'S': [['A', 'B', 'c']],
+        'A': [['a', 'A'], ['ε']],
+        'B': [['b'], ['ε']],
+    }, 'S'),
+    'statements': ({
+        'L': [['S', ';', 'L'], ['ε']],
+        'S': [['id', '=', 'E'], ['if', 'E', 'then', 'S', 'end'], ['print', 'E']],
+        'E': [['id', 'X'], ['num']],
+        'X': [['+', 'E'], ['ε']],
+    }, 'L'),
+}
+
+
+def outcome(result):
+    return bool(result), result.error_pos, result.error_token, result.expected
+
+
+class CodegenEquivalenceTest(unittest.TestCase):
+
+    def inputs(self, analysis, rng):
+        gen = SentenceGenerator(analysis.productions, analysis.start_symbol, analysis.table,
+                                analysis.conflicts, seed=rng.random())
+        terminals = gen.terminals + ['junk']
+        for length in (1, 3, 10, 40):
+            for _ in range(40):
+                yield gen.sentence(length)
+                yield gen.invalid(length)
+                yield [rng.choice(terminals) for _ in range(rng.randrange(length + 1))]
+
+    def test_same_results_as_the_table(self):
+        rng = random.Random(11)
+        for name, (productions, start) in GRAMMARS.items():
+            analysis = analyse_grammar(productions, start)
+            self.assertEqual(analysis.conflicts, [], name)
+            compiled = analysis.compile()
+            parser = codegen.build_parser(analysis.productions, analysis.table, start)
+            for tokens in self.inputs(analysis, rng):
+                with self.subTest(grammar=name, tokens=' '.join(tokens)):
+                    want = outcome(predictive_parse(tokens, start, analysis.table, trace=None))
+                    self.assertEqual(outcome(parser.parse(tokens)), want)
+                    # the integer parser only sees codes: an unknown token is reported as None
+                    token = want[2] if want[2] in compiled.term_id or want[2] == '$' else None
+                    self.assertEqual(outcome(compiled.parse(compiled.encode(tokens))), want[:2] + (token,) + want[3:])
+                    self.assertEqual(parser.module.accepts(tokens), want[0])
+
+    def test_deep_nesting_falls_back_to_the_table(self):
+        productions, start = GRAMMARS['expr']
+        analysis = analyse_grammar(productions, start)
+        parser = codegen.build_parser(analysis.productions, analysis.table, start)
+        depth = sys.getrecursionlimit()
+        self.assertTrue(parser.parse(['('] * depth + ['id'] + [')'] * depth))
+
+
+class CodegenOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        productions, start = GRAMMARS['expr']
+        self.analysis = analyse_grammar(productions, start)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def test_in_memory_parser_pickles(self):
+        parser = codegen.build_parser(self.analysis.productions, self.analysis.table, 'E')
+        self.assertIsNone(parser.path)
+        copy = pickle.loads(pickle.dumps(parser))
+        self.assertTrue(copy.parse(['id', '*', 'id']))
+        self.assertFalse(copy.parse(['id', 'id']))
+
+    def test_module_file_is_reused(self):
+        a = self.analysis
+        path = codegen.module_path(os.path.join(self.directory, 'out'), 'grammars/expr lr.txt', 'block 1')
+        self.assertEqual(os.path.basename(path), 'expr_lr_block_1_ll1.py')
+        first = codegen.load_parser(a.productions, a.table, 'E', path)
+        second = codegen.load_parser(a.productions, a.table, 'E', path)
+        self.assertEqual((first.generated, second.generated), (True, False))
+        self.assertTrue(second.parse(['id', '+', 'id']))
+        self.assertTrue(pickle.loads(pickle.dumps(second)).parse(['id']))
+
+    def test_codegen_writes_nothing_without_codegen_out(self):
+        import expt6
+        grammar = os.path.join(self.directory, 'expr.txt')
+        with open(grammar, 'w', encoding='utf-8') as f:
+            f.write('E -> E + T | T\nT -> id\nInput: id + id\n')
+        args = expt6.build_arg_parser().parse_args(['--grammar', grammar, '--codegen', '--no-trace'])
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                expt6.run_grammar_file(args, {})
+            finally:
+                sys.stdout = stdout
+        self.assertEqual(os.listdir(self.directory), ['expr.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""CompiledTable.parse agrees with predictive_parse on the dict table."""
+import glob
+import os
+import sys
+import unittest
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+from expt6 import analyse_grammar, load_grammar, predictive_parse  # noqa: E402
+from grammarcore import load_test_blocks  # noqa: E402
+from sentences import SentenceGenerator  # noqa: E402
+
+GRAMMARS_DIR = os.path.join(_EXPT6_DIR, 'tests', 'grammars')
+ALL_TESTS = os.path.join(_EXPT6_DIR, 'all_tests.txt')
+
+
+def sample_grammars():
+    """(name, productions, start) for the grammar files and the all_tests.txt blocks."""
+    for path in sorted(glob.glob(os.path.join(GRAMMARS_DIR, '*.txt'))):
+        productions, start, _ = load_grammar(path)
+        yield os.path.basename(path), productions, start
+    for block in load_test_blocks(ALL_TESTS):
+        if block.start:
+            yield block.name, block.productions(), block.start
+
+
+class CompiledTableTest(unittest.TestCase):
+
+    def assertSameResult(self, analysis, tokens):
+        compiled = analysis.compiled
+        want = predictive_parse(tokens, analysis.start_symbol, analysis.table, trace=None)
+        got = compiled.parse(compiled.encode(tokens))
+        self.assertEqual(got.accepted, want.accepted, tokens)
+        if want.accepted:
+            return
+        self.assertEqual(got.error_pos, want.error_pos, tokens)
+        # the compiled parser only sees codes: a token it has no code for is None
+        token = want.error_token if compiled.encode([want.error_token])[0] >= 0 else None
+        self.assertEqual(got.error_token, token, tokens)
+        self.assertEqual(got.expected, want.expected, tokens)
+
+    def test_agrees_with_dict_table(self):
+        checked = 0
+        for name, productions, start in sample_grammars():
+            analysis = analyse_grammar(productions, start)
+            analysis.compile()
+            try:
+                gen = SentenceGenerator(analysis.productions, start, analysis.table, analysis.conflicts, seed=0)
+            except ValueError:  # the start symbol derives no terminal string
+                continue
+            with self.subTest(grammar=name):
+                for _ in range(30):
+                    self.assertSameResult(analysis, gen.sentence(12))
+                    self.assertSameResult(analysis, gen.invalid(12))
+                self.assertSameResult(analysis, [])
+                self.assertSameResult(analysis, ['no-such-token'])
+            checked += 1
+        self.assertGreater(checked, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""export: CSV, JSON and Markdown contents, --rows and the conflicts section."""
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+import expt6  # noqa: E402
+from export import export_analysis, export_format, table_rows  # noqa: E402
+
+# S -> A b and S -> B b both want the cell (S, a)
+GRAMMAR = {'S': [['A', 'b'], ['B', 'b']], 'A': [['a']], 'B': [['a'], ['ε']]}
+
+
+class ExportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analysis = expt6.analyse_grammar(GRAMMAR, 'S')
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def export(self, name, fmt=None, rows=None):
+        path = os.path.join(self.directory, name)
+        self.assertEqual(export_analysis(self.analysis, path, fmt, rows), fmt or export_format(path))
+        with open(path, encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def test_csv(self):
+        records = list(csv.reader(self.export('t.csv').splitlines()))
+        self.assertEqual(records[0], ['section', 'nonterminal', 'symbol', 'production'])
+        self.assertEqual(records[1:], [
+            ['first', 'S', 'a', ''], ['first', 'S', 'b', ''], ['first', 'A', 'a', ''],
+            ['first', 'B', 'a', ''], ['first', 'B', 'ε', ''],
+            ['follow', 'S', '$', ''], ['follow', 'A', 'b', ''], ['follow', 'B', 'b', ''],
+            ['table', 'S', 'a', 'A b'], ['table', 'S', 'b', 'B b'], ['table', 'A', 'a', 'a'],
+            ['table', 'B', 'a', 'a'], ['table', 'B', 'b', 'ε'],
+        ])
+
+    def test_json(self):
+        data = json.loads(self.export('t.json'))
+        self.assertEqual(data['start'], 'S')
+        self.assertEqual(data['first'], {'S': ['a', 'b'], 'A': ['a'], 'B': ['a', 'ε']})
+        self.assertEqual(data['follow'], {'S': ['$'], 'A': ['b'], 'B': ['b']})
+        self.assertEqual(data['table'][:2], [
+            {'nonterminal': 'S', 'terminal': 'a', 'production': ['A', 'b']},
+            {'nonterminal': 'S', 'terminal': 'b', 'production': ['B', 'b']},
+        ])
+        self.assertEqual(len(data['table']), len(self.analysis.table))
+        self.assertEqual(data['conflicts'], [
+            {'nonterminal': 'S', 'terminal': 'a', 'existing': ['A', 'b'], 'new': ['B', 'b']},
+        ])
+
+    def test_markdown(self):
+        text = self.export('t.md')
+        self.assertTrue(text.startswith('# LL(1) analysis (start symbol `S`)\n'))
+        self.assertIn('| B | a, ε | b |\n', text)
+        self.assertIn('| S | a | S ⇒ A b |\n', text)
+        self.assertIn('| B | b | B ⇒ ε |\n', text)
+        self.assertTrue(text.endswith('## Conflicts\n\n| Non-terminal | Terminal | Existing | New |\n'
+                                      '|---|---|---|---|\n| S | a | A b | B b |\n'))
+
+    def test_format_from_option_or_extension(self):
+        self.assertEqual(json.loads(self.export('t.out', 'json'))['start'], 'S')
+        self.assertEqual(export_format('T.MARKDOWN'), 'md')
+        with self.assertRaises(ValueError):
+            export_format('t.out')
+        with self.assertRaises(ValueError):
+            export_format('t.csv', 'xml')
+
+    def test_rows(self):
+        data = json.loads(self.export('t.json', rows=['B', 'A']))
+        # grammar order, not the order of --rows
+        self.assertEqual(list(data['first']), ['A', 'B'])
+        self.assertEqual({cell['nonterminal'] for cell in data['table']}, {'A', 'B'})
+        self.assertEqual(data['conflicts'], [])
+        records = list(csv.reader(self.export('t.csv', rows=['A']).splitlines()))
+        self.assertEqual({r[1] for r in records[1:]}, {'A'})
+        text = self.export('t.md', rows=['B'])
+        self.assertNotIn('| S |', text)
+        self.assertNotIn('## Conflicts', text)
+
+    def test_table_rows(self):
+        table = {('A', 'y'): ['y'], ('B', 'x'): ['x'], ('A', 'x'): ['x', 'A']}
+        self.assertEqual(list(table_rows(table, ['B', 'A', 'C'])), [
+            ('B', [('x', ['x'])]),
+            ('A', [('x', ['x', 'A']), ('y', ['y'])]),
+            ('C', []),
+        ])
+
+    def test_export_option(self):
+        path = os.path.join(self.directory, 'cli.json')
+        grammar = os.path.join(_EXPT6_DIR, 'tests', 'grammars', 'expr_lr.txt')
+        with redirect_stdout(io.StringIO()):
+            expt6.main(['-g', grammar, '--no-cache', '--export', path, '--rows', 'E'])
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(list(data['first']), ['E'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""grammar_cache: encode/decode round trip, the cache directory and --cache."""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+import expt6  # noqa: E402
+import grammar_cache  # noqa: E402
+from grammar_cache import GrammarCache, decode_analysis, encode_analysis, grammar_key  # noqa: E402
+
+# left recursion, left factoring, a useless symbol and an LL(1) conflict
+GRAMMAR = {
+    'E': [['E', '+', 'T'], ['T']],
+    'T': [['id', '(', 'E', ')'], ['id'], ['U']],
+    'U': [['U', 'u']],
+    'S': [['a', 'S'], ['a'], ['ε']],
+}
+INPUTS = ['id', 'id + id', 'id ( id + id ) + id', 'id +', '( id', '']
+
+
+def analysed(productions, start):
+    analysis = expt6.analyse_grammar(productions, start)
+    analysis.compile()
+    return analysis
+
+
+class RoundTripTest(unittest.TestCase):
+
+    def assertSameAnalysis(self, got, want):
+        for field in ('start_symbol', 'reduced_productions', 'useless_steps', 'lr_productions', 'lr_steps',
+                      'productions', 'lf_steps', 'first', 'follow', 'table', 'conflicts'):
+            self.assertEqual(getattr(got, field), getattr(want, field), field)
+        for text in INPUTS:
+            tokens = text.split()
+            self.assertEqual(repr(got.compiled.parse(got.compiled.encode(tokens))),
+                             repr(want.compiled.parse(want.compiled.encode(tokens))), text)
+
+    def test_round_trip(self):
+        analysis = analysed(GRAMMAR, 'E')
+        self.assertSameAnalysis(decode_analysis(encode_analysis(analysis)), analysis)
+
+    def test_round_trip_with_conflicts(self):
+        analysis = analysed({'S': GRAMMAR['S'], 'X': [['x', 'S', 'a']]}, 'X')
+        self.assertTrue(analysis.conflicts)
+        self.assertSameAnalysis(decode_analysis(encode_analysis(analysis)), analysis)
+
+    def test_rejects_foreign_bytes(self):
+        data = encode_analysis(analysed(GRAMMAR, 'E'))
+        self.assertIsNone(decode_analysis(b''))
+        self.assertIsNone(decode_analysis(b'NOTCACHE' + data[8:]))
+
+    def test_key_depends_on_grammar_and_options(self):
+        key = grammar_key(GRAMMAR, 'E')
+        self.assertEqual(key, grammar_key(dict(GRAMMAR), 'E'))
+        self.assertNotEqual(key, grammar_key(GRAMMAR, 'S'))
+        self.assertNotEqual(key, grammar_key(GRAMMAR, 'E', reduce=False))
+
+
+class GrammarCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.cache = GrammarCache(self.directory)
+
+    def test_store_and_load(self):
+        analysis = analysed(GRAMMAR, 'E')
+        key = grammar_key(GRAMMAR, 'E')
+        self.assertIsNone(self.cache.load(key))
+        self.assertTrue(self.cache.store(key, analysis))
+        loaded = self.cache.load(key)
+        self.assertEqual(loaded.table, analysis.table)
+        self.assertEqual(self.cache.clear(), 1)
+        self.assertIsNone(self.cache.load(key))
+
+    def test_truncated_entry_is_a_miss(self):
+        key = grammar_key(GRAMMAR, 'E')
+        self.cache.store(key, analysed(GRAMMAR, 'E'))
+        with open(self.cache.path(key), 'r+b') as f:
+            f.truncate(200)
+        self.assertIsNone(self.cache.load(key))
+
+    def test_default_directory(self):
+        with mock.patch.dict(os.environ, {'EXPT6_CACHE_DIR': '/c/expt6', 'XDG_CACHE_HOME': '/xdg'}):
+            self.assertEqual(grammar_cache.default_cache_dir(), '/c/expt6')
+        with mock.patch.dict(os.environ, {'EXPT6_CACHE_DIR': '', 'XDG_CACHE_HOME': '/xdg'}):
+            self.assertEqual(grammar_cache.default_cache_dir(), os.path.join('/xdg', 'expt6'))
+        with mock.patch.dict(os.environ, {'EXPT6_CACHE_DIR': '', 'XDG_CACHE_HOME': 'relative'}):
+            self.assertEqual(grammar_cache.default_cache_dir(),
+                             os.path.join(os.path.expanduser('~'), '.cache', 'expt6'))
+
+    def test_cache_is_opt_in(self):
+        cache_dir = os.path.join(self.directory, 'cache')
+        args = expt6.build_arg_parser().parse_args([])
+        args.cache_dir = cache_dir
+        expt6.get_analysis(GRAMMAR, 'E', args)
+        self.assertFalse(os.path.exists(cache_dir))
+
+        args.cache = True
+        timings = {}
+        expt6.get_analysis(GRAMMAR, 'E', args, timings)
+        self.assertIn('cache_store', timings)
+        timings = {}
+        expt6.get_analysis(GRAMMAR, 'E', args, timings)
+        self.assertIn('cache_load', timings)
+
+
+if __name__ == '__main__':
+    unittest.main()
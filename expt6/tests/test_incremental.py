@@ -0,0 +1,83 @@
+"""IncrementalGrammar against a full FIRST/FOLLOW/table rebuild after every edit."""
+import os
+import random
+import sys
+import unittest
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+from incremental import IncrementalGrammar  # noqa: E402
+
+from grammarcore import compute_all_firsts, compute_all_follows, construct_table  # noqa: E402
+
+EXPR = {
+    'E': [['T', "E'"]],
+    "E'": [['+', 'T', "E'"], ['ε']],
+    'T': [['F', "T'"]],
+    "T'": [['*', 'F', "T'"], ['ε']],
+    'F': [['(', 'E', ')'], ['id']],
+}
+
+
+def rebuild(productions, start):
+    first = compute_all_firsts(productions)
+    follow = compute_all_follows(productions, start, first)
+    table, conflicts, _ = construct_table(productions, first, follow)
+    return first, follow, table, conflicts
+
+
+class IncrementalTest(unittest.TestCase):
+
+    def assertMatchesRebuild(self, g):
+        first, follow, table, conflicts = rebuild(g.productions, g.start_symbol)
+        for A in g.productions:
+            self.assertEqual(g.first[A], first[A], f"FIRST({A})")
+            self.assertEqual(g.follow[A], follow[A], f"FOLLOW({A})")
+        self.assertEqual(g.table, table)
+        self.assertEqual([c[:3] + c[4:5] for c in g.conflicts], [c[:3] + c[4:5] for c in conflicts])
+
+    def test_add_and_remove(self):
+        g = IncrementalGrammar(EXPR, 'E')
+        self.assertMatchesRebuild(g)
+        g.add_production('F', ['num'])
+        self.assertMatchesRebuild(g)
+        self.assertIn('num', g.first['E'])
+        g.remove_production("T'", ['ε'])
+        self.assertMatchesRebuild(g)
+        self.assertEqual(g.follow['F'], {'*'})
+        g.add_production('F', ['id', '!'])  # conflicts with F -> id
+        self.assertMatchesRebuild(g)
+        self.assertEqual([c[:2] for c in g.conflicts], [('F', 'id')])
+
+    def test_terminal_becomes_nonterminal(self):
+        g = IncrementalGrammar(EXPR, 'E')
+        g.add_production('id', [])
+        self.assertMatchesRebuild(g)
+        self.assertIn('ε', g.first['F'])
+
+    def test_remove_missing_production(self):
+        g = IncrementalGrammar(EXPR, 'E')
+        with self.assertRaises(ValueError):
+            g.remove_production('F', ['num'])
+
+    def test_random_edits(self):
+        rng = random.Random(7)
+        nonterminals = ['S', 'A', 'B', 'C', 'D']
+        symbols = nonterminals + ['a', 'b', 'c']
+        productions = {A: [[rng.choice(symbols) for _ in range(rng.randint(1, 3))]] for A in nonterminals}
+        g = IncrementalGrammar(productions, 'S')
+        self.assertMatchesRebuild(g)
+        for step in range(200):
+            head = rng.choice(nonterminals)
+            if g.productions[head] and rng.random() < 0.4:
+                g.remove_production(head, rng.choice(g.productions[head]))
+            else:
+                g.add_production(head, [rng.choice(symbols) for _ in range(rng.randint(0, 3))])
+            with self.subTest(step=step):
+                self.assertMatchesRebuild(g)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""LALR(1) tables of textbook grammars and the shift-reduce parser."""
+import os
+import sys
+import unittest
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+from expt6 import ParseTree  # noqa: E402
+from lalr import build_lalr  # noqa: E402
+
+EXPR = {
+    'E': [['E', '+', 'T'], ['T']],
+    'T': [['T', '*', 'F'], ['F']],
+    'F': [['(', 'E', ')'], ['id']],
+}
+# LALR(1) but not SLR(1)
+ASSIGN = {
+    'S': [['L', '=', 'R'], ['R']],
+    'L': [['*', 'R'], ['id']],
+    'R': [['L']],
+}
+# LR(1) but not LALR(1): merging the two `c .` states mixes their lookaheads
+MERGED = {
+    'S': [['a', 'A', 'd'], ['b', 'B', 'd'], ['a', 'B', 'e'], ['b', 'A', 'e']],
+    'A': [['c']],
+    'B': [['c']],
+}
+
+
+class LALRTableTest(unittest.TestCase):
+
+    def test_expression_grammar(self):
+        table = build_lalr(EXPR, 'E')
+        self.assertEqual(len(table.kernels), 12)
+        self.assertEqual(table.conflicts, [])
+        self.assertEqual(table.action[0], {'(': 4, 'id': 5})
+        self.assertEqual(table.goto[0], {'E': 1, 'T': 2, 'F': 3})
+
+    def test_lalr_but_not_slr(self):
+        table = build_lalr(ASSIGN, 'S')
+        self.assertEqual(len(table.kernels), 10)
+        self.assertEqual(table.conflicts, [])
+        self.assertTrue(table.parse('* id = id'))
+        self.assertTrue(table.parse('id'))
+        self.assertFalse(table.parse('id = = id'))
+
+    def test_reduce_reduce_after_merging(self):
+        table = build_lalr(MERGED, 'S')
+        self.assertEqual([(t, kind, table.describe(kept), table.describe(dropped))
+                          for _, t, kind, kept, dropped in table.conflicts],
+                         [('d', 'reduce/reduce', 'reduce A ⇒ c', 'reduce B ⇒ c'),
+                          ('e', 'reduce/reduce', 'reduce A ⇒ c', 'reduce B ⇒ c')])
+
+    def test_shift_wins_over_reduce(self):
+        table = build_lalr({'E': [['E', '+', 'E'], ['id']]}, 'E')
+        self.assertEqual([(t, kind, table.describe(kept)) for _, t, kind, kept, _ in table.conflicts],
+                         [('+', 'shift/reduce', 'shift 3')])
+        self.assertTrue(table.parse('id + id + id'))
+
+    def test_epsilon_production(self):
+        table = build_lalr({'S': [['A', 'b']], 'A': [['a', 'A'], ['ε']]}, 'S')
+        self.assertEqual(table.conflicts, [])
+        self.assertTrue(table.parse('a a b'))
+        self.assertTrue(table.parse('b'))
+        result = table.parse('a')
+        self.assertEqual((result.error_pos, result.error_token, result.expected), (1, '$', ['a', 'b']))
+
+
+class LRParseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = build_lalr(EXPR, 'E')
+
+    def test_tree_keeps_left_recursion_and_precedence(self):
+        tree = self.table.parse('id + id * id', build_tree=True).tree
+        root = tree.children(0)
+        self.assertEqual([tree.label(n) for n in root], ['E', '+', 'T'])
+        self.assertEqual([tree.label(n) for n in tree.children(root[2])], ['T', '*', 'F'])
+        self.assertEqual([tree.label(n) for n in tree.leaves()], ['id', '+', 'id', '*', 'id'])
+
+    def test_tree_bytes_round_trip(self):
+        for text in ('id', 'id + id * ( id + id )', '( ( id ) * id + id ) * ( id + id * id )'):
+            tree = self.table.parse(text, build_tree=True).tree
+            loaded = ParseTree.from_bytes(tree.to_bytes())
+            with self.subTest(text=text):
+                self.assertEqual(loaded.format(), tree.format())
+                self.assertEqual([loaded.label(n) for n in loaded.leaves()], text.split())
+
+    def test_epsilon_tree_bytes_round_trip(self):
+        table = build_lalr({'S': [['A', 'b', 'A']], 'A': [['a', 'A'], ['ε']]}, 'S')
+        tree = table.parse('a a b a', build_tree=True).tree
+        self.assertEqual(ParseTree.from_bytes(tree.to_bytes()).format(), tree.format())
+
+    def test_error(self):
+        result = self.table.parse('id + * id')
+        self.assertFalse(result)
+        self.assertEqual((result.error_pos, result.error_token, result.expected), (2, '*', ['(', 'id']))
+
+    def test_trace_kinds(self):
+        steps = []
+        self.assertTrue(self.table.parse('( id )', trace=steps.append))
+        kinds = [step.kind for step in steps]
+        self.assertEqual(kinds.count('shift'), 3)
+        self.assertEqual(kinds[-1], 'accept')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""ParseTree of the LL(1) parsers: layout, spans and the to_bytes/from_bytes round trip."""
+import os
+import sys
+import unittest
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+from expt6 import ParseTree, analyse_grammar, predictive_parse  # noqa: E402
+
+EXPR = {
+    'E': [['E', '+', 'T'], ['T']],
+    'T': [['T', '*', 'F'], ['F']],
+    'F': [['(', 'E', ')'], ['id']],
+}
+INPUTS = ['id', 'id + id * id', '( ( id ) * id + id ) * ( id + id * id )']
+
+
+class ParseTreeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.analysis = analyse_grammar(EXPR, 'E')
+        cls.analysis.compile()
+
+    def trees(self, text):
+        """The tree from the dict-table parser and from the compiled table."""
+        tokens = text.split()
+        yield 'dict', predictive_parse(tokens, 'E', self.analysis.table, trace=None, build_tree=True).tree
+        compiled = self.analysis.compiled
+        yield 'compiled', compiled.parse(compiled.encode(tokens), build_tree=True).tree
+
+    def test_leaves_and_spans(self):
+        for text in INPUTS:
+            for parser, tree in self.trees(text):
+                with self.subTest(text=text, parser=parser):
+                    self.assertEqual(tree.label(0), 'E')
+                    self.assertEqual([tree.label(n) for n in tree.leaves()], text.split())
+                    self.assertEqual(tree.span(0), (0, len(text.split())))
+
+    def test_bytes_round_trip(self):
+        for text in INPUTS:
+            for parser, tree in self.trees(text):
+                loaded = ParseTree.from_bytes(tree.to_bytes())
+                with self.subTest(text=text, parser=parser):
+                    self.assertEqual(len(loaded), len(tree))
+                    self.assertEqual(loaded.format(), tree.format())
+                    self.assertEqual(loaded.to_bytes(), tree.to_bytes())
+
+    def test_epsilon_round_trip(self):
+        # E' and T' end in ε after left recursion is removed
+        tree = next(self.trees('id'))[1]
+        self.assertIn('ε', tree.format())
+        self.assertEqual(ParseTree.from_bytes(tree.to_bytes()).format(), tree.format())
+
+    def test_rejects_foreign_bytes(self):
+        with self.assertRaises(ValueError):
+            ParseTree.from_bytes(b'NOPE' + bytes(8))
+
+
+if __name__ == '__main__':
+    unittest.main()
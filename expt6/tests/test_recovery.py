@@ -0,0 +1,84 @@
+"""Panic-mode error recovery in predictive_parse."""
+import os
+import random
+import sys
+import unittest
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+from expt6 import PanicRecovery, analyse_grammar, predictive_parse  # noqa: E402
+
+EXPR = {
+    'E': [['E', '+', 'T'], ['T']],
+    'T': [['T', '*', 'F'], ['F']],
+    'F': [['(', 'E', ')'], ['id']],
+}
+STATEMENTS = {
+    'L': [['S', 'L'], ['ε']],
+    'S': [['id', '=', 'E', ';']],
+    'E': [['id'], ['num']],
+}
+
+
+def parse(analysis, text, recover, trace=None):
+    return predictive_parse(text, analysis.start_symbol, analysis.table, trace=trace, recover=recover)
+
+
+class PanicRecoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.expr = analyse_grammar(EXPR, 'E')
+        self.recover = PanicRecovery(self.expr.table, self.expr.follow)
+
+    def test_valid_input_is_unchanged(self):
+        result = parse(self.expr, '( id + id ) * id', self.recover)
+        self.assertTrue(result)
+        self.assertEqual(result.errors, [])
+
+    def test_reports_every_error(self):
+        result = parse(self.expr, 'id + * id ) id + + id', self.recover)
+        self.assertFalse(result)
+        self.assertEqual(result.errors, [(2, '*', ['(', 'id']), (4, ')', ['$']), (7, '+', ['(', 'id'])])
+        self.assertEqual((result.error_pos, result.error_token, result.expected), (2, '*', ['(', 'id']))
+
+    def test_error_at_end_of_input(self):
+        self.assertEqual(parse(self.expr, '( id', self.recover).errors, [(2, '$', [')'])])
+        self.assertEqual(parse(self.expr, '', self.recover).errors, [(0, '$', ['(', 'id'])])
+
+    def test_first_error_matches_plain_parse(self):
+        rng = random.Random(3)
+        tokens = ['id', '+', '*', '(', ')']
+        for _ in range(300):
+            text = ' '.join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+            plain = parse(self.expr, text, None)
+            recovered = parse(self.expr, text, self.recover)
+            with self.subTest(text=text):
+                self.assertEqual(bool(recovered), bool(plain))
+                self.assertEqual((recovered.error_pos, recovered.error_token, recovered.expected),
+                                 (plain.error_pos, plain.error_token, plain.expected))
+                self.assertEqual(bool(recovered.errors), not plain)
+
+    def test_sync_sets(self):
+        statements = analyse_grammar(STATEMENTS, 'L')
+        self.assertEqual(PanicRecovery(statements.table, statements.follow).sync['L'], {'$'})
+        recover = PanicRecovery(statements.table, statements.follow, [';'])
+        self.assertEqual(recover.sync['L'], {'$', ';'})
+        self.assertEqual(recover.expected['E'], ['id', 'num'])
+
+    def test_sync_token_pops_instead_of_skipping(self):
+        statements = analyse_grammar(STATEMENTS, 'L')
+        text = 'id = num num ; id = id ;'
+        moves = {}
+        for extra in ((), (';',)):
+            steps = []
+            result = parse(statements, text, PanicRecovery(statements.table, statements.follow, extra), steps.append)
+            self.assertEqual(result.errors, [(3, 'num', [';'])])
+            moves[extra] = [step.kind for step in steps if step.kind in ('pop', 'skip', 'restart')]
+        self.assertEqual(moves[()], ['pop', 'skip', 'skip'])
+        self.assertEqual(moves[(';',)], ['pop', 'skip', 'pop', 'skip', 'restart'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""SentenceGenerator: valid sentences, rejected mutations, grammars without terminals."""
+import os
+import sys
+import unittest
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+from expt6 import analyse_grammar, predictive_parse  # noqa: E402
+from sentences import SentenceGenerator  # noqa: E402
+
+EXPR = {
+    'E': [['E', '+', 'T'], ['T']],
+    'T': [['T', '*', 'F'], ['F']],
+    'F': [['(', 'E', ')'], ['id']],
+}
+
+
+class SentenceGeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.analysis = analyse_grammar(EXPR, 'E')
+        self.gen = SentenceGenerator(self.analysis.productions, 'E', self.analysis.table,
+                                     self.analysis.conflicts, seed=1)
+
+    def parse(self, tokens):
+        return predictive_parse(tokens, 'E', self.analysis.table, trace=None)
+
+    def test_sentences_are_valid_and_bounded(self):
+        for length in (1, 5, 40):
+            for _ in range(50):
+                tokens = self.gen.sentence(length)
+                self.assertTrue(self.parse(tokens), tokens)
+                self.assertLessEqual(len(tokens), max(length, 1))
+
+    def test_invalid_sentences_are_rejected(self):
+        for _ in range(100):
+            self.assertFalse(self.parse(self.gen.invalid(20)))
+
+    def test_same_seed_same_corpus(self):
+        again = SentenceGenerator(self.analysis.productions, 'E', self.analysis.table,
+                                  self.analysis.conflicts, seed=1)
+        self.assertEqual(list(self.gen.sentences(20, 10, invalid=0.5)), list(again.sentences(20, 10, invalid=0.5)))
+
+    def test_mutate_empty_input_inserts(self):
+        tokens = self.gen.mutate([])
+        self.assertEqual(len(tokens), 1)
+        self.assertIn(tokens[0], self.gen.terminals)
+
+    def test_grammar_without_terminals(self):
+        gen = SentenceGenerator({'S': [['A']], 'A': [['ε']]}, 'S', seed=1)
+        self.assertEqual(gen.terminals, [])
+        self.assertEqual(gen.sentence(10), [])
+        self.assertEqual(gen.invalid(10), [])
+        self.assertEqual(gen.mutate([]), [])
+        self.assertEqual(gen.mutate(['x']), [])
+        for _ in range(20):
+            mutated = gen.mutate(['x', 'y', 'z'])  # a delete or a swap
+            self.assertIn(len(mutated), (2, 3))
+            self.assertLessEqual(set(mutated), {'x', 'y', 'z'})
+
+    def test_start_without_terminal_string(self):
+        with self.assertRaises(ValueError):
+            SentenceGenerator({'S': [['S', 'a']]}, 'S')
+
+
+if __name__ == '__main__':
+    unittest.main()
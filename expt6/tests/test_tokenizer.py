@@ -0,0 +1,68 @@
+"""Tokenizer: longest match, keywords against token classes, unknown characters."""
+import os
+import sys
+import unittest
+
+_EXPT6_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _EXPT6_DIR not in sys.path:
+    sys.path.insert(0, _EXPT6_DIR)
+
+from expt6 import Tokenizer, analyse_grammar, make_tokenizer, predictive_parse  # noqa: E402
+
+PATTERNS = {'id': r'[A-Za-z_]\w*', 'num': r'-?\d+'}
+# assignments and comparisons: keywords, an id class and operators sharing prefixes
+STMT = {
+    'S': [['if', 'C', 'then', 'S'], ['id', ':=', 'E']],
+    'C': [['E', '==', 'E'], ['E', '<=', 'E'], ['E', '<', 'E']],
+    'E': [['id'], ['num'], ['-', 'E']],
+}
+
+
+class TokenizerTest(unittest.TestCase):
+
+    def test_longest_match(self):
+        tok = Tokenizer(['<', '<=', '=', '==', ':='])
+        self.assertEqual(tok.tokens('<=<==:=='), ['<=', '<=', '=', ':=', '='])
+        self.assertEqual(tok.tokens('< = ='), ['<', '=', '='])
+
+    def test_word_terminals_need_a_boundary(self):
+        tok = Tokenizer(['id', 'if', '('])
+        self.assertEqual(tok.tokens('id(idx if'), ['id', '(', 'idx', 'if'])
+        self.assertEqual(tok.codes('id(idx if'), [0, 2, -1, 1])
+
+    def test_keywords_and_identifiers(self):
+        tok = Tokenizer(['if', 'then', ':=', 'id', 'num', '-'], PATTERNS)
+        self.assertEqual(tok.tokens('if x then iffy := -3'), ['if', 'id', 'then', 'id', ':=', 'num'])
+        self.assertEqual(tok.codes('if x then y'), [0, 3, 1, 3])
+        # the class wins over the '-' operator, a lone '-' is the operator
+        self.assertEqual(tok.tokens('- x'), ['-', 'id'])
+
+    def test_plain_and_class_codes_agree(self):
+        terminals = ['if', 'then', ':=', 'id', 'num', '-', '==']
+        text = 'if id == num then id := - num'
+        self.assertEqual(Tokenizer(terminals).codes(text), [0, 3, 6, 4, 1, 3, 2, 5, 4])
+        self.assertEqual(Tokenizer(terminals, {'x': r'@'}).codes(text), Tokenizer(terminals).codes(text))
+
+    def test_unknown_character(self):
+        tok = Tokenizer(['if', 'then', ':=', 'id', 'num'], PATTERNS)
+        self.assertEqual(tok.tokens('x := @ 1'), ['id', ':=', '@', 'num'])
+        self.assertEqual(tok.codes('x := @ 1'), [3, 2, -1, 4])
+
+    def test_unknown_character_is_a_parse_error(self):
+        analysis = analyse_grammar(STMT, 'S')
+        analysis.compile()
+        tok = make_tokenizer(analysis.productions, PATTERNS)
+        result = predictive_parse(tok.tokens('if x <= 1 then y := @3'), 'S', analysis.table, trace=None)
+        self.assertFalse(result)
+        self.assertEqual((result.error_pos, result.error_token), (7, '@'))
+        result = predictive_parse(tok.tokens('y := #'), 'S', analysis.table, trace=None)
+        self.assertEqual((result.error_pos, result.error_token, result.expected), (2, '#', ['-', 'id', 'num']))
+
+        compiled = analysis.compiled
+        tok = make_tokenizer(analysis.productions, PATTERNS, compiled)
+        result = compiled.parse(tok.iter_codes('y := #'))
+        self.assertEqual((result.error_pos, result.error_token, result.expected), (2, None, ['-', 'id', 'num']))
+
+
+if __name__ == '__main__':
+    unittest.main()
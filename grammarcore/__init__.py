@@ -0,0 +1,109 @@
+"""Grammar analysis shared by the expt4, expt5 and expt6 front ends.
+
+    from grammarcore import read_rules, compute_all_firsts, compute_all_follows, construct_table
+
+    productions = read_rules('grammar.txt')
+    start = next(iter(productions))
+    first = compute_all_firsts(productions)
+    follow = compute_all_follows(productions, start, first)
+    table, conflicts, origins = construct_table(productions, first, follow)
+
+- grammar: the grammar dict, interned symbols, printing helpers;
+- loader: the streaming grammar-file reader (symbol IDs, array-backed
+  productions, Start:/Input:/Test:/Valid:/Invalid: directives), read_rules();
+- first_follow: FIRST/FOLLOW engines (fixpoint, bitset, numpy), all of
+  them linear passes or worklists over the grammar, never recursion;
+- transform: useless-symbol removal, left-recursion removal, left factoring;
+- table: the LL(1) table and its conflicts;
+- recursion: left-recursive cycles of the left-corner graph (SCCs);
+- perfstats: per-stage times, peak memory and algorithm counters.
+
+Nothing is printed: transformations return their steps as text and the
+front ends decide what to show.  The experiments import the package from
+the folder above theirs (each adds it to sys.path).
+"""
+from .first_follow import (
+    FIRST_FOLLOW_ENGINES,
+    compute_all_firsts,
+    compute_all_firsts_bitset,
+    compute_all_firsts_numpy,
+    compute_all_follows,
+    compute_all_follows_bitset,
+    compute_all_follows_numpy,
+    nullable_nonterminals,
+    suffix_firsts,
+)
+from .grammar import (
+    EPSILON,
+    PROD_ARROW,
+    format_productions,
+    intern_symbol,
+    parse_rule,
+    terminals_from_productions,
+)
+from .loader import (
+    MMAP_THRESHOLD,
+    LoadedGrammar,
+    ProductionStore,
+    SymbolTable,
+    load_grammar_file,
+    load_test_blocks,
+    read_rules,
+)
+from .recursion import (
+    LeftCorner,
+    LeftRecursion,
+    format_cycle,
+    left_corner_graph,
+    left_recursive_cycles,
+    strongly_connected_components,
+)
+from .table import construct_table
+from .transform import (
+    eliminate_direct_left_recursion,
+    fresh_nonterminal,
+    left_factor,
+    remove_left_recursion,
+    remove_useless_symbols,
+    split_left_recursive,
+    substitute_leading,
+)
+
+__all__ = [
+    'EPSILON',
+    'FIRST_FOLLOW_ENGINES',
+    'LeftCorner',
+    'LeftRecursion',
+    'LoadedGrammar',
+    'MMAP_THRESHOLD',
+    'ProductionStore',
+    'SymbolTable',
+    'PROD_ARROW',
+    'compute_all_firsts',
+    'compute_all_firsts_bitset',
+    'compute_all_firsts_numpy',
+    'compute_all_follows',
+    'compute_all_follows_bitset',
+    'compute_all_follows_numpy',
+    'construct_table',
+    'eliminate_direct_left_recursion',
+    'format_cycle',
+    'format_productions',
+    'fresh_nonterminal',
+    'intern_symbol',
+    'left_corner_graph',
+    'left_factor',
+    'left_recursive_cycles',
+    'load_grammar_file',
+    'load_test_blocks',
+    'nullable_nonterminals',
+    'parse_rule',
+    'read_rules',
+    'remove_left_recursion',
+    'remove_useless_symbols',
+    'split_left_recursive',
+    'strongly_connected_components',
+    'substitute_leading',
+    'suffix_firsts',
+    'terminals_from_productions',
+]
@@ -0,0 +1,610 @@
+"""FIRST and FOLLOW sets: the fixpoint, bitset and NumPy engines.
+
+Every engine takes the grammar dict and returns {non-terminal: set of
+terminals}, with 'ε' in FIRST(A) when A derives the empty string and '$'
+in FOLLOW of the start symbol:
+
+    first = compute_all_firsts(productions)
+    follow = compute_all_follows(productions, start_symbol, first)
+
+FIRST_FOLLOW_ENGINES maps the engine names ('fixpoint', 'bitset',
+'numpy') to their pair of functions.  NumPy is only imported when its
+engine runs.
+"""
+from collections import deque
+
+from . import perfstats
+
+# Function to compute FIRST sets
+def compute_first(symbol, productions, first):
+    # If it's the epsilon symbol
+    if symbol == 'ε':
+        return {'ε'}
+    # If symbol is not a non-terminal (i.e. not a key in productions), it's a terminal
+    if symbol not in productions:
+        return {symbol}
+    result = set()
+    for prod in productions.get(symbol, []):
+        # prod is a list of symbols
+        if len(prod) == 1 and prod[0] == 'ε':
+            result.add('ε')
+        else:
+            for s in prod:
+                temp = compute_first(s, productions, first)
+                result |= (temp - {'ε'})
+                if 'ε' not in temp:
+                    break
+            else:
+                result.add('ε')
+    return result
+
+
+def compute_all_firsts(productions):
+    """Compute FIRST sets for all non-terminals using an iterative fixpoint algorithm.
+
+    This is safer than naive recursion for grammars with left recursion.
+    """
+    first = {nt: set() for nt in productions}
+    passes = 0
+    changed = True
+    while changed:
+        changed = False
+        passes += 1
+        for head, prods in productions.items():
+            for prod in prods:
+                # epsilon production
+                if len(prod) == 1 and prod[0] == 'ε':
+                    if 'ε' not in first[head]:
+                        first[head].add('ε')
+                        changed = True
+                    continue
+
+                # walk symbols in RHS
+                all_eps = True
+                for sym in prod:
+                    if sym not in productions:
+                        # terminal
+                        if sym not in first[head]:
+                            first[head].add(sym)
+                            changed = True
+                        all_eps = False
+                        break
+                    else:
+                        # non-terminal: add FIRST(sym) minus epsilon
+                        before = len(first[head])
+                        to_add = first[sym] - {'ε'}
+                        if to_add - first[head]:
+                            first[head] |= to_add
+                            changed = True
+                        if 'ε' in first[sym]:
+                            # sym can produce epsilon; continue to next symbol
+                            continue
+                        else:
+                            all_eps = False
+                            break
+
+                if all_eps:
+                    # all symbols can derive epsilon
+                    if 'ε' not in first[head]:
+                        first[head].add('ε')
+                        changed = True
+
+    perfstats.count('first.passes', passes)
+    return first
+
+# Function to compute FOLLOW sets
+def compute_follow(symbol, productions, start_symbol, first, follow):
+    if symbol not in follow:
+        follow[symbol] = set()
+    if symbol == start_symbol:
+        follow[symbol].add('$')
+    for head, prods in productions.items():
+        for prod in prods:
+            for i, s in enumerate(prod):
+                if s == symbol:
+                    rest = prod[i+1:]
+                    temp = set()
+                    if rest:
+                        for r in rest:
+                            # if r has a FIRST set use it; otherwise r is a terminal
+                            if r in first:
+                                temp |= (first[r] - {'ε'})
+                                if 'ε' not in first[r]:
+                                    break
+                            else:
+                                temp |= {r}
+                                break
+                        else:
+                            temp |= follow.get(head, set())
+                    else:
+                        temp |= follow.get(head, set())
+                    follow[symbol] |= temp
+    return follow
+
+
+def suffix_firsts(productions, first):
+    """FIRST and nullability of every suffix of every production, built once.
+
+    Returns {head: [per alternative: [(FIRST(prod[i:]) - {'ε'}, nullable)
+    for i in 0..len(prod)]]}, so entry 0 describes the whole right-hand
+    side and the last entry the empty suffix.  Each list is filled in one
+    right-to-left walk and suffixes that add nothing share the frozenset of
+    the suffix after them, so FOLLOW and construct_table never slice a
+    production or rebuild FIRST(rest) again.
+
+    As in the other walks a terminal ends the suffix, a literal 'ε' inside
+    a longer production included: it is kept in the set (construct_table
+    reads it as "nullable", FOLLOW adds it like any terminal).
+    """
+    own = {}  # symbol -> (FIRST(symbol) - {'ε'}, nullable)
+    for nt in productions:
+        s = first.get(nt, ())
+        own[nt] = (frozenset(s - {'ε'} if 'ε' in s else s), 'ε' in s)
+    empty = (frozenset(), True)
+    index = {}
+    for head, prods in productions.items():
+        per_head = []
+        for prod in prods:
+            suffixes = [empty]
+            rest = empty
+            for sym in reversed(prod):
+                entry = own.get(sym)
+                if entry is None:
+                    entry = own[sym] = (frozenset((sym,)), False)
+                sym_first, nullable = entry
+                if nullable:
+                    rest_first = rest[0]
+                    if sym_first and not sym_first <= rest_first:
+                        rest_first = sym_first | rest_first if rest_first else sym_first
+                    rest = (rest_first, rest[1])
+                else:
+                    rest = entry
+                suffixes.append(rest)
+            suffixes.reverse()
+            per_head.append(suffixes)
+        index[head] = per_head
+    perfstats.count('index.suffixes', sum(len(p) + 1 for prods in productions.values() for p in prods))
+    return index
+
+
+def compute_all_follows(productions, start_symbol, first, index=None):
+    """Compute FOLLOW sets using an iterative fixpoint algorithm.
+
+    FIRST(rest) of every occurrence comes from `index` (suffix_firsts,
+    built here when not given) and is added once; the passes then only
+    push FOLLOW(head) into the non-terminals that end a production or are
+    followed by a nullable suffix.
+    """
+    if index is None:
+        index = suffix_firsts(productions, first)
+    follow = {nt: set() for nt in productions}
+    follow[start_symbol].add('$')
+    edges = []  # (head, B): FOLLOW(head) ⊆ FOLLOW(B)
+    for head, prods in productions.items():
+        for prod, suffixes in zip(prods, index[head]):
+            for i, B in enumerate(prod):
+                if B not in productions:
+                    continue
+                rest_first, rest_nullable = suffixes[i + 1]
+                follow[B] |= rest_first
+                if rest_nullable and B != head:
+                    edges.append((follow[head], follow[B]))
+    passes = 0
+    changed = True
+    while changed:
+        changed = False
+        passes += 1
+        for head_follow, b_follow in edges:
+            before = len(b_follow)
+            b_follow |= head_follow
+            if len(b_follow) != before:
+                changed = True
+    perfstats.count('follow.passes', passes)
+    return follow
+
+
+# ---------------------------------------------------------------------------
+# Bitset / worklist engine for FIRST and FOLLOW
+#
+# Same results as compute_all_firsts / compute_all_follows, but every
+# terminal is interned to a bit position and each set is a Python int.
+# Bit 0 is reserved for 'ε', so "FIRST(X) - {ε}" is `mask & ~1` and
+# "ε in FIRST(X)" is `mask & 1`.  Instead of re-sweeping the whole grammar
+# until nothing changes, only productions whose dependencies changed are
+# revisited.
+# ---------------------------------------------------------------------------
+
+EPS_BIT = 1
+
+
+def intern_terminals(productions, extra=('$',)):
+    """Return (term_index, term_names) mapping terminals to bit positions.
+
+    'ε' always gets bit 0; symbols from `extra` (by default '$') follow,
+    then every terminal in order of first appearance.
+    """
+    term_index = {'ε': 0}
+    term_names = ['ε']
+    for sym in extra:
+        if sym not in term_index:
+            term_index[sym] = len(term_names)
+            term_names.append(sym)
+    for prods in productions.values():
+        for prod in prods:
+            for sym in prod:
+                if sym not in productions and sym not in term_index:
+                    term_index[sym] = len(term_names)
+                    term_names.append(sym)
+    return term_index, term_names
+
+
+def mask_to_set(mask, term_names):
+    """Decode a terminal bitmask back into a set of symbol strings."""
+    result = set()
+    while mask:
+        low = mask & -mask
+        result.add(term_names[low.bit_length() - 1])
+        mask ^= low
+    return result
+
+
+def compute_first_masks(productions, term_index):
+    """Compute FIRST of every non-terminal as a bitmask (worklist algorithm)."""
+    first = {nt: 0 for nt in productions}
+    flat = []  # (head, prod) pairs, addressed by index
+    users = {nt: [] for nt in productions}  # B -> productions to revisit when FIRST(B) grows
+    for head, prods in productions.items():
+        for prod in prods:
+            p = len(flat)
+            flat.append((head, prod))
+            for sym in set(prod):
+                if sym in productions:
+                    users[sym].append(p)
+
+    work = deque(range(len(flat)))
+    queued = [True] * len(flat)
+    visits = 0
+    while work:
+        visits += 1
+        p = work.popleft()
+        queued[p] = False
+        head, prod = flat[p]
+        if len(prod) == 1 and prod[0] == 'ε':
+            add = EPS_BIT
+        else:
+            add = 0
+            for sym in prod:
+                if sym in productions:
+                    m = first[sym]
+                    add |= m & ~EPS_BIT
+                    if not m & EPS_BIT:
+                        break
+                else:
+                    # terminal
+                    add |= 1 << term_index[sym]
+                    break
+            else:
+                add |= EPS_BIT
+        old = first[head]
+        if add & ~old:
+            first[head] = old | add
+            for q in users[head]:
+                if not queued[q]:
+                    queued[q] = True
+                    work.append(q)
+    perfstats.count('first.visits', visits)
+    return first
+
+
+def compute_follow_masks(productions, start_symbol, first_masks, term_index):
+    """Compute FOLLOW of every non-terminal as a bitmask.
+
+    The FIRST(rest) part of each occurrence is fixed once FIRST is known, so
+    it is added up front; what remains are subset edges FOLLOW(A) ⊆ FOLLOW(B)
+    which are propagated with a worklist.
+    """
+    follow = {nt: 0 for nt in productions}
+    follow[start_symbol] |= 1 << term_index['$']
+    edges = {nt: set() for nt in productions}
+    for head, prods in productions.items():
+        for prod in prods:
+            # walk the RHS right-to-left, carrying FIRST(rest) and whether rest is nullable
+            rest_first = 0
+            rest_nullable = True
+            for sym in reversed(prod):
+                if sym in productions:
+                    follow[sym] |= rest_first
+                    if rest_nullable and sym != head:
+                        edges[head].add(sym)
+                    m = first_masks[sym]
+                    if m & EPS_BIT:
+                        rest_first |= m & ~EPS_BIT
+                    else:
+                        rest_first = m
+                        rest_nullable = False
+                else:
+                    rest_first = 1 << term_index[sym]
+                    rest_nullable = False
+
+    work = deque(nt for nt in productions if follow[nt])
+    queued = set(work)
+    visits = 0
+    while work:
+        visits += 1
+        A = work.popleft()
+        queued.discard(A)
+        fa = follow[A]
+        for B in edges[A]:
+            if fa & ~follow[B]:
+                follow[B] |= fa
+                if B not in queued:
+                    queued.add(B)
+                    work.append(B)
+    perfstats.count('follow.visits', visits)
+    return follow
+
+
+def compute_all_firsts_bitset(productions):
+    """Drop-in replacement for compute_all_firsts using the bitset engine."""
+    term_index, term_names = intern_terminals(productions)
+    masks = compute_first_masks(productions, term_index)
+    return {nt: mask_to_set(m, term_names) for nt, m in masks.items()}
+
+
+def compute_all_follows_bitset(productions, start_symbol, first, index=None):
+    """Drop-in replacement for compute_all_follows using the bitset engine.
+
+    `index` is accepted so the engines stay interchangeable; the mask walk
+    in compute_follow_masks already carries FIRST(rest) right-to-left.
+    """
+    term_index, term_names = intern_terminals(productions)
+    for s in first.values():
+        for sym in s:
+            if sym not in term_index:
+                term_index[sym] = len(term_names)
+                term_names.append(sym)
+    first_masks = {}
+    for nt in productions:
+        m = 0
+        for sym in first.get(nt, ()):
+            m |= 1 << term_index[sym]
+        first_masks[nt] = m
+    masks = compute_follow_masks(productions, start_symbol, first_masks, term_index)
+    return {nt: mask_to_set(m, term_names) for nt, m in masks.items()}
+
+
+# ---------------------------------------------------------------------------
+# NumPy boolean-matrix engine for FIRST and FOLLOW
+#
+# FIRST and FOLLOW are n×m boolean matrices (non-terminals × terminals).
+# FIRST:  FIRST = begins-with* · direct   where begins-with[A][B] holds when
+#         A -> α B ... with α nullable.
+# FOLLOW: FOLLOW = ends* · follow0        where ends[B][A] holds when
+#         A -> ... B β with β nullable, and follow0 is FIRST of whatever
+#         follows each occurrence of B (plus '$' for the start symbol).
+# The n×n relations are sparse, so they are kept as edge lists; the closure
+# condenses their strongly connected components and ORs whole rows of terms
+# along the condensed graph, sinks first, so it takes one pass however long
+# the dependency chains are.
+# NumPy is only imported when this engine is used.
+# ---------------------------------------------------------------------------
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("the 'numpy' FIRST/FOLLOW engine requires NumPy (pip install numpy)") from None
+    return numpy
+
+
+def nullable_nonterminals(productions):
+    """Return the set of non-terminals whose FIRST set contains 'ε'.
+
+    Linear-time counter algorithm: each production waits on the non-terminals
+    of its prefix and fires when the last of them becomes nullable.
+    """
+    nullable = set()
+    work = deque()
+    pending = []  # per production: [head, number of prefix symbols not yet nullable]
+    waiting = {nt: [] for nt in productions}
+
+    def mark(nt):
+        if nt not in nullable:
+            nullable.add(nt)
+            work.append(nt)
+
+    for head, prods in productions.items():
+        for prod in prods:
+            if len(prod) == 1 and prod[0] == 'ε':
+                mark(head)
+                continue
+            prefix = []
+            for sym in prod:
+                if sym in productions:
+                    prefix.append(sym)
+                    continue
+                # the walk stops at a terminal; a literal 'ε' still yields ε
+                if sym != 'ε':
+                    prefix = None
+                break
+            if prefix is None:
+                continue
+            if not prefix:
+                mark(head)
+                continue
+            p = len(pending)
+            pending.append([head, len(prefix)])
+            for sym in prefix:
+                waiting[sym].append(p)
+
+    while work:
+        nt = work.popleft()
+        for p in waiting[nt]:
+            pending[p][1] -= 1
+            if pending[p][1] == 0:
+                mark(pending[p][0])
+    return nullable
+
+
+def _closure_product(np, rows, cols, base, counter=None):
+    """Return rel* · base for the relation given by the (rows, cols) edges.
+
+    This is the least X with X = base ∨ rel · X.  All the rows of one
+    strongly connected component of rel are equal, so the components are
+    found with an iterative Tarjan walk (which finishes them sinks first)
+    and each one gets, in a single pass, the OR of its base rows and of the
+    rows of the components its edges leave for: linear in the edges, however
+    long the dependency chains are.  The number of components with edges
+    is added to the `counter` stat.
+    """
+    n = len(base)
+    if not len(rows):
+        return base
+    succ = [[] for _ in range(n)]
+    for r, c in zip(rows.tolist(), cols.tolist()):
+        succ[r].append(c)
+    result = base.copy()
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack = []
+    counter_value = 0
+    merged = 0
+    for root in range(n):
+        if index[root] >= 0 or not succ[root]:
+            continue
+        index[root] = low[root] = counter_value
+        counter_value += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(succ[root]))]
+        while work:
+            v, edges = work[-1]
+            for w in edges:
+                if index[w] < 0:
+                    index[w] = low[w] = counter_value
+                    counter_value += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, iter(succ[w])))
+                    break
+                if on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[v] < low[parent]:
+                        low[parent] = low[v]
+                if low[v] != index[v]:
+                    continue
+                members = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    members.append(w)
+                    if w == v:
+                        break
+                # every component the edges leave for is already finished
+                if len(members) == 1:
+                    row = result[v]  # a view: OR the successors' rows straight into it
+                    for w in succ[v]:
+                        if w != v:
+                            row |= result[w]
+                    merged += 1
+                    continue
+                inside = set(members)
+                sources = members + [w for u in members for w in succ[u] if w not in inside]
+                result[members] = np.logical_or.reduce(result[sources], axis=0)
+                merged += 1
+    if counter:
+        perfstats.count(counter, merged)
+    return result
+
+
+def _matrix_to_sets(np, matrix, nonterms, term_names):
+    return {nt: {term_names[j] for j in np.flatnonzero(matrix[i])} for i, nt in enumerate(nonterms)}
+
+
+def compute_all_firsts_numpy(productions):
+    """Drop-in replacement for compute_all_firsts using boolean matrices."""
+    np = _require_numpy()
+    nonterms = list(productions)
+    nt_index = {nt: i for i, nt in enumerate(nonterms)}
+    term_index, term_names = intern_terminals(productions)
+    nullable = nullable_nonterminals(productions)
+
+    nt_rows, nt_cols, t_rows, t_cols = [], [], [], []
+    for head, prods in productions.items():
+        h = nt_index[head]
+        for prod in prods:
+            if len(prod) == 1 and prod[0] == 'ε':
+                continue
+            for sym in prod:
+                if sym in productions:
+                    nt_rows.append(h)
+                    nt_cols.append(nt_index[sym])
+                    if sym in nullable:
+                        continue
+                elif sym != 'ε':
+                    t_rows.append(h)
+                    t_cols.append(term_index[sym])
+                break
+
+    n, m = len(nonterms), len(term_names)
+    direct = np.zeros((n, m), dtype=bool)
+    direct[t_rows, t_cols] = True
+
+    first = _closure_product(np, np.array(nt_rows, dtype=np.intp), np.array(nt_cols, dtype=np.intp), direct,
+                             'first.components')
+    first[:, 0] = [nt in nullable for nt in nonterms]
+    return _matrix_to_sets(np, first, nonterms, term_names)
+
+
+def compute_all_follows_numpy(productions, start_symbol, first, index=None):
+    """Drop-in replacement for compute_all_follows using boolean matrices."""
+    np = _require_numpy()
+    if index is None:
+        index = suffix_firsts(productions, first)
+    nonterms = list(productions)
+    nt_index = {nt: i for i, nt in enumerate(nonterms)}
+    term_index, term_names = intern_terminals(productions)
+    for s in first.values():
+        for sym in s:
+            if sym not in term_index:
+                term_index[sym] = len(term_names)
+                term_names.append(sym)
+    n, m = len(nonterms), len(term_names)
+
+    # followed-by is not transitive: FIRST of what follows each occurrence is read off the index
+    f_rows, f_cols, end_rows, end_cols = [], [], [], []
+    for head, prods in productions.items():
+        h = nt_index[head]
+        for prod, suffixes in zip(prods, index[head]):
+            for i, B in enumerate(prod):
+                if B not in productions:
+                    continue
+                b = nt_index[B]
+                rest_first, rest_nullable = suffixes[i + 1]
+                for sym in rest_first:
+                    f_rows.append(b)
+                    f_cols.append(term_index[sym])
+                if rest_nullable:
+                    end_rows.append(b)
+                    end_cols.append(h)
+
+    follow0 = np.zeros((n, m), dtype=bool)
+    follow0[f_rows, f_cols] = True
+    follow0[nt_index[start_symbol], term_index['$']] = True
+
+    follow = _closure_product(np, np.array(end_rows, dtype=np.intp), np.array(end_cols, dtype=np.intp), follow0,
+                              'follow.components')
+    return _matrix_to_sets(np, follow, nonterms, term_names)
+
+
+# name -> (compute_all_firsts, compute_all_follows); selected with --engine
+FIRST_FOLLOW_ENGINES = {
+    'fixpoint': (compute_all_firsts, compute_all_follows),
+    'bitset': (compute_all_firsts_bitset, compute_all_follows_bitset),
+    'numpy': (compute_all_firsts_numpy, compute_all_follows_numpy),
+}
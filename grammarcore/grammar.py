@@ -0,0 +1,51 @@
+"""Grammar representation shared by the experiments.
+
+A grammar is a dict mapping each non-terminal to its list of alternatives,
+each alternative a list of symbols; 'ε' alone is the empty alternative.
+Symbols read from grammar files (loader.py) are interned (sys.intern), so
+the set and dict operations of the analyses compare them by identity.
+"""
+import sys
+
+EPSILON = 'ε'
+PROD_ARROW = '⇒'  # arrow used when printing productions
+
+# spellings of the empty alternative accepted in grammar files
+EPSILON_NAMES = {'ε', 'eps', 'epsilon'}
+
+
+def intern_symbol(sym):
+    """Interned symbol, with the spellings of epsilon mapped to 'ε'."""
+    return EPSILON if sym.lower() in EPSILON_NAMES else sys.intern(sym)
+
+
+def parse_rule(line):
+    """Return (head, alternatives) of an `A -> x y | z` line, or None for other lines."""
+    head, arrow, rhs = line.partition('->')
+    head = head.strip()
+    if not arrow or not head:
+        return None
+    alternatives = [[intern_symbol(sym) for sym in alt.split()] for alt in rhs.split('|')]
+    return sys.intern(head), alternatives
+
+
+def format_productions(productions):
+    """Return a human friendly string of the grammar productions."""
+    lines = []
+    for head, prods in productions.items():
+        alts = [' '.join(p) for p in prods]
+        lines.append(f"{head} {PROD_ARROW} {' | '.join(alts)}")
+    return '\n'.join(lines)
+
+
+def terminals_from_productions(productions):
+    terms = set()
+    nonterms = set(productions.keys())
+    for rhs in productions.values():
+        for prod in rhs:
+            for sym in prod:
+                if sym == 'ε':
+                    continue
+                if sym not in nonterms:
+                    terms.add(sym)
+    return sorted(terms)
@@ -0,0 +1,306 @@
+"""Streaming grammar loader with interned symbols.
+
+    grammar = load_grammar_file('grammar.txt')
+    grammar.start, grammar.input          # Start: / Input: directives
+    productions = grammar.productions()   # the dict the analyses work on
+
+    for block in load_test_blocks('all_tests.txt'):   # Test: / Valid: / Invalid:
+        ...
+
+The file is read as bytes, line by line (memory-mapped once it is larger
+than MMAP_THRESHOLD).  Every symbol is decoded and interned the first time
+it is seen, so afterwards a token costs one dict lookup, and all the
+alternatives of the grammar share one string object per symbol.
+
+By default the alternatives are built straight into the dict of lists the
+analyses use.  With store=True they go into a ProductionStore instead:
+three flat arrays of integer symbol IDs, for code that works on IDs.
+productions() converts that store to the dict when it is asked for.
+
+Every spelling of epsilon ('ε', 'eps', 'epsilon', any case) is symbol 0
+and is dropped from alternatives; an alternative left empty is ['ε'].
+"""
+import gc
+import mmap
+import os
+import sys
+from array import array
+from contextlib import contextmanager
+
+from .grammar import EPSILON, EPSILON_NAMES
+
+MMAP_THRESHOLD = 64 << 20  # bytes; larger files are memory-mapped
+
+EPSILON_ID = 0
+
+_DIRECTIVES = (b'start:', b'input:', b'test:', b'valid:', b'invalid:')
+
+
+class SymbolTable:
+    """Symbol name <-> integer ID.  ID 0 is 'ε'.
+
+    `ids` and `by_token` map the raw token bytes seen so far to the ID and
+    to the interned name; treat them as read-only and add symbols with
+    intern().
+    """
+    __slots__ = ('names', 'ids', 'by_token')
+
+    def __init__(self):
+        self.names = [EPSILON]
+        self.ids = {}
+        self.by_token = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, token):
+        """ID of the symbol spelled by `token` (bytes), adding it when new."""
+        sid = self.ids.get(token)
+        if sid is None:
+            name = token.decode('utf-8')
+            if name.lower() in EPSILON_NAMES:
+                sid = EPSILON_ID
+            else:
+                sid = len(self.names)
+                self.names.append(sys.intern(name))
+            self.ids[token] = sid
+            self.by_token[token] = self.names[sid]
+        return sid
+
+    def get(self, token):
+        """ID of the raw `token` bytes, or None when it has not been seen yet."""
+        return self.ids.get(token)
+
+    def lookup(self, name):
+        """ID of `name`, or None when the file never used it."""
+        return self.ids.get(name.encode('utf-8'))
+
+
+@contextmanager
+def _collector_paused():
+    """Pause the cyclic GC: a million new lists would start it over and over, and none form cycles."""
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+class ProductionStore:
+    """Productions as flat integer arrays.
+
+    Production p is heads[p] -> symbols[offsets[p]:offsets[p + 1]]; the
+    empty alternative has no symbols.  Productions keep file order.
+    """
+    __slots__ = ('heads', 'offsets', 'symbols')
+
+    def __init__(self):
+        self.heads = array('i')
+        self.offsets = array('q', [0])
+        self.symbols = array('i')
+
+    def __len__(self):
+        return len(self.heads)
+
+    def add(self, head, body):
+        self.heads.append(head)
+        self.symbols.extend(body)
+        self.offsets.append(len(self.symbols))
+
+    def production(self, p):
+        """(head ID, tuple of symbol IDs) of production p."""
+        return self.heads[p], tuple(self.symbols[self.offsets[p]:self.offsets[p + 1]])
+
+    def __iter__(self):
+        symbols, offsets = self.symbols, self.offsets
+        for p, head in enumerate(self.heads):
+            yield head, tuple(symbols[offsets[p]:offsets[p + 1]])
+
+    def to_productions(self, table):
+        """{A: [[symbol, ...]]} with the names from `table`, heads in order of first appearance."""
+        names = table.names
+        offsets = self.offsets
+        productions = {}
+        with _collector_paused():
+            flat = list(map(names.__getitem__, self.symbols))  # one pass; slicing a list is cheap
+            start = 0
+            for head, end in zip(self.heads, offsets[1:]):
+                body = flat[start:end] if end > start else [EPSILON]
+                start = end
+                alternatives = productions.get(head)
+                if alternatives is None:
+                    alternatives = productions[head] = []
+                alternatives.append(body)
+        return {names[head]: alternatives for head, alternatives in productions.items()}
+
+
+class LoadedGrammar:
+    """One grammar read by the loader, with its directives.
+
+    `start` is the Start: symbol (the first head when a plain grammar file
+    has none), `input`, `valid` and `invalid` the raw token strings of the
+    Input:/Valid:/Invalid: lines and `name` the Test: name.  `store` is
+    the ProductionStore when the grammar was loaded with store=True, else
+    None.
+    """
+    __slots__ = ('symbols', 'store', 'name', 'start', 'input', 'valid', 'invalid', 'count', '_productions')
+
+    def __init__(self, symbols, name=None, store=False):
+        self.symbols = symbols
+        self.store = ProductionStore() if store else None
+        self.name = name
+        self.start = None
+        self.input = None
+        self.valid = None
+        self.invalid = None
+        self.count = 0  # productions read
+        self._productions = None if store else {}
+
+    def productions(self):
+        """{A: [[symbol, ...]]}; built from the store (a new dict each call) when there is one."""
+        if self.store is not None:
+            return self.store.to_productions(self.symbols)
+        return self._productions
+
+    def first_head(self):
+        if self.store is not None:
+            return self.symbols.names[self.store.heads[0]] if len(self.store) else None
+        return next(iter(self._productions), None)
+
+
+def iter_lines(path, use_mmap=None):
+    """Yield the lines of `path` as bytes; memory-mapped when `use_mmap` (default: large files)."""
+    with open(path, 'rb') as f:
+        if use_mmap is None:
+            use_mmap = os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD
+        if not use_mmap:
+            yield from f
+            return
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+        with mapped:
+            yield from iter(mapped.readline, b'')
+
+
+def _directive(line):
+    """(directive, value) for a `Start:`-style line, else None."""
+    if b':' not in line[:9]:
+        return None
+    low = line[:9].lower()
+    for directive in _DIRECTIVES:
+        if low.startswith(directive):
+            return directive[:-1].decode(), line[len(directive):].strip().decode('utf-8')
+    return None
+
+
+def _add_rule(grammar, line):
+    """Add the alternatives of an `A -> x y | z` line; False for other lines."""
+    head, arrow, rhs = line.partition(b'->')
+    head = head.strip()
+    if not arrow or not head:
+        return False
+    symbols = grammar.symbols
+    intern = symbols.intern
+    head_id = intern(head)
+    alternatives = rhs.split(b'|')
+    grammar.count += len(alternatives)
+    store = grammar.store
+    if store is None:
+        # one C-level map per alternative: token bytes -> interned name
+        known = symbols.by_token.get
+        head_name = symbols.names[head_id]
+        rules = grammar._productions.get(head_name)
+        if rules is None:
+            rules = grammar._productions[head_name] = []
+        for alt in alternatives:
+            tokens = alt.split()
+            body = list(map(known, tokens))
+            if None in body:
+                for token in tokens:
+                    intern(token)
+                body = list(map(known, tokens))
+            if EPSILON in body:
+                body = [sym for sym in body if sym != EPSILON]
+            rules.append(body or [EPSILON])
+        return True
+    known = symbols.ids.get
+    flat = store.symbols
+    for alt in alternatives:
+        tokens = alt.split()
+        body = list(map(known, tokens))
+        if None in body:
+            body = [intern(token) for token in tokens]
+        if EPSILON_ID in body:
+            body = [sid for sid in body if sid != EPSILON_ID]
+        flat.extend(body)
+        store.offsets.append(len(flat))
+    store.heads.extend(array('i', [head_id]) * len(alternatives))
+    return True
+
+
+def _read(path, blocks, use_mmap, store):
+    """Yield the grammars of `path`: one, or (with `blocks`) each Test: block."""
+    symbols = SymbolTable()
+    current = LoadedGrammar(symbols, store=store)
+    for raw in iter_lines(path, use_mmap):
+        line = raw.strip()
+        if not line:
+            # a blank line ends a test block that has productions and a start symbol
+            if blocks and current.count and current.start:
+                yield current
+                current = LoadedGrammar(symbols, store=store)
+            continue
+        if line[:1] == b'#':
+            continue
+        directive = _directive(line)
+        if directive is None:
+            _add_rule(current, line)
+            continue
+        kind, value = directive
+        if kind == 'test':
+            if not blocks:
+                continue
+            if current.count and current.start:
+                yield current
+            current = LoadedGrammar(symbols, value, store)
+        elif kind == 'start':
+            current.start = sys.intern(value)
+        else:
+            setattr(current, kind, value)
+    if not blocks:
+        if not current.start:
+            current.start = current.first_head()
+        yield current
+    elif current.count and current.start:
+        yield current
+
+
+def load_grammar_file(path, use_mmap=None, store=False):
+    """Read a grammar file: `A -> x | y` lines, `#` comments, Start: and Input:.
+
+    Other lines are ignored.  `use_mmap` forces (or forbids) memory-mapping;
+    by default only files of MMAP_THRESHOLD bytes or more are mapped.  With
+    `store` the productions are kept as a ProductionStore of symbol IDs.
+    """
+    with _collector_paused():
+        return next(_read(path, False, use_mmap, store))
+
+
+def read_rules(path):
+    """The productions of a grammar file as {A: [[symbol, ...]]}; the first head is the start symbol."""
+    return load_grammar_file(path).productions()
+
+
+def load_test_blocks(path, use_mmap=None, store=False):
+    """Read a consolidated tests file: blocks of Test:, Start:, rules, Valid:, Invalid:.
+
+    A block ends at the next Test: line or a blank line; blocks without
+    productions or a start symbol are dropped.  All blocks share one
+    SymbolTable.
+    """
+    with _collector_paused():
+        return list(_read(path, True, use_mmap, store))
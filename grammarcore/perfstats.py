@@ -0,0 +1,117 @@
+"""Per-stage times, peak memory and algorithm counters of one run (--stats).
+
+    with collecting() as stats:
+        run_grammar_file(args, token_patterns, stats)
+    print(stats.report())
+    stats.write_json('stats.json')
+
+A Stats is a dict of seconds per stage, so it can be passed wherever
+expt6 takes a `timings` dict; every stage recorded there also gets the
+memory it allocated on top of what was live when it started (tracemalloc
+peak, reset at each stage).  While a Stats is collecting it is ACTIVE, and
+the algorithms add their counters to it:
+
+- first.passes / follow.passes: fixpoint passes over the grammar
+  (first.visits / follow.visits: worklist visits of the bitset engine,
+  first.components / follow.components: components merged by the
+  closure of the numpy engine);
+- left_recursion.productions / left_recursion.nonterminals: productions
+  and non-terminals created by remove_left_recursion;
+- left_factoring.nonterminals: factorings done by left_factor;
+- table.cells / table.conflicts;
+- parse.inputs / parse.steps / parse.max_stack of the predictive parser.
+
+With ACTIVE None (the default) each algorithm only checks it once per
+call, so nothing is collected and nothing is paid.
+"""
+import json
+import tracemalloc
+from contextlib import contextmanager
+
+# the Stats being collected, or None
+ACTIVE = None
+
+
+class Stats(dict):
+    """Seconds per stage plus `peaks` (bytes per stage) and `counters` (name -> int)."""
+
+    def __init__(self, memory=True):
+        super().__init__()
+        self.memory = memory
+        self.peaks = {}
+        self.counters = {}
+        self._base = 0
+
+    def start_stage(self):
+        """Start measuring memory for the next stage."""
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+
+    def __setitem__(self, stage, seconds):
+        super().__setitem__(stage, seconds)
+        if self.memory and tracemalloc.is_tracing():
+            self.peaks[stage] = max(tracemalloc.get_traced_memory()[1] - self._base, 0)
+            self.start_stage()
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def maximum(self, name, value):
+        if value > self.counters.get(name, 0):
+            self.counters[name] = value
+
+    def as_dict(self):
+        return {
+            'stages': {name: {'seconds': round(seconds, 6), 'peak_bytes': self.peaks.get(name)}
+                       for name, seconds in self.items()},
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    def report(self):
+        lines = ['Statistics:', f"  {'Stage':<16} {'Seconds':>10} {'Peak memory':>12}"]
+        for name, seconds in self.items():
+            peak = self.peaks.get(name)
+            lines.append(f"  {name:<16} {seconds:>10.6f} {format_bytes(peak) if peak is not None else '-':>12}")
+        if self.counters:
+            lines.append('  Counters:')
+            width = max(len(name) for name in self.counters)
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"    {name:<{width}}  {value}")
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+            f.write('\n')
+
+
+def format_bytes(n):
+    for unit in ('B', 'KiB', 'MiB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+def count(name, n=1):
+    if ACTIVE is not None:
+        ACTIVE.count(name, n)
+
+
+@contextmanager
+def collecting(memory=True):
+    """Make a new Stats ACTIVE for the block (tracing memory unless memory=False)."""
+    global ACTIVE
+    stats = Stats(memory)
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    stats.start_stage()
+    previous, ACTIVE = ACTIVE, stats
+    try:
+        yield stats
+    finally:
+        ACTIVE = previous
+        if started:
+            tracemalloc.stop()
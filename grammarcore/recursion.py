@@ -0,0 +1,212 @@
+"""Left recursion as cycles of the left-corner graph.
+
+B is a left corner of A when some A -> α B β has a nullable α (α = ε is
+direct, anything else hides B behind symbols that can vanish).  A is left
+recursive exactly when it lies on a cycle of that graph, so every
+recursive non-terminal belongs to a strongly connected component with
+more than one member or with a self-loop.  The graph is built in one pass
+over the grammar and the components are found with an iterative Tarjan
+walk, so both are linear in the size of the grammar; the cycles reported
+are shortest paths found by a BFS inside one component.
+"""
+from collections import deque
+
+from . import perfstats
+from .first_follow import nullable_nonterminals
+from .grammar import PROD_ARROW
+
+
+class LeftCorner:
+    """Edge head -> symbol: `symbol` starts `production` after a nullable `prefix`."""
+    __slots__ = ('head', 'symbol', 'production', 'prefix')
+
+    def __init__(self, head, symbol, production, prefix):
+        self.head = head
+        self.symbol = symbol
+        self.production = production
+        self.prefix = prefix  # number of nullable symbols before `symbol`
+
+    def __str__(self):
+        return f"{self.head} {PROD_ARROW} {' '.join(self.production)}"
+
+
+class LeftRecursion:
+    """One left-recursive cycle of LeftCorner edges.
+
+    `nonterminals` are the members of the strongly connected component the
+    cycle lies in, in grammar order.  `kind` is 'direct' (A -> A α),
+    'indirect' (through other non-terminals) or 'hidden' (some edge of the
+    cycle sits behind a nullable prefix).
+    """
+    __slots__ = ('nonterminals', 'cycle', 'kind')
+
+    def __init__(self, nonterminals, cycle):
+        self.nonterminals = nonterminals
+        self.cycle = cycle
+        if any(edge.prefix for edge in cycle):
+            self.kind = 'hidden'
+        elif len(cycle) == 1:
+            self.kind = 'direct'
+        else:
+            self.kind = 'indirect'
+
+    def path(self):
+        """The cycle as non-terminals, first one repeated at the end: ['A', 'B', 'A']."""
+        return [self.cycle[0].head] + [edge.symbol for edge in self.cycle]
+
+
+def left_corner_graph(productions, nullable=None):
+    """{A: [LeftCorner]}, one edge per (A, B) pair.
+
+    The edge is the first production giving the pair, unless a later one
+    starts with B directly (prefix 0): a direct left corner is reported as
+    such even when a hidden one comes first.  A literal 'ε' inside a
+    production derives nothing and is skipped.
+    """
+    if nullable is None:
+        nullable = nullable_nonterminals(productions)
+    graph = {}
+    for head, prods in productions.items():
+        edges = graph[head] = []
+        seen = {}  # symbol -> index of its edge in `edges`
+        for prod in prods:
+            prefix = 0
+            for sym in prod:
+                if sym == 'ε':
+                    continue
+                if sym not in productions:
+                    break
+                i = seen.get(sym)
+                if i is None:
+                    seen[sym] = len(edges)
+                    edges.append(LeftCorner(head, sym, prod, prefix))
+                elif prefix == 0 and edges[i].prefix > 0:
+                    edges[i] = LeftCorner(head, sym, prod, prefix)
+                if sym not in nullable:
+                    break
+                prefix += 1
+    return graph
+
+
+def strongly_connected_components(graph):
+    """Tarjan's algorithm without recursion; components come sinks first.
+
+    `graph` maps each node to its LeftCorner edges.
+    """
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, edges = work[-1]
+            for edge in edges:
+                succ = edge.symbol
+                if succ not in index:
+                    index[succ] = low[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(graph[succ])))
+                    break
+                if succ in on_stack and index[succ] < low[node]:
+                    low[node] = index[succ]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def _shortest_path(graph, source, target, members):
+    """Fewest LeftCorner edges inside `members` leading from `source` to `target` (BFS).
+
+    With source == target this is a shortest cycle through it.
+    """
+    via = {}
+    work = deque([source])
+    while work:
+        node = work.popleft()
+        for edge in graph[node]:
+            succ = edge.symbol
+            if succ not in members:
+                continue
+            if succ == target:
+                path = [edge]
+                while node != source:
+                    edge = via[node]
+                    path.append(edge)
+                    node = edge.head
+                path.reverse()
+                return path
+            if succ not in via:
+                via[succ] = edge
+                work.append(succ)
+    return None
+
+
+def left_recursive_cycles(productions, nullable=None):
+    """The left-recursive cycles of the grammar as LeftRecursion records.
+
+    For each recursive component: a shortest cycle through its first
+    non-terminal, every self-loop it does not already show, and, when none
+    of those is hidden, a cycle through the first edge behind a nullable
+    prefix, so direct and hidden recursion are always visible.  That is at
+    most two BFS runs per component, linear overall.  Components come in
+    grammar order.
+    """
+    graph = left_corner_graph(productions, nullable)
+    order = {nt: i for i, nt in enumerate(productions)}
+    components = []
+    for component in strongly_connected_components(graph):
+        if len(component) == 1 and not any(edge.symbol == component[0] for edge in graph[component[0]]):
+            continue
+        component.sort(key=order.__getitem__)
+        components.append(component)
+    components.sort(key=lambda component: order[component[0]])
+
+    found = []
+    for component in components:
+        members = set(component)
+        cycles = [_shortest_path(graph, component[0], component[0], members)]
+        hidden = None
+        for nt in component:
+            for edge in graph[nt]:
+                if edge.symbol == nt and edge is not cycles[0][0]:
+                    cycles.append([edge])
+                elif hidden is None and edge.prefix and edge.symbol in members:
+                    hidden = edge
+        if hidden is not None and not any(edge.prefix for cycle in cycles for edge in cycle):
+            if hidden.symbol == hidden.head:
+                cycles.append([hidden])
+            else:
+                cycles.append([hidden] + _shortest_path(graph, hidden.symbol, hidden.head, members))
+        found.extend(LeftRecursion(component, cycle) for cycle in cycles)
+    perfstats.count('left_recursion.cycles', len(found))
+    return found
+
+
+def format_cycle(recursion):
+    """One line: 'A → B → A (indirect: A ⇒ B c, B ⇒ A d)'."""
+    edges = ', '.join(str(edge) for edge in recursion.cycle)
+    return f"{' → '.join(recursion.path())} ({recursion.kind}: {edges})"
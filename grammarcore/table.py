@@ -0,0 +1,48 @@
+"""The LL(1) predictive parsing table."""
+from . import perfstats
+from .first_follow import suffix_firsts
+from .grammar import PROD_ARROW
+
+
+def construct_table(productions, first, follow, index=None):
+    """Build the LL(1) table. Returns (table, conflicts, origins).
+
+    table maps (A, terminal) to the production chosen; a cell claimed by a
+    second production keeps the first and records a conflict tuple
+    (A, terminal, existing, existing origin, new, new origin).  FIRST of
+    each right-hand side is entry 0 of `index` (suffix_firsts, built here
+    when not given).
+
+    Each production visits its FIRST terminals and then, when it can
+    derive ε, the FOLLOW terminals of its head, both in sorted order, so
+    the conflicts come out in the same order on every run.
+    """
+    if index is None:
+        index = suffix_firsts(productions, first)
+    table = {}
+    origins = {}  # map (A, t) -> "A -> ..." string that added the entry
+    conflicts = []
+    for head, prods in productions.items():
+        for prod, suffixes in zip(prods, index[head]):
+            origin = f"{head} {PROD_ARROW} {' '.join(prod)}"
+            rhs_first, nullable = suffixes[0]
+            if 'ε' in rhs_first:
+                # the 'ε' production, or a literal 'ε' the walk stopped at
+                nullable = True
+                rhs_first = rhs_first - {'ε'}
+            terminals = sorted(rhs_first)
+            if nullable:
+                terminals += sorted(follow.get(head, ()))
+
+            for terminal in terminals:
+                key = (head, terminal)
+                if key in table and table[key] != prod:
+                    conflicts.append((head, terminal, table[key], origins.get(key, ''), prod, origin))
+                else:
+                    table[key] = prod
+                    origins[key] = origin
+
+    if perfstats.ACTIVE is not None:
+        perfstats.ACTIVE.count('table.cells', len(table))
+        perfstats.ACTIVE.count('table.conflicts', len(conflicts))
+    return table, conflicts, origins
@@ -0,0 +1,276 @@
+"""Grammar transformations: useless symbols, left recursion, left factoring.
+
+Each transformation returns (new_productions, steps), where steps are
+human-readable descriptions of every change, and leaves its input alone.
+"""
+from collections import deque
+
+from . import perfstats
+from .grammar import PROD_ARROW
+
+
+def remove_useless_symbols(productions, start_symbol):
+    """Drop non-productive and unreachable non-terminals. Returns (new_productions, steps).
+
+    A non-terminal is productive when one of its productions uses only
+    terminals and productive non-terminals (counter algorithm, linear in
+    the grammar size); productions that use a non-productive symbol are
+    removed with it.  What remains is then searched from the start symbol
+    and non-terminals that cannot be reached are removed as well.
+    """
+    steps = []
+    productive = set()
+    work = deque()
+    pending = []  # per production: number of non-terminal occurrences not yet productive
+    waiting = {nt: [] for nt in productions}
+    heads = []
+    for head, prods in productions.items():
+        for prod in prods:
+            p = len(pending)
+            heads.append(head)
+            nts = [sym for sym in prod if sym in productions]
+            pending.append(len(nts))
+            for sym in nts:
+                waiting[sym].append(p)
+            if not nts and head not in productive:
+                productive.add(head)
+                work.append(head)
+    while work:
+        nt = work.popleft()
+        for p in waiting[nt]:
+            pending[p] -= 1
+            if pending[p] == 0 and heads[p] not in productive:
+                productive.add(heads[p])
+                work.append(heads[p])
+
+    if start_symbol not in productive:
+        steps.append(f"Start symbol {start_symbol} derives no terminal string; grammar left unchanged.")
+        return {nt: [list(p) for p in rhs] for nt, rhs in productions.items()}, steps
+
+    for head in productions:
+        if head not in productive:
+            steps.append(f"Removed non-productive non-terminal {head} (derives no terminal string).")
+    kept = {}
+    for head, prods in productions.items():
+        if head not in productive:
+            continue
+        rhs = []
+        for prod in prods:
+            bad = [sym for sym in prod if sym in productions and sym not in productive]
+            if bad:
+                steps.append(f"Removed {head} {PROD_ARROW} {' '.join(prod)} (uses non-productive {', '.join(dict.fromkeys(bad))}).")
+            else:
+                rhs.append(list(prod))
+        kept[head] = rhs
+
+    reachable = {start_symbol}
+    work.append(start_symbol)
+    while work:
+        nt = work.popleft()
+        for prod in kept.get(nt, ()):
+            for sym in prod:
+                if sym in kept and sym not in reachable:
+                    reachable.add(sym)
+                    work.append(sym)
+    for head in list(kept):
+        if head not in reachable:
+            steps.append(f"Removed unreachable non-terminal {head} (not reachable from {start_symbol}).")
+            del kept[head]
+    return kept, steps
+
+
+def fresh_nonterminal(base, taken):
+    """`base` with primes appended until it is not in `taken`."""
+    candidate = base + "'"
+    while candidate in taken:
+        candidate += "'"
+    return candidate
+
+
+def split_left_recursive(head, alternatives):
+    """Return (alpha, beta): the tails α of every head -> head α, and the other alternatives β."""
+    alpha, beta = [], []
+    for prod in alternatives:
+        if prod and prod[0] == head:
+            alpha.append(prod[1:])
+        else:
+            beta.append(prod)
+    return alpha, beta
+
+
+def substitute_leading(alternatives, head, head_alternatives):
+    """Replace every `head` γ among `alternatives` by β γ for each head -> β.
+
+    Returns (new_alternatives, expanded, replaced): one (γ, β, β γ) per
+    production created, in order, and whether any alternative started with
+    `head` at all.  When `head` has no alternatives those are dropped and
+    nothing is expanded.
+    """
+    new_rhs = []
+    expanded = []
+    replaced = False
+    for prod in alternatives:
+        if prod and prod[0] == head:
+            replaced = True
+            rest = prod[1:]
+            for beta in head_alternatives:
+                new_prod = list(beta) + rest
+                new_rhs.append(new_prod)
+                expanded.append((rest, beta, new_prod))
+        else:
+            new_rhs.append(prod)
+    return new_rhs, expanded, replaced
+
+
+def eliminate_direct_left_recursion(alpha, beta, new_head):
+    """Alternatives of A -> β A' (A -> A' for β = ε) and of A' -> α A' | ε.
+
+    `alpha` and `beta` are what split_left_recursive returned for A.
+    """
+    head_rhs = [[new_head] if b == ['ε'] else list(b) + [new_head] for b in beta]
+    new_rhs = [list(a) + [new_head] for a in alpha]
+    new_rhs.append(['ε'])
+    return head_rhs, new_rhs
+
+
+def remove_left_recursion(productions):
+    """Remove left recursion (indirect + direct) from the grammar.
+
+    Returns (new_productions, steps) where steps is a list of human-readable
+    descriptions of each change performed.
+    """
+    steps = []
+    # Work on a copy
+    prods = {nt: [list(p) for p in rhs] for nt, rhs in productions.items()}
+    nonterminals = list(prods.keys())
+    created = 0  # productions generated, for --stats
+
+    for i, Ai in enumerate(nonterminals):
+        # replace Ai -> Aj α where j < i (indirect left recursion elimination)
+        for j in range(i):
+            Aj = nonterminals[j]
+            new_rhs, expanded, replaced = substitute_leading(prods[Ai], Aj, prods[Aj])
+            for rest, beta, new_prod in expanded:
+                created += 1
+                steps.append(f"In {Ai}: replaced {Ai} {PROD_ARROW} {Aj} {' '.join(rest) if rest else ''} with {Ai} {PROD_ARROW} {' '.join(new_prod)} (expanding {Aj} {PROD_ARROW} {' '.join(beta)})")
+            if replaced:
+                steps.append(f"After expanding {Aj} in {Ai}, {Ai} productions become: {[' '.join(p) for p in new_rhs]}")
+                prods[Ai] = new_rhs
+
+        # now remove direct left recursion for Ai: Ai -> β Aip, Aip -> α Aip | ε
+        alpha, beta = split_left_recursive(Ai, prods[Ai])
+        if alpha:
+            Aip = fresh_nonterminal(Ai, prods)
+            steps.append(f"Direct left recursion detected in {Ai}. Creating new non-terminal {Aip} and rewriting productions.")
+            prods[Ai], prods[Aip] = eliminate_direct_left_recursion(alpha, beta, Aip)
+            steps.append(f"{Ai} rewritten as: {[' '.join(p) for p in prods[Ai]]}")
+            steps.append(f"{Aip} productions: {[' '.join(p) for p in prods[Aip]]}")
+            created += len(prods[Ai]) + len(prods[Aip])
+            # also record the new nonterminal in order list so subsequent iterations can use it
+            nonterminals.insert(i+1, Aip)
+
+    if perfstats.ACTIVE is not None:
+        perfstats.ACTIVE.count('left_recursion.productions', created)
+        perfstats.ACTIVE.count('left_recursion.nonterminals', len(prods) - len(productions))
+    return prods, steps
+
+
+class _PrefixNode:
+    """Node of the prefix trie used by left_factor."""
+    __slots__ = ('sym', 'children', 'count', 'first', 'end')
+
+    def __init__(self, sym, first):
+        self.sym = sym
+        self.children = {}
+        self.count = 0     # distinct alternatives through this node
+        self.first = first  # index of the first of them
+        self.end = -1       # index of the alternative ending here, if any
+
+
+def _suffix_children(node):
+    """Children of the non-terminal whose alternatives are the suffixes below `node`.
+
+    An alternative ending at `node` becomes the alternative ['ε'], so it is
+    merged with a real 'ε' edge the way the suffix lists would group.
+    """
+    if node.end < 0:
+        return node.children
+    children = dict(node.children)
+    eps = _PrefixNode('ε', node.end)
+    eps.end = node.end
+    eps.count = 1
+    real = children.get('ε')
+    if real is not None:
+        eps.children = real.children
+        eps.count += real.count - (1 if real.end >= 0 else 0)
+        eps.first = min(eps.first, real.first)
+    children['ε'] = eps
+    return children
+
+
+def left_factor(productions):
+    """Apply left factoring to the grammar. Returns (new_productions, steps).
+
+    This does a simple factoring: when a non-terminal has two or more
+    alternatives that share a common prefix (at least the first symbol),
+    it pulls the common prefix into a new non-terminal.
+
+    Each non-terminal's alternatives are put in a prefix trie once; every
+    trie node shared by several alternatives where they stop agreeing
+    becomes a new non-terminal, so the grammar is factored in one traversal
+    (non-terminals in order, new ones after them) instead of restarting
+    after every change.  Identical alternatives are kept once.
+    """
+    prods = {nt: [list(p) for p in rhs] for nt, rhs in productions.items()}
+    steps = []
+
+    # (non-terminal, trie children of its alternatives, depth, original alternatives)
+    pending = deque()
+    for A, alternatives in prods.items():
+        if len(alternatives) < 2:
+            continue
+        root = _PrefixNode(None, 0)
+        for i, prod in enumerate(alternatives):
+            node = root
+            path = []
+            for sym in prod:
+                child = node.children.get(sym)
+                if child is None:
+                    child = node.children[sym] = _PrefixNode(sym, i)
+                path.append(child)
+                node = child
+            if node.end < 0:
+                node.end = i
+                for n in path:
+                    n.count += 1
+        pending.append((A, _suffix_children(root), 0, alternatives))
+
+    while pending:
+        A, children, depth, alternatives = pending.popleft()
+        # alternatives (and so groups) in their original order
+        kids = sorted(children.values(), key=lambda n: n.first)
+        if depth == 0 and all(n.count < 2 for n in kids):
+            if len(kids) < len(alternatives):  # only identical alternatives share a prefix
+                prods[A] = [alternatives[n.first] or ['ε'] for n in kids]
+            continue
+        singles = []
+        factored = []
+        for node in kids:
+            if node.count < 2:
+                singles.append(alternatives[node.first][depth:] or ['ε'])
+                continue
+            # longest common prefix: follow the trie while it does not branch
+            prefix = [node.sym]
+            while node.end < 0 and len(node.children) == 1:
+                node = next(iter(node.children.values()))
+                prefix.append(node.sym)
+            A_dash = fresh_nonterminal(A, prods)
+            prods[A_dash] = []
+            steps.append(f"Left factoring on {A}: common prefix {' '.join(prefix)} found; created {A_dash}.")
+            # A -> prefix A_dash | other_alts
+            factored.append(prefix + [A_dash])
+            pending.append((A_dash, _suffix_children(node), depth + len(prefix), alternatives))
+        prods[A] = singles + factored
+
+    perfstats.count('left_factoring.nonterminals', len(prods) - len(productions))
+    return prods, steps
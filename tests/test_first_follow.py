@@ -0,0 +1,84 @@
+"""The FIRST/FOLLOW engines agree: fixpoint, bitset and numpy (if installed)."""
+import glob
+import os
+import random
+import sys
+import unittest
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore import FIRST_FOLLOW_ENGINES, load_grammar_file, load_test_blocks  # noqa: E402
+
+try:
+    import numpy  # noqa: F401
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+GRAMMAR_FILES = sorted(glob.glob(os.path.join(_REPO_ROOT, 'expt6', 'tests', 'grammars', '*.txt')))
+ALL_TESTS = os.path.join(_REPO_ROOT, 'expt6', 'all_tests.txt')
+
+
+def random_grammar(rng, heads=8, terminals=4):
+    """Any shape: left recursion, cycles, ε, undefined and unreachable symbols."""
+    names = [f'N{i}' for i in range(heads)]
+    symbols = names + [f't{i}' for i in range(terminals)] + ['U']
+    productions = {}
+    for A in names:
+        alts = []
+        for _ in range(rng.randint(1, 4)):
+            body = [rng.choice(symbols) for _ in range(rng.randint(0, 4))]
+            alts.append(body or ['ε'])
+        productions[A] = alts
+    return productions, names[0]
+
+
+class EngineAgreementTest(unittest.TestCase):
+
+    def engines(self):
+        names = ['bitset', 'numpy'] if HAVE_NUMPY else ['bitset']
+        return [(name, FIRST_FOLLOW_ENGINES[name]) for name in names]
+
+    def assertEnginesAgree(self, productions, start, label):
+        first_fn, follow_fn = FIRST_FOLLOW_ENGINES['fixpoint']
+        first = first_fn(productions)
+        follow = follow_fn(productions, start, first)
+        for name, (first_fn, follow_fn) in self.engines():
+            with self.subTest(grammar=label, engine=name):
+                got_first = first_fn(productions)
+                self.assertEqual(got_first, first)
+                self.assertEqual(follow_fn(productions, start, got_first), follow)
+
+    def test_grammar_files(self):
+        self.assertTrue(GRAMMAR_FILES)
+        for path in GRAMMAR_FILES:
+            grammar = load_grammar_file(path)
+            self.assertEnginesAgree(grammar.productions(), grammar.start, os.path.basename(path))
+
+    def test_all_tests_blocks(self):
+        blocks = [block for block in load_test_blocks(ALL_TESTS) if block.start]
+        self.assertTrue(blocks)
+        for block in blocks:
+            self.assertEnginesAgree(block.productions(), block.start, block.name)
+
+    def test_random_grammars(self):
+        rng = random.Random(0)
+        for i in range(300):
+            productions, start = random_grammar(rng, heads=rng.randint(1, 10))
+            self.assertEnginesAgree(productions, start, f'random #{i}')
+
+    def test_deep_chain(self):
+        # N0 -> N1 t0 | t1, N1 -> N2 t0 | t1, ...: dependencies as deep as the grammar
+        n = 300
+        productions = {f'N{i}': [[f'N{i + 1}', 't0'], ['t1']] for i in range(n)}
+        productions[f'N{n}'] = [['t2'], ['ε']]
+        self.assertEnginesAgree(productions, 'N0', 'chain')
+        # and the same chain closed into a single cycle
+        productions[f'N{n}'].append(['N0', 't3'])
+        self.assertEnginesAgree(productions, 'N0', 'cycle')
+
+
+if __name__ == '__main__':
+    unittest.main()
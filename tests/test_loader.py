@@ -0,0 +1,107 @@
+"""The streaming loader: ε spellings, directives, test blocks and the ID store."""
+import os
+import sys
+import tempfile
+import unittest
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore.loader import SymbolTable, load_grammar_file, load_test_blocks, read_rules  # noqa: E402
+
+GRAMMAR = """\
+# expression grammar
+Start: E
+Input: id + id
+E -> T E'
+E' -> + T E' | ε
+T -> id | ( E ) | eps
+F -> EPSILON | Eps |  | a ε b
+"""
+
+TESTS = """\
+Test: first
+Start: S
+S -> a S | ε
+Valid: a a
+Invalid: b
+
+Test: second
+Start: A
+A -> x | epsilon
+Test: no rules
+Start: Z
+"""
+
+
+class LoaderTest(unittest.TestCase):
+
+    def write(self, text):
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_epsilon_spellings(self):
+        productions = load_grammar_file(self.write(GRAMMAR)).productions()
+        self.assertEqual(productions["E'"], [['+', 'T', "E'"], ['ε']])
+        self.assertEqual(productions['T'], [['id'], ['(', 'E', ')'], ['ε']])
+        # every spelling and the empty alternative are ['ε']; an inner ε is dropped
+        self.assertEqual(productions['F'], [['ε'], ['ε'], ['ε'], ['a', 'b']])
+
+    def test_directives(self):
+        grammar = load_grammar_file(self.write(GRAMMAR))
+        self.assertEqual(grammar.start, 'E')
+        self.assertEqual(grammar.input, 'id + id')
+        self.assertEqual(grammar.count, 10)
+        self.assertEqual(list(grammar.productions()), ['E', "E'", 'T', 'F'])
+
+    def test_first_head_is_default_start(self):
+        path = self.write("B -> b\nA -> B\n")
+        self.assertEqual(load_grammar_file(path).start, 'B')
+        self.assertEqual(read_rules(path), {'B': [['b']], 'A': [['B']]})
+
+    def test_empty_file(self):
+        grammar = load_grammar_file(self.write(''))
+        self.assertIsNone(grammar.start)
+        self.assertEqual(grammar.productions(), {})
+
+    def test_store_matches_dict(self):
+        path = self.write(GRAMMAR)
+        stored = load_grammar_file(path, store=True)
+        self.assertEqual(stored.productions(), load_grammar_file(path).productions())
+        self.assertEqual(len(stored.store), stored.count)
+        head, body = stored.store.production(0)
+        self.assertEqual(stored.symbols.names[head], 'E')
+        self.assertEqual([stored.symbols.names[sid] for sid in body], ['T', "E'"])
+
+    def test_mmap_matches_plain_read(self):
+        path = self.write(GRAMMAR)
+        self.assertEqual(load_grammar_file(path, use_mmap=True).productions(),
+                         load_grammar_file(path, use_mmap=False).productions())
+        self.assertEqual(load_grammar_file(self.write(''), use_mmap=True).productions(), {})
+
+    def test_blocks(self):
+        blocks = load_test_blocks(self.write(TESTS))
+        self.assertEqual([block.name for block in blocks], ['first', 'second'])
+        first, second = blocks
+        self.assertEqual(first.start, 'S')
+        self.assertEqual(first.productions(), {'S': [['a', 'S'], ['ε']]})
+        self.assertEqual((first.valid, first.invalid), ('a a', 'b'))
+        self.assertEqual(second.productions(), {'A': [['x'], ['ε']]})
+        self.assertIsNone(second.valid)
+
+    def test_symbol_table(self):
+        symbols = SymbolTable()
+        self.assertEqual(symbols.intern(b'Eps'), 0)
+        self.assertEqual(symbols.intern(b'a'), 1)
+        self.assertEqual(symbols.get(b'a'), 1)
+        self.assertIsNone(symbols.get(b'b'))
+        self.assertEqual(symbols.lookup('a'), 1)
+        self.assertEqual(len(symbols), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
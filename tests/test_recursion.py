@@ -0,0 +1,69 @@
+"""Left-recursive cycles of the left-corner graph."""
+import os
+import sys
+import unittest
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore import format_cycle, left_recursive_cycles, strongly_connected_components  # noqa: E402
+from grammarcore import left_corner_graph  # noqa: E402
+
+
+def kinds(productions):
+    return [(rec.kind, rec.path()) for rec in left_recursive_cycles(productions)]
+
+
+class LeftRecursiveCyclesTest(unittest.TestCase):
+
+    def test_direct(self):
+        self.assertEqual(kinds({'E': [['E', '+', 'T'], ['T']], 'T': [['id']]}),
+                         [('direct', ['E', 'E'])])
+
+    def test_indirect(self):
+        self.assertEqual(kinds({'S': [['A', 'a'], ['b']], 'A': [['S', 'c'], ['d']]}),
+                         [('indirect', ['S', 'A', 'S'])])
+
+    def test_hidden_behind_nullable_prefix(self):
+        found = left_recursive_cycles({'A': [['B', 'A', 'd'], ['e']], 'B': [['f'], ['ε']]})
+        self.assertEqual([(rec.kind, rec.path()) for rec in found], [('hidden', ['A', 'A'])])
+        self.assertEqual(found[0].cycle[0].prefix, 1)
+        self.assertEqual(format_cycle(found[0]), 'A → A (hidden: A ⇒ B A d)')
+
+    def test_hidden_edge_in_an_indirect_component_is_shown(self):
+        grammar = {'S': [['A', 'a'], ['b']], 'A': [['S', 'c'], ['B', 'A', 'd'], ['e']], 'B': [['f'], ['ε']],
+                   'C': [['C', 'x'], ['y']]}
+        self.assertEqual(kinds(grammar), [('indirect', ['S', 'A', 'S']), ('hidden', ['A', 'A']),
+                                          ('direct', ['C', 'C'])])
+
+    def test_direct_edge_wins_over_an_earlier_hidden_one(self):
+        found = left_recursive_cycles({'A': [['N', 'A'], ['A', 'x'], ['y']], 'N': [['n'], ['ε']]})
+        self.assertEqual([(rec.kind, rec.path()) for rec in found], [('direct', ['A', 'A'])])
+        self.assertEqual(format_cycle(found[0]), 'A → A (direct: A ⇒ A x)')
+        edges = left_corner_graph({'A': [['N', 'A'], ['A', 'x'], ['y']], 'N': [['n'], ['ε']]})['A']
+        self.assertEqual([(e.symbol, e.prefix, e.production) for e in edges],
+                         [('N', 0, ['N', 'A']), ('A', 0, ['A', 'x'])])
+
+    def test_non_nullable_prefix_is_not_recursion(self):
+        self.assertEqual(kinds({'A': [['B', 'A'], ['a']], 'B': [['b']]}), [])
+
+    def test_literal_epsilon_inside_a_production_is_skipped(self):
+        self.assertEqual(kinds({'A': [['ε', 'A', 'x'], ['a']]}), [('direct', ['A', 'A'])])
+
+    def test_long_chain_without_recursion_limit(self):
+        n = 20000
+        grammar = {f'N{i}': [[f'N{i + 1}', 'x']] for i in range(n)}
+        grammar[f'N{n}'] = [['N0', 'y'], ['z']]
+        found = left_recursive_cycles(grammar)
+        self.assertEqual(len(found), 1)
+        self.assertEqual(len(found[0].cycle), n + 1)
+        self.assertEqual(len(found[0].nonterminals), n + 1)
+
+    def test_components_come_sinks_first(self):
+        graph = left_corner_graph({'A': [['B']], 'B': [['C'], ['b']], 'C': [['B', 'c']]})
+        self.assertEqual([sorted(c) for c in strongly_connected_components(graph)], [['B', 'C'], ['A']])
+
+
+if __name__ == '__main__':
+    unittest.main()
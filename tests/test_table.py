@@ -0,0 +1,53 @@
+"""construct_table: cells, conflicts and their order."""
+import os
+import subprocess
+import sys
+import unittest
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore import compute_all_firsts, compute_all_follows, construct_table  # noqa: E402
+
+# S can start with x, y or z through both A and B: three conflicts in S's row
+AMBIGUOUS = {
+    'S': [['A'], ['B']],
+    'A': [['z'], ['y'], ['x']],
+    'B': [['x'], ['z'], ['y'], ['ε']],
+}
+
+
+def build(productions, start):
+    first = compute_all_firsts(productions)
+    follow = compute_all_follows(productions, start, first)
+    return construct_table(productions, first, follow)
+
+
+class ConstructTableTest(unittest.TestCase):
+
+    def test_first_production_keeps_the_cell(self):
+        table, conflicts, origins = build(AMBIGUOUS, 'S')
+        for t in 'xyz':
+            self.assertEqual(table[('S', t)], ['A'])
+        self.assertEqual(table[('S', '$')], ['B'])
+        self.assertEqual(origins[('S', 'x')], 'S ⇒ A')
+
+    def test_conflicts_in_terminal_order(self):
+        _, conflicts, _ = build(AMBIGUOUS, 'S')
+        self.assertEqual([(A, t, existing, new) for A, t, existing, _, new, _ in conflicts],
+                         [('S', 'x', ['A'], ['B']), ('S', 'y', ['A'], ['B']), ('S', 'z', ['A'], ['B'])])
+
+    def test_conflict_order_does_not_depend_on_hash_seed(self):
+        script = ("from tests.test_table import AMBIGUOUS, build\n"
+                  "print([c[1] for c in build(AMBIGUOUS, 'S')[1]])")
+        outputs = set()
+        for seed in ('1', '2', '3'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            outputs.add(subprocess.run([sys.executable, '-c', script], cwd=_REPO_ROOT, env=env,
+                                       capture_output=True, text=True, check=True).stdout)
+        self.assertEqual(len(outputs), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
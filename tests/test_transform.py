@@ -0,0 +1,198 @@
+"""Useless-symbol removal, left-recursion removal (and the substitution step it shares with expt5), left factoring."""
+import os
+import random
+import sys
+import unittest
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from grammarcore import (  # noqa: E402
+    fresh_nonterminal,
+    left_factor,
+    remove_left_recursion,
+    remove_useless_symbols,
+    substitute_leading,
+)
+
+
+def restarting_left_factor(productions):
+    """The left factoring left_factor replaced: one factoring, then start over.
+
+    Kept as the reference left_factor must agree with; it never ends on
+    identical alternatives.
+    """
+    prods = {nt: [list(p) for p in rhs] for nt, rhs in productions.items()}
+    steps = []
+    changed = True
+    while changed:
+        changed = False
+        for A, alternatives in list(prods.items()):
+            if len(alternatives) < 2:
+                continue
+            groups = {}
+            for prod in alternatives:
+                groups.setdefault(prod[0] if prod else 'ε', []).append(prod)
+            for group in groups.values():
+                if len(group) < 2:
+                    continue
+                prefix = []
+                for symbols in zip(*group):
+                    if any(sym != symbols[0] for sym in symbols):
+                        break
+                    prefix.append(symbols[0])
+                A_dash = fresh_nonterminal(A, prods)
+                steps.append(f"Left factoring on {A}: common prefix {' '.join(prefix)} found; created {A_dash}.")
+                rest = []
+                for prod in alternatives:
+                    if prod[:len(prefix)] == prefix:
+                        prods.setdefault(A_dash, []).append(prod[len(prefix):] or ['ε'])
+                    else:
+                        rest.append(prod)
+                prods[A] = rest + [prefix + [A_dash]]
+                changed = True
+                break
+            if changed:
+                break
+    return prods, steps
+
+
+def short_sentences(productions, start, limit):
+    """Terminal strings of at most `limit` symbols derived from `start`."""
+    lang = {A: set() for A in productions}
+    changed = True
+    while changed:
+        changed = False
+        for A, alternatives in productions.items():
+            for prod in alternatives:
+                strings = {()}
+                for sym in prod:
+                    if sym == 'ε':
+                        continue
+                    tails = lang[sym] if sym in productions else {(sym,)}
+                    strings = {s + t for s in strings for t in tails if len(s) + len(t) <= limit}
+                if not strings <= lang[A]:
+                    lang[A] |= strings
+                    changed = True
+    return lang[start]
+
+
+def grammar_size(productions):
+    return (len(productions), sum(len(alts) for alts in productions.values()),
+            sum(len(prod) for alts in productions.values() for prod in alts))
+
+
+class SubstituteLeadingTest(unittest.TestCase):
+
+    def test_expands_every_alternative_of_head(self):
+        new, expanded, replaced = substitute_leading([['B', 'x'], ['y']], 'B', [['b'], ['c', 'd']])
+        self.assertEqual(new, [['b', 'x'], ['c', 'd', 'x'], ['y']])
+        self.assertEqual(expanded, [(['x'], ['b'], ['b', 'x']), (['x'], ['c', 'd'], ['c', 'd', 'x'])])
+        self.assertTrue(replaced)
+
+    def test_head_without_alternatives_drops_the_production(self):
+        new, expanded, replaced = substitute_leading([['B', 'x'], ['y']], 'B', [])
+        self.assertEqual(new, [['y']])
+        self.assertEqual(expanded, [])
+        self.assertTrue(replaced)
+
+    def test_nothing_to_replace(self):
+        new, expanded, replaced = substitute_leading([['y', 'B']], 'B', [['b']])
+        self.assertEqual(new, [['y', 'B']])
+        self.assertFalse(replaced)
+
+
+class RemoveLeftRecursionTest(unittest.TestCase):
+
+    def test_direct(self):
+        prods, _ = remove_left_recursion({'E': [['E', '+', 'T'], ['T']], 'T': [['id']]})
+        self.assertEqual(prods['E'], [['T', "E'"]])
+        self.assertEqual(prods["E'"], [['+', 'T', "E'"], ['ε']])
+
+    def test_indirect(self):
+        prods, _ = remove_left_recursion({'S': [['A', 'a'], ['b']], 'A': [['S', 'c'], ['d']]})
+        self.assertEqual(prods['A'], [['b', 'c', "A'"], ['d', "A'"]])
+        self.assertEqual(prods["A'"], [['a', 'c', "A'"], ['ε']])
+
+    def test_earlier_nonterminal_without_alternatives(self):
+        # A -> B x must go: B derives nothing (regression: it used to stay)
+        prods, steps = remove_left_recursion({'B': [], 'A': [['B', 'x'], ['y']]})
+        self.assertEqual(prods['A'], [['y']])
+        self.assertIn("After expanding B in A, A productions become: ['y']", steps)
+
+
+class RemoveUselessSymbolsTest(unittest.TestCase):
+
+    def test_non_productive_head(self):
+        # B only derives B x: it goes, and so does S -> a B
+        prods, steps = remove_useless_symbols({'S': [['a', 'B'], ['c']], 'B': [['B', 'x']]}, 'S')
+        self.assertEqual(prods, {'S': [['c']]})
+        self.assertEqual(steps, [
+            "Removed non-productive non-terminal B (derives no terminal string).",
+            "Removed S ⇒ a B (uses non-productive B).",
+        ])
+
+    def test_unreachable_head(self):
+        # U is productive but only U itself mentions it
+        prods, steps = remove_useless_symbols({'S': [['a', 'S'], ['b']], 'U': [['u', 'U'], ['u']]}, 'S')
+        self.assertEqual(prods, {'S': [['a', 'S'], ['b']]})
+        self.assertEqual(steps, ["Removed unreachable non-terminal U (not reachable from S)."])
+
+    def test_unreachable_after_non_productive_removal(self):
+        # C is only reachable through S -> B C, which goes with the non-productive B
+        grammar = {'S': [['B', 'C'], ['s']], 'B': [['b', 'B']], 'C': [['c']]}
+        prods, steps = remove_useless_symbols(grammar, 'S')
+        self.assertEqual(prods, {'S': [['s']]})
+        self.assertEqual(steps[-1], "Removed unreachable non-terminal C (not reachable from S).")
+
+    def test_unproductive_start_symbol(self):
+        grammar = {'S': [['a', 'S']], 'A': [['a']]}
+        prods, steps = remove_useless_symbols(grammar, 'S')
+        self.assertEqual(prods, grammar)
+        self.assertIsNot(prods['S'], grammar['S'])
+        self.assertEqual(steps, ["Start symbol S derives no terminal string; grammar left unchanged."])
+
+    def test_nothing_useless(self):
+        grammar = {'E': [['T', "E'"]], "E'": [['+', 'T', "E'"], ['ε']], 'T': [['id']]}
+        self.assertEqual(remove_useless_symbols(grammar, 'E'), (grammar, []))
+
+
+class LeftFactorTest(unittest.TestCase):
+
+    def test_common_prefix(self):
+        prods, steps = left_factor({'S': [['i', 'E', 't', 'S'], ['i', 'E', 't', 'S', 'e', 'S'], ['a']]})
+        self.assertEqual(prods, {'S': [['a'], ['i', 'E', 't', 'S', "S'"]], "S'": [['ε'], ['e', 'S']]})
+        self.assertEqual(steps, ["Left factoring on S: common prefix i E t S found; created S'."])
+
+    def test_agrees_with_restarting_algorithm(self):
+        rng = random.Random(0)
+        for n in range(1000):
+            heads = [f'N{i}' for i in range(rng.randint(1, 3))]
+            symbols = heads + ['a', 'b']
+            grammar = {}
+            for A in heads:
+                alternatives = []
+                for _ in range(rng.randint(1, 5)):
+                    prod = [rng.choice(symbols) for _ in range(rng.randint(0, 3))] or ['ε']
+                    if prod not in alternatives:  # the restarting algorithm never ends on duplicates
+                        alternatives.append(prod)
+                grammar[A] = alternatives
+            got, got_steps = left_factor(grammar)
+            want, want_steps = restarting_left_factor(grammar)
+            with self.subTest(grammar=grammar):
+                self.assertEqual(len(got_steps), len(want_steps))
+                self.assertEqual(grammar_size(got), grammar_size(want))
+                self.assertEqual(short_sentences(got, 'N0', 5), short_sentences(want, 'N0', 5))
+
+    def test_identical_alternatives(self):
+        # the restarting algorithm factored these forever (S' -> ε | ε, S'' -> ε | ε, ...)
+        self.assertEqual(left_factor({'S': [['a', 'b'], ['a', 'b']]}), ({'S': [['a', 'b']]}, []))
+        self.assertEqual(left_factor({'S': [['ε'], ['x'], ['ε']]}), ({'S': [['ε'], ['x']]}, []))
+        prods, steps = left_factor({'S': [['a', 'b'], ['a', 'c'], ['a', 'b']]})
+        self.assertEqual(prods, {'S': [['a', "S'"]], "S'": [['b'], ['c']]})
+        self.assertEqual(len(steps), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()